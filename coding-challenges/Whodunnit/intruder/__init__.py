@@ -0,0 +1,15 @@
+"""
+intruder: the Logfile Whodunnit solution, scaled up for multi-GB access logs.
+
+Same question and same report as find_intruder-solution.py, but:
+
+- the log is memory-mapped and split into byte ranges at newline boundaries
+- ranges are parsed in a pool of processes (one per core)
+- each process returns its per-IP sets, and the parent merges them (map-reduce)
+
+Run it from the Whodunnit folder:
+
+    python -m intruder                       # same as find_intruder-solution.py
+    python -m intruder big.log --workers 8 --threshold 10
+    python -m intruder.bench --size-gb 5     # throughput vs number of workers
+"""
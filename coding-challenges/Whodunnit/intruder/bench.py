@@ -0,0 +1,308 @@
+"""
+Throughput benchmark: generate a big log, analyze it with 1, 2, 4, ... workers.
+
+    python -m intruder.bench                     # 5 GB log, next to this folder
+    python -m intruder.bench --size-gb 0.5 --keep
+
+Prints MB/s per worker count, the speedup over 1 worker and the efficiency
+(speedup / workers; 100% = perfectly linear). Every run must print the same
+report, otherwise the benchmark fails.
+
+The log is one random ~4 MB block of lines written over and over, so
+generating 5 GB takes seconds, not minutes. The run is I/O-bound if the file
+doesn't fit in the page cache: run it twice, or use a size below your free RAM.
+
+    python -m intruder.bench --days 30 --size-gb 1
+
+instead writes a time-ordered log spanning 30 days and compares a 10-minute
+window across midnight answered through the sparse index against a full scan.
+
+    python -m intruder.bench --memory --ips 10000000
+
+measures the per-IP state: memory and time for SetState (the original
+dict of sets) vs CompactState at that many distinct IPs, same report from both.
+
+    python -m intruder.bench --rules 50 --size-gb 0.2
+
+times one rule vs 50 rules through the one-pass rule engine (rules.py).
+
+    python -m intruder.bench --follow --size-gb 0.5
+
+measures follow mode: lines/second through the sliding window, and how many
+events it holds (bounded by the window, not by the log).
+"""
+
+import argparse
+import os
+import random
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from datetime import date, timedelta
+
+from .analyze import Config, analyze, report
+from .follow import SlidingWindow, TimestampParser, feed, format_alert
+from .index import SparseIndex
+from .rules import RuleSet
+from .state import ENGINES
+
+ENDPOINTS = ["/", "/login", "/logout", "/home", "/search", "/cart", "/checkout", "/profile",
+             "/settings", "/api/items", "/api/orders", "/api/users", "/help", "/admin", "/transfer"]
+STATUSES = [200] * 8 + [301, 403, 404, 500]
+
+
+def make_block(target_bytes=4 * 1024 * 1024, seed=42):
+    # random traffic across the whole day, plus a few IPs that look like the intruder
+    rng = random.Random(seed)
+    lines = []
+    size = 0
+    while size < target_bytes:
+        h, m, s = rng.randrange(24), rng.randrange(60), rng.randrange(60)
+        ip = f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}"
+        line = f"2025-11-15T{h:02}:{m:02}:{s:02}Z  {ip}   {rng.choice(ENDPOINTS)}        {rng.choice(STATUSES)}\n"
+        lines.append(line)
+        size += len(line)
+    for i in range(5):
+        ip = f"192.168.0.{70 + i}"
+        for endpoint in ENDPOINTS[:6 + i]:
+            lines.append(f"2025-11-15T23:0{i}:00Z  {ip}   {endpoint}        200\n")
+        lines.append(f"2025-11-15T23:0{i}:30Z  {ip}   /transfer        200\n")
+    rng.shuffle(lines)
+    return "".join(lines).encode()
+
+
+def generate(path, size_bytes):
+    block = make_block()
+    with open(path, "wb") as f:
+        written = 0
+        while written < size_bytes:
+            f.write(block)
+            written += len(block)
+    return written
+
+
+def make_day(target_bytes, seed=42):
+    # one day of traffic in time order, dated b"DAY"; an intruder splits its visit around midnight
+    rng = random.Random(seed)
+    count = max(1, target_bytes // 58)
+    seconds = sorted(rng.randrange(86400) for _ in range(count))
+    lines = []
+    for second in seconds:
+        h, rest = divmod(second, 3600)
+        ip = f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}"
+        lines.append(f"DAYT{h:02}:{rest // 60:02}:{rest % 60:02}Z  {ip}   {rng.choice(ENDPOINTS)}        {rng.choice(STATUSES)}\n")
+    # 3 endpoints before midnight + 4 after: only a window crossing midnight sees more than 5
+    lines.insert(0, "DAYT00:01:00Z  192.168.0.99   /transfer        200\n")
+    for endpoint in ENDPOINTS[:3]:
+        lines.insert(1, f"DAYT00:01:00Z  192.168.0.99   {endpoint}        200\n")
+    for endpoint in ENDPOINTS[3:6]:
+        lines.append(f"DAYT23:59:00Z  192.168.0.99   {endpoint}        200\n")
+    return "".join(lines).encode()
+
+
+def generate_days(path, days, size_bytes, first_day=date(2025, 10, 17)):
+    template = make_day(size_bytes // days)
+    with open(path, "wb") as f:
+        for i in range(days):
+            f.write(template.replace(b"DAY", (first_day + timedelta(days=i)).isoformat().encode()))
+    return first_day + timedelta(days=days // 2)
+
+
+def bench_index(args):
+    # 10 minutes across midnight in the middle of the log: indexed vs full scan
+    t0 = time.perf_counter()
+    midnight = generate_days(args.path, args.days, int(args.size_gb * 1024**3))
+    size = os.path.getsize(args.path)
+    print(f"generated {args.path}: {args.days} days, {size / 1024**2:,.0f} MB in {time.perf_counter() - t0:.1f}s")
+    config = Config(window_start=f"{midnight - timedelta(days=1)}T23:55:00", window_end=f"{midnight}T00:05:00")
+    try:
+        t0 = time.perf_counter()
+        index = SparseIndex(args.path).update()
+        print(f"index built:      {time.perf_counter() - t0:6.2f}s, {len(index.blocks):,} blocks, "
+              f"{os.path.getsize(index.path) / 1024:,.0f} KB")
+        with open(args.path, "ab") as f:
+            f.write(f"{midnight + timedelta(days=args.days)}T00:00:00Z  10.0.0.1   /        200\n".encode() * 1000)
+        t0 = time.perf_counter()
+        index = SparseIndex(args.path).update()
+        print(f"index updated:    {time.perf_counter() - t0:6.2f}s, rescanned {index.scanned / 1024:,.0f} KB after an append")
+
+        t0 = time.perf_counter()
+        spans = index.spans(config.window_start, config.window_end)
+        indexed = report(analyze(args.path, config, workers=1, spans=spans).suspects(config.threshold))
+        to_read = sum(end - start for start, end in spans)
+        print(f"indexed window:   {time.perf_counter() - t0:6.2f}s, read {to_read / 1024**2:,.1f} MB")
+        t0 = time.perf_counter()
+        full = report(analyze(args.path, config, workers=args.max_workers).suspects(config.threshold))
+        print(f"full scan:        {time.perf_counter() - t0:6.2f}s, read {os.path.getsize(args.path) / 1024**2:,.0f} MB")
+    finally:
+        if not args.keep:
+            os.remove(args.path)
+            os.remove(args.path + ".idx")
+
+    assert indexed == full, "indexed and full-scan reports differ"
+    print()
+    print(indexed)
+
+
+def bench_follow(args):
+    # two days of traffic replayed through follow mode's sliding window, in memory;
+    # the intruder from make_day() is caught just after midnight
+    template = make_day(int(args.size_gb * 1024**3) // 2)
+    day = (template.replace(b"DAY", b"2025-11-15") + template.replace(b"DAY", b"2025-11-16")).split(b"\n")[:-1]
+    print(f"{len(day):,} lines, {args.size_gb * 1024:,.0f} MB of log")
+    config = Config()
+    window = SlidingWindow(10 * 60, config.threshold, frozenset(s.encode() for s in config.sensitive))
+    to_seconds = TimestampParser()
+    alerts = []
+    most_events = 0
+    t0 = time.perf_counter()
+    for i in range(0, len(day), 10_000):  # the batches tail() would hand over
+        alerts.extend(feed(window, day[i:i + 10_000], to_seconds))
+        most_events = max(most_events, len(window.events))
+    elapsed = time.perf_counter() - t0
+    print(f"{len(day) / elapsed:,.0f} lines/s, at most {most_events:,} events in the 10-minute window, "
+          f"{len(window.endpoints):,} IPs tracked at the end")
+    for ts, alert in alerts:
+        print(format_alert(ts, alert))
+
+
+def fill_state(engine, ips, seed=42):
+    # runs in a fresh process, so ru_maxrss is this engine's peak and nothing else's
+    sensitive = frozenset({b"/transfer", b"/admin"})
+    rng = random.Random(seed)
+    endpoints = [f"/api/items/{i}".encode() for i in range(1000)]
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    t0 = time.perf_counter()
+    state = ENGINES[engine](sensitive)
+    add = state.add
+    for i in range(ips):
+        ip = f"{10 + (i >> 24)}.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}".encode()
+        if i % 100_000 == 0:  # an intruder now and then
+            for endpoint in endpoints[:6]:
+                add(ip, endpoint, False)
+            add(ip, b"/transfer", True)
+        else:
+            for _ in range(3):
+                add(ip, endpoints[min(int(rng.expovariate(0.01)), 999)], False)
+    elapsed = time.perf_counter() - t0
+    used_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before
+    return used_kb * 1024, elapsed, report(state.suspects(5))
+
+
+def bench_memory(args):
+    print(f"{'engine':>8} {'IPs':>12} {'seconds':>8} {'memory':>10} {'bytes/IP':>9}")
+    reports = {}
+    for engine, ips in (("sets", min(args.ips, args.sets_ips)), ("compact", args.ips)):
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            used, elapsed, text = pool.submit(fill_state, engine, ips).result()
+        reports[engine] = (ips, text)
+        print(f"{engine:>8} {ips:>12,} {elapsed:>8.1f} {used / 1024**2:>8,.0f} MB {used / ips:>9,.0f}")
+        if ips < args.ips:
+            print(f"{'':>8} {args.ips:>12,} {'':>8} {used / ips * args.ips / 1024**2:>8,.0f} MB  (extrapolated)")
+    if reports["sets"][0] == reports["compact"][0]:
+        assert reports["sets"][1] == reports["compact"][1], "reports differ between engines"
+        print("\nsame report from both engines")
+
+
+def rule_specs(count):
+    # `count` variations on a few detectors: different thresholds, two windows
+    kinds = [
+        lambda n: [{"metric": "unique_endpoints", "op": ">", "value": 3 + n % 5},
+                   {"metric": "endpoint_status", "endpoints": ["/transfer", "/admin"], "value": 1}],
+        lambda n: [{"metric": "burst", "class": "4xx", "seconds": 60, "value": 2 + n % 3}],
+        lambda n: [{"metric": "requests", "value": 2 + n % 4},
+                   {"metric": "status_ratio", "class": "5xx", "op": ">", "value": 0.3 + n % 3 / 10}],
+        lambda n: [{"metric": "status_count", "status": 403, "value": 1 + n % 2}],
+    ]
+    windows = [["22:55:00", "23:05:00"], ["23:00:00", "23:30:00"]]
+    return [{"name": f"rule-{n}", "window": windows[n // len(kinds) % 2], "when": kinds[n % len(kinds)](n)}
+            for n in range(count)]
+
+
+def bench_rules(args):
+    generate(args.path, int(args.size_gb * 1024**3))
+    size_mb = os.path.getsize(args.path) / 1024**2
+    try:
+        timings = []
+        for count in (1, args.rules):
+            rule_set = RuleSet(rule_specs(count))
+            t0 = time.perf_counter()
+            with open(args.path, "r", encoding="utf-8") as f:
+                rule_set.scan(f)
+            rule_set.report()
+            timings.append(time.perf_counter() - t0)
+            print(f"{count:>4} rules, {rule_set.aggregation_count()} shared aggregations: "
+                  f"{timings[-1]:6.2f}s ({size_mb / timings[-1]:.0f} MB/s)")
+        print(f"{args.rules} rules cost {timings[1] / timings[0]:.2f}x one rule")
+    finally:
+        os.remove(args.path)
+
+
+def worker_counts(cpus):
+    # 1, 2, 4, ... up to (and including) the number of cores
+    counts = []
+    n = 1
+    while n < cpus:
+        counts.append(n)
+        n *= 2
+    counts.append(cpus)
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m intruder.bench")
+    parser.add_argument("--size-gb", type=float, default=5.0, help="log size to generate (default: %(default)s)")
+    parser.add_argument("--path", default="bench-access.log", help="where to write the log (default: %(default)s)")
+    parser.add_argument("--keep", action="store_true", help="keep (and reuse) the generated log")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--days", type=int, help="benchmark the sparse index on a log spanning this many days")
+    parser.add_argument("--follow", action="store_true", help="benchmark follow mode's sliding window")
+    parser.add_argument("--memory", action="store_true", help="benchmark per-IP state memory")
+    parser.add_argument("--rules", type=int, help="benchmark this many rules against one in the rule engine")
+    parser.add_argument("--ips", type=int, default=10_000_000, help="distinct IPs for --memory (default: %(default)s)")
+    parser.add_argument("--sets-ips", type=int, default=1_000_000,
+                        help="cap for the set engine, which needs several GB at 10M IPs (default: %(default)s)")
+    args = parser.parse_args(argv)
+    if args.days:
+        return bench_index(args)
+    if args.follow:
+        return bench_follow(args)
+    if args.memory:
+        return bench_memory(args)
+    if args.rules:
+        return bench_rules(args)
+
+    size_bytes = int(args.size_gb * 1024**3)
+    if not (args.keep and os.path.exists(args.path)):
+        t0 = time.perf_counter()
+        generate(args.path, size_bytes)
+        print(f"generated {args.path}: {os.path.getsize(args.path) / 1024**2:,.0f} MB in {time.perf_counter() - t0:.1f}s")
+    size_mb = os.path.getsize(args.path) / 1024**2
+
+    config = Config(window_start="22:55:00", window_end="23:05:00")
+    reports = []
+    baseline = None
+    try:
+        # warm the page cache so the first run isn't the only one paying for disk
+        analyze(args.path, config, workers=args.max_workers)
+        print(f"{'workers':>7} {'seconds':>8} {'MB/s':>8} {'speedup':>8} {'efficiency':>10}")
+        for workers in worker_counts(args.max_workers):
+            t0 = time.perf_counter()
+            result = analyze(args.path, config, workers=workers)
+            elapsed = time.perf_counter() - t0
+            reports.append(report(result.suspects(config.threshold)))
+            baseline = baseline or elapsed
+            speedup = baseline / elapsed
+            print(f"{workers:>7} {elapsed:>8.2f} {size_mb / elapsed:>8.0f} {speedup:>7.2f}x {speedup / workers:>9.0%}")
+    finally:
+        if not args.keep:
+            os.remove(args.path)
+
+    assert all(r == reports[0] for r in reports), "reports differ between worker counts"
+    print()
+    print(reports[0])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Command line for the parallel analyzer.
+
+    python -m intruder [LOG ...] [--window-start HH:MM:SS] [--window-end HH:MM:SS]
+                       [--threshold N] [--sensitive /transfer,/admin]
+                       [--workers N] [--chunk-mb MB]
+
+With no arguments it answers the same question as find_intruder-solution.py.
+Windows given as full datetimes (2025-11-15T23:55:00 .. 2025-11-16T00:05:00)
+may cross midnight and are answered through the sparse index (index.py),
+so only the blocks that can hold those lines are read.
+
+LOG can also be several files, a directory or a glob of rotated .gz/.zst
+logs; those are streamed file by file (sources.py).
+"""
+
+import argparse
+import os
+import sys
+
+from .analyze import CHUNK_BYTES, Config, analyze, report
+from .index import EVERY, spans_for
+from .parse import window_key
+from .sources import analyze_files, check_codecs, expand_inputs
+from .state import ENGINES
+
+
+def build_parser():
+    defaults = Config()
+    parser = argparse.ArgumentParser(prog="python -m intruder", description="Find suspected intruders in an access log.")
+    parser.add_argument("log", nargs="*", default=["access.log"],
+                        help="log file(s), directories or globs, .gz/.zst welcome (default: access.log)")
+    parser.add_argument("--window-start", default=defaults.window_start,
+                        help="HH:MM:SS (any day) or YYYY-MM-DDTHH:MM:SS (default: %(default)s)")
+    parser.add_argument("--window-end", default=defaults.window_end,
+                        help="same format as --window-start (default: %(default)s)")
+    parser.add_argument("--threshold", type=int, default=defaults.threshold,
+                        help="flag IPs with MORE than this many unique endpoints (default: %(default)s)")
+    parser.add_argument("--sensitive", default=",".join(sorted(defaults.sensitive)),
+                        help="comma-separated endpoints (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="processes to parse with (default: one per core, %(default)s)")
+    parser.add_argument("--chunk-mb", type=int, default=CHUNK_BYTES // (1024 * 1024),
+                        help="bytes per task, in MB (default: %(default)s)")
+    parser.add_argument("--index-every", type=int, default=EVERY,
+                        help="lines per sparse-index entry (default: %(default)s)")
+    parser.add_argument("--state", choices=sorted(ENGINES), default="compact",
+                        help="per-IP state: compact (packed IPs + bitsets) or sets (the original) (default: %(default)s)")
+    parser.add_argument("--no-index", action="store_true", help="scan the whole file even for datetime windows")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.workers < 1 or args.chunk_mb < 1 or args.index_every < 1:
+        raise SystemExit("--workers, --chunk-mb and --index-every must be at least 1")
+    try:
+        window_start, window_end = window_key(args.window_start), window_key(args.window_end)
+    except ValueError:
+        raise SystemExit("--window-start/--window-end must be HH:MM:SS or YYYY-MM-DDTHH:MM:SS")
+    if len(window_start) != len(window_end):
+        raise SystemExit("--window-start and --window-end must both be times or both be datetimes")
+    config = Config(
+        window_start=window_start,
+        window_end=window_end,
+        threshold=args.threshold,
+        sensitive=frozenset(s.strip() for s in args.sensitive.split(",") if s.strip()),
+    )
+    paths = expand_inputs(args.log)
+    if not paths:
+        raise SystemExit(f"no log files match {' '.join(args.log)}")
+    if len(paths) == 1 and paths[0] == args.log[0] and not paths[0].endswith((".gz", ".zst")):
+        # one plain file: mmap + byte ranges (+ the sparse index for datetime windows)
+        spans = None
+        if len(window_start) > 8 and not args.no_index:
+            spans = spans_for(paths[0], window_start, window_end, args.index_every)
+        state = analyze(paths[0], config, args.workers, args.chunk_mb * 1024 * 1024, spans, args.state)
+    else:
+        check_codecs(paths)
+        state, skipped = analyze_files(paths, config, args.workers, args.state)
+        if skipped:
+            print(f"skipped {len(skipped)} of {len(paths)} files outside the window", file=sys.stderr)
+    print(report(state.suspects(config.threshold)))
@@ -0,0 +1,240 @@
+"""
+Follow mode: catch the intruder while it's happening.
+
+    python -m intruder.follow access.log --window-minutes 10
+    ALERT 2025-11-15T23:00:05 192.168.0.77 (6 endpoints, accessed /transfer with 200)
+
+Tails the log like `tail -F` (keeps going across rotation and truncation).
+For every IP it keeps the endpoints seen in the last `window` seconds of
+log time, and prints an alert as soon as an IP has more than `threshold`
+unique endpoints and a 200 on a sensitive endpoint in that window.
+
+The window slides incrementally: events sit in one deque in time order (a
+line that arrives a little late is slotted in by its timestamp), each IP has
+a counter per endpoint, and events older than the window are popped from the
+front and decrement their counters. Nothing is recomputed, and memory holds
+only the events inside the window, however big the log gets.
+
+Log time, not wall-clock time: the window ends at the newest timestamp seen,
+so replaying an old log (--from-start) raises the same alerts it would have live.
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+from .analyze import Config
+
+READ_BYTES = 1024 * 1024
+POLL_SECONDS = 0.2
+
+
+class SlidingWindow:
+    """
+    Per-IP endpoint counts over the last `window` seconds.
+
+    add() returns an alert tuple (ip, unique_count, sensitive_paths) the first
+    time an IP matches; the IP can alert again after it has dropped back
+    below the rule (its old events expired).
+    """
+
+    def __init__(self, window, threshold, sensitive):
+        self.window = window
+        self.threshold = threshold
+        self.sensitive = sensitive
+        self.events = deque()  # (seconds, ip, endpoint, sensitive_200), oldest first
+        self.endpoints = {}  # ip -> {endpoint: events in window}
+        self.sensitive_hits = {}  # ip -> {sensitive endpoint: 200s in window}
+        self.alerted = set()
+        self.newest = float("-inf")
+
+    def add(self, seconds, ip, endpoint, status):
+        if seconds > self.newest:
+            self.newest = seconds
+            self.expire(seconds - self.window)
+        elif seconds < self.newest - self.window:
+            return None  # arrived too late: already outside the window
+
+        sensitive_200 = status == 200 and endpoint in self.sensitive
+        event = (seconds, ip, endpoint, sensitive_200)
+        events = self.events
+        if not events or events[-1][0] <= seconds:
+            events.append(event)
+        else:
+            # late but inside the window: slot it in by time (it's usually near the end),
+            # so expire() pops it when it is window-old, not when the newer events are
+            i = len(events) - 1
+            while i > 0 and events[i - 1][0] > seconds:
+                i -= 1
+            events.insert(i, event)
+        counts = self.endpoints.get(ip)
+        if counts is None:
+            counts = self.endpoints[ip] = {}
+        counts[endpoint] = counts.get(endpoint, 0) + 1
+        if sensitive_200:
+            hits = self.sensitive_hits.get(ip)
+            if hits is None:
+                hits = self.sensitive_hits[ip] = {}
+            hits[endpoint] = hits.get(endpoint, 0) + 1
+
+        if ip not in self.alerted and len(counts) > self.threshold and ip in self.sensitive_hits:
+            self.alerted.add(ip)
+            return ip, len(counts), set(self.sensitive_hits[ip])
+        return None
+
+    def expire(self, cutoff):
+        # pop events older than cutoff; their IP's counters go down with them
+        events = self.events
+        while events and events[0][0] < cutoff:
+            _, ip, endpoint, sensitive_200 = events.popleft()
+            counts = self.endpoints[ip]
+            if counts[endpoint] == 1:
+                del counts[endpoint]
+                if not counts:
+                    del self.endpoints[ip]
+            else:
+                counts[endpoint] -= 1
+            if sensitive_200:
+                hits = self.sensitive_hits[ip]
+                if hits[endpoint] == 1:
+                    del hits[endpoint]
+                    if not hits:
+                        del self.sensitive_hits[ip]
+                else:
+                    hits[endpoint] -= 1
+            if ip in self.alerted and (len(counts) <= self.threshold or ip not in self.sensitive_hits):
+                self.alerted.discard(ip)
+
+
+class TimestampParser:
+    # b"2025-11-15T22:58:01Z" -> epoch seconds; busy logs repeat the same second, so cache
+    def __init__(self, max_cached=100_000):
+        self.cache = {}
+        self.max_cached = max_cached
+
+    def __call__(self, ts):
+        seconds = self.cache.get(ts)
+        if seconds is None:
+            try:
+                parsed = datetime.fromisoformat(ts.rstrip(b"Z").decode())
+            except ValueError:
+                return None
+            seconds = parsed.replace(tzinfo=timezone.utc).timestamp()
+            if len(self.cache) >= self.max_cached:
+                self.cache.clear()
+            self.cache[ts] = seconds
+        return seconds
+
+
+def feed(window, lines, to_seconds):
+    # same line rules as scan_lines(); yields (ts, alert) for every alert raised
+    for line in lines:
+        parts = line.split(None, 4)
+        if len(parts) < 4:
+            continue
+        ts, ip, endpoint, status = parts[0], parts[1], parts[2], parts[3]
+        if ts.count(b"T") != 1:
+            continue
+        try:
+            status = int(status)
+        except ValueError:
+            continue
+        seconds = to_seconds(ts)
+        if seconds is None:
+            continue
+        alert = window.add(seconds, ip, endpoint, status)
+        if alert is not None:
+            yield ts.rstrip(b"Z").decode(), alert
+
+
+def tail(path, from_start=False, poll=POLL_SECONDS, stop=None):
+    """
+    Yield lists of complete lines (bytes, no b"\\n") appended to `path`, forever.
+
+    Rotation: when the name points to a new file, the old one is read to the
+    end first (a last line without b"\\n" included), then the new one from its
+    start. Truncation (copytruncate) restarts from offset 0. `stop()` returning
+    True ends the loop (for tests).
+    """
+    f = None
+    pending = b""
+    while stop is None or not stop():
+        if f is None:
+            try:
+                f = open(path, "rb")
+            except FileNotFoundError:
+                time.sleep(poll)  # between rename and re-create
+                continue
+            if not from_start:
+                f.seek(0, os.SEEK_END)
+            from_start = True  # every file after the first is read from its start
+            pending = b""
+
+        data = f.read(READ_BYTES)
+        if data:
+            data = pending + data
+            cut = data.rfind(b"\n") + 1
+            pending = data[cut:]
+            if cut:
+                yield data[:cut - 1].split(b"\n")
+            continue
+
+        try:
+            current = os.stat(path)
+        except FileNotFoundError:
+            current = None
+        opened = os.fstat(f.fileno())
+        if current is None or current.st_ino != opened.st_ino or current.st_dev != opened.st_dev:
+            f.close()  # rotated: the old file is fully read
+            f = None
+            if pending:
+                yield [pending]  # its last line had no b"\n"; it won't get one now
+                pending = b""
+        elif current.st_size < f.tell():
+            f.seek(0)  # truncated in place
+            pending = b""
+        else:
+            time.sleep(poll)
+    if f is not None:
+        f.close()
+
+
+def format_alert(ts, alert):
+    ip, unique_count, sensitive_paths = alert
+    paths_list = ", ".join(sorted(p.decode() for p in sensitive_paths))
+    return f"ALERT {ts} {ip.decode()} ({unique_count} endpoints, accessed {paths_list} with 200)"
+
+
+def build_parser():
+    defaults = Config()
+    parser = argparse.ArgumentParser(prog="python -m intruder.follow", description="Watch an access log and alert on intruders live.")
+    parser.add_argument("log", nargs="?", default="access.log")
+    parser.add_argument("--window-minutes", type=float, default=10, help="sliding window length (default: %(default)s)")
+    parser.add_argument("--threshold", type=int, default=defaults.threshold,
+                        help="alert on MORE than this many unique endpoints (default: %(default)s)")
+    parser.add_argument("--sensitive", default=",".join(sorted(defaults.sensitive)),
+                        help="comma-separated endpoints (default: %(default)s)")
+    parser.add_argument("--from-start", action="store_true", help="read the existing log first instead of only new lines")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.window_minutes <= 0:
+        raise SystemExit("--window-minutes must be positive")
+    sensitive = frozenset(s.strip().encode() for s in args.sensitive.split(",") if s.strip())
+    window = SlidingWindow(args.window_minutes * 60, args.threshold, sensitive)
+    to_seconds = TimestampParser()
+    try:
+        for lines in tail(args.log, from_start=args.from_start):
+            for ts, alert in feed(window, lines, to_seconds):
+                print(format_alert(ts, alert), flush=True)
+    except KeyboardInterrupt:
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+Sparse time index: jump straight to the part of the log a window needs.
+
+Every `every` lines (a block) the index stores where the block starts and
+the smallest and largest timestamp in it:
+
+    access.log.idx   (JSON, next to the log)
+    {"version": 1, "every": 10000, "head": "<first 64 bytes, hex>", "end": 41943040,
+     "blocks": [[0, "2025-11-15T00:00:00", "2025-11-15T00:14:58"],
+                [612345, "2025-11-15T00:14:58", "2025-11-15T00:29:59"], ...]}
+
+A window then only reads the blocks whose [min, max] overlaps it. Logs that
+are slightly out of order are still answered correctly; they just read a
+block or two more.
+
+The index is built once and updated incrementally: when the log has grown,
+only the last (possibly partial) block and the new bytes are scanned. If the
+log was rotated or truncated (its first bytes or size don't match), the index
+is rebuilt from scratch.
+
+    python -m intruder.index access.log                       # build / update, print stats
+    python -m intruder.index access.log --since 2025-11-15T23:55:00 --until 2025-11-16T00:05:00
+"""
+
+import argparse
+import json
+import mmap
+import os
+
+from .parse import window_key
+
+VERSION = 1
+EVERY = 10_000  # lines per block: ~10k * 60 bytes = ~600 KB read per block at most
+HEAD_BYTES = 64
+READ_BYTES = 16 * 1024 * 1024
+
+
+def index_path(log_path):
+    return log_path + ".idx"
+
+
+def line_timestamp(line):
+    # b"2025-11-15T22:58:01Z  192.168.0.10 ..." -> b"2025-11-15T22:58:01" (None if malformed)
+    parts = line.split(None, 1)
+    if not parts:
+        return None
+    ts = parts[0]
+    if ts.count(b"T") != 1:
+        return None
+    return ts.rstrip(b"Z")
+
+
+def scan_blocks(mm, start, end, every):
+    """
+    [[offset, min_ts, max_ts], ...] for the complete lines in mm[start:end].
+    Returns (blocks, indexed_end): bytes after the last b"\\n" are left for next time.
+    """
+    blocks = []
+    block = None
+    count = every  # start a new block on the first line
+    pos = start
+    while pos < end:
+        stop = min(pos + READ_BYTES, end)
+        last_newline = mm.rfind(b"\n", pos, stop)
+        if last_newline == -1:
+            if stop == end:
+                break  # only a partial line left
+            last_newline = mm.find(b"\n", stop, end)
+            if last_newline == -1:
+                break
+        data = mm[pos:last_newline]
+        for line in data.split(b"\n"):
+            if count == every:
+                block = [pos, None, None]
+                blocks.append(block)
+                count = 0
+            count += 1
+            ts = line_timestamp(line)
+            if ts is not None:
+                if block[1] is None or ts < block[1]:
+                    block[1] = ts
+                if block[2] is None or ts > block[2]:
+                    block[2] = ts
+            pos += len(line) + 1
+    for block in blocks:
+        block[1] = block[1] and block[1].decode()
+        block[2] = block[2] and block[2].decode()
+    return blocks, pos
+
+
+class SparseIndex:
+    def __init__(self, log_path, every=EVERY, path=None):
+        self.log_path = log_path
+        self.every = every
+        self.path = path or index_path(log_path)
+        self.head = ""
+        self.end = 0  # bytes of the log covered by `blocks`
+        self.blocks = []
+        self.scanned = 0  # bytes read by the last update()
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if saved.get("version") != VERSION or saved.get("every") != self.every:
+            return False
+        self.head, self.end, self.blocks = saved["head"], saved["end"], saved["blocks"]
+        return True
+
+    def save(self):
+        # write-then-rename, so a crash never leaves a half-written index
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump({"version": VERSION, "every": self.every, "head": self.head,
+                           "end": self.end, "blocks": self.blocks}, f, separators=(",", ":"))
+            os.replace(tmp, self.path)
+        except OSError:
+            pass  # read-only log folder: keep using the index in memory, rebuild it next run
+
+    def update(self):
+        """
+        Bring the index up to date with the log; returns self.
+        Only rescans from the start of the last block (it may have been partial).
+        """
+        self.load()
+        self.scanned = 0
+        size = os.path.getsize(self.log_path)
+        if size == 0:
+            self.head, self.end, self.blocks = "", 0, []
+            return self
+        with open(self.log_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            head = mm[:HEAD_BYTES].hex()
+            if size < self.end or not head.startswith(self.head):
+                self.end, self.blocks = 0, []  # rotated or truncated: start over
+            elif size == self.end and head == self.head:
+                return self
+            start = self.blocks.pop()[0] if self.blocks else 0
+            new_blocks, self.end = scan_blocks(mm, start, size, self.every)
+            self.blocks.extend(new_blocks)
+            self.head = head
+            self.scanned = size - start
+        self.save()
+        return self
+
+    def spans(self, since, until):
+        """
+        [(start, end), ...] byte ranges that can contain lines with since <= ts <= until,
+        adjacent blocks merged. since/until are "YYYY-MM-DDTHH:MM:SS" strings.
+        Bytes the index doesn't cover yet (a trailing partial line) are always included.
+        """
+        spans = []
+        for i, (offset, lo, hi) in enumerate(self.blocks):
+            if lo is None or hi < since or lo > until:
+                continue
+            block_end = self.blocks[i + 1][0] if i + 1 < len(self.blocks) else self.end
+            if spans and spans[-1][1] == offset:
+                spans[-1] = (spans[-1][0], block_end)
+            else:
+                spans.append((offset, block_end))
+        size = os.path.getsize(self.log_path)
+        if size > self.end:
+            spans.append((self.end, size))
+        return spans
+
+
+def spans_for(log_path, window_start, window_end, every=EVERY):
+    # the byte ranges a full-datetime window needs, after updating the log's index
+    return SparseIndex(log_path, every).update().spans(window_start, window_end)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m intruder.index", description="Build or update a log's sparse time index.")
+    parser.add_argument("log", nargs="?", default="access.log")
+    parser.add_argument("--every", type=int, default=EVERY, help="lines per index entry (default: %(default)s)")
+    parser.add_argument("--since", help="show what a window starting here would read")
+    parser.add_argument("--until", help="end of that window")
+    args = parser.parse_args(argv)
+
+    index = SparseIndex(args.log, args.every).update()
+    print(f"{index.path}: {len(index.blocks)} blocks covering {index.end:,} bytes "
+          f"(scanned {index.scanned:,} bytes to update)")
+    if args.since and args.until:
+        spans = index.spans(window_key(args.since), window_key(args.until))
+        to_read = sum(end - start for start, end in spans)
+        print(f"window {args.since} .. {args.until}: {len(spans)} span(s), {to_read:,} bytes "
+              f"of {os.path.getsize(args.log):,} to read")
+
+
+if __name__ == "__main__":
+    main()
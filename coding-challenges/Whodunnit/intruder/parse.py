@@ -0,0 +1,103 @@
+"""
+Parsing access-log lines.
+
+parse_line() is the one from find_intruder-solution.py (text in, text out).
+scan_lines() is the hot loop the workers run: same rules, but on raw bytes,
+so a chunk of the file never has to be decoded into str line by line.
+
+    2025-11-15T22:58:01Z  192.168.0.10   /login        200
+"""
+
+from datetime import datetime
+
+
+def parse_line(line):
+    """
+    Returns (time_str, ip, endpoint, status_int) or None if malformed.
+    """
+    line = line.strip()
+    if not line:
+        return None
+
+    parts = line.split()
+    if len(parts) < 4:
+        return None
+
+    ts_str, ip, endpoint, status_str = parts[:4]
+
+    # "2025-11-15T22:58:01Z" -> "22:58:01"
+    try:
+        date_part, time_part = ts_str.split("T")
+        time_part = time_part.rstrip("Z")
+    except ValueError:
+        return None
+
+    try:
+        status = int(status_str)
+    except ValueError:
+        return None
+
+    return time_part, ip, endpoint, status
+
+
+def time_in_window(time_str, start_str, end_str):
+    """
+    Compare HH:MM:SS strings lexicographically.
+    Works because the format is fixed-width.
+    """
+    return start_str <= time_str <= end_str
+
+
+def window_key(value):
+    """
+    Normalize a window bound for scan_lines():
+
+        "22:55:00"                                  -> "22:55:00" (any day)
+        "2025-11-15T22:55:00", "2025-11-15 22:55"   -> "2025-11-15T22:55:00"
+
+    Full datetimes compare as fixed-width strings, so a window may cross midnight.
+    Raises ValueError for anything else.
+    """
+    value = value.strip().rstrip("Z")
+    if "T" not in value and " " not in value:
+        return datetime.strptime(value, "%H:%M:%S").strftime("%H:%M:%S")
+    return datetime.fromisoformat(value).strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def scan_lines(data, window_start, window_end, sensitive, state):
+    """
+    Parse a block of raw log bytes and add every line inside the window to
+    `state` (a SetState or CompactState from state.py): the IP, the endpoint,
+    and whether it was a 200 on a sensitive endpoint. Returns state.
+
+    window_start/window_end are b"HH:MM:SS" (that time on any day, like the
+    original script) or full b"YYYY-MM-DDTHH:MM:SS" datetimes (see window_key()).
+    sensitive is a set of bytes. IPs and endpoints are passed on as bytes.
+    Malformed lines are skipped exactly like parse_line() skips them.
+    """
+    full_datetime = len(window_start) > 8
+    add = state.add
+
+    for line in data.split(b"\n"):
+        parts = line.split(None, 4)  # the 5th part (if any) is ignored, like parts[:4]
+        if len(parts) < 4:
+            continue
+        ts, ip, endpoint, status = parts[0], parts[1], parts[2], parts[3]
+
+        date_and_time = ts.split(b"T")
+        if len(date_and_time) != 2:
+            continue
+        if full_datetime:
+            time_part = ts.rstrip(b"Z")  # b"2025-11-15T22:58:01"
+        else:
+            time_part = date_and_time[1].rstrip(b"Z")  # b"22:58:01"
+        if not window_start <= time_part <= window_end:
+            continue
+        try:
+            status = int(status)
+        except ValueError:
+            continue
+
+        add(ip, endpoint, status == 200 and endpoint in sensitive)
+
+    return state
@@ -0,0 +1,200 @@
+"""
+Rotated and compressed logs: many files in, one report out.
+
+    python -m intruder /var/log/app/                       # every access.log* in the folder
+    python -m intruder "/var/log/app/access.log.*.gz" --window-start 2025-11-15T22:55:00 ...
+
+- each file is decompressed as a stream, in READ_BYTES binary blocks
+  (gzip from the standard library, .zst with the optional zstandard package),
+  and the blocks go straight to scan_lines() -- no text-mode line iteration
+- files are spread over a process pool, one file per task
+- every file's first/last timestamps are cached in .intruder-ranges.json
+  next to it (keyed by size + mtime). Files whose range can't overlap the
+  window are skipped without being opened, so an investigation never
+  decompresses the hours it doesn't need.
+
+A file's first/last timestamps are the smallest and largest timestamp on the
+first and last line of every block, so a log that is slightly out of order
+doesn't make a file look shorter than it is.
+"""
+
+import glob
+import gzip
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+from .index import line_timestamp
+from .parse import scan_lines
+from .state import ENGINES
+
+READ_BYTES = 8 * 1024 * 1024
+RANGES_FILE = ".intruder-ranges.json"
+SKIP_SUFFIXES = (".idx", ".tmp", RANGES_FILE)
+
+
+def expand_inputs(inputs):
+    """
+    Files, directories (every access.log* inside) and glob patterns -> sorted file paths.
+    Index and cache files are never treated as logs.
+    """
+    paths = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            matches = glob.glob(os.path.join(item, "access.log*"))
+        elif glob.has_magic(item):
+            matches = glob.glob(item)
+        else:
+            matches = [item]
+        paths.update(m for m in matches if not m.endswith(SKIP_SUFFIXES) and not os.path.isdir(m))
+    return sorted(paths)
+
+
+def check_codecs(paths):
+    # fail before any work starts, not in a worker halfway through
+    if any(p.endswith(".zst") for p in paths):
+        try:
+            import zstandard  # noqa: F401  (optional dependency: pip install zstandard)
+        except ImportError:
+            raise SystemExit(".zst logs need the zstandard package (pip install zstandard)")
+
+
+def open_stream(path):
+    # a binary file object that decompresses as it's read
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    if path.endswith(".zst"):
+        import zstandard
+        return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+    return open(path, "rb")
+
+
+def read_blocks(path, block_bytes=READ_BYTES):
+    # decompressed blocks that each end on a line boundary (the last one may not)
+    pending = b""
+    with open_stream(path) as f:
+        while True:
+            data = f.read(block_bytes)
+            if not data:
+                break
+            data = pending + data
+            cut = data.rfind(b"\n") + 1
+            if cut:
+                pending = data[cut:]
+                yield data[:cut]
+            else:
+                pending = data
+    if pending:
+        yield pending
+
+
+def block_range(data, first, last):
+    # widen [first, last] with the timestamps on the block's first and last line
+    head = data[:data.find(b"\n") if b"\n" in data else len(data)]
+    tail = data.rstrip(b"\r\n").rsplit(b"\n", 1)[-1]
+    for line in (head, tail):
+        ts = line_timestamp(line)
+        if ts is not None:
+            ts = ts.decode()
+            first = ts if first is None or ts < first else first
+            last = ts if last is None or ts > last else last
+    return first, last
+
+
+def scan_file(path, window_start, window_end, sensitive, engine, block_bytes=READ_BYTES):
+    # runs in a worker process: one whole file -> (state, first_ts, last_ts)
+    state = ENGINES[engine](sensitive)
+    first = last = None
+    for data in read_blocks(path, block_bytes):
+        first, last = block_range(data, first, last)
+        scan_lines(data, window_start, window_end, sensitive, state)
+    return state, first, last
+
+
+def load_ranges(directory):
+    try:
+        with open(os.path.join(directory, RANGES_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_ranges(directory, ranges):
+    path = os.path.join(directory, RANGES_FILE)
+    try:
+        with open(path + ".tmp", "w") as f:
+            json.dump(ranges, f, indent=1, sort_keys=True)
+        os.replace(path + ".tmp", path)
+    except OSError:
+        pass  # read-only log folder: the cache is an optimization, not a requirement
+
+
+def file_key(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def overlaps(first, last, window_start, window_end):
+    """
+    Can a file whose timestamps run first..last ("YYYY-MM-DDTHH:MM:SS") hold a
+    line in the window? Full-datetime windows compare directly. HH:MM:SS
+    windows (any day) compare times of day, minding files that cross midnight.
+    """
+    if len(window_start) > 8:
+        return not (last < window_start or first > window_end)
+    try:
+        first_day, last_day = date.fromisoformat(first[:10]), date.fromisoformat(last[:10])
+    except ValueError:
+        return True  # not the timestamp format we know: read the file
+    first_time, last_time = first[11:], last[11:]
+    days = (last_day - first_day).days
+    if days == 0:
+        return not (last_time < window_start or first_time > window_end)
+    if days == 1:  # first_time..midnight, then midnight..last_time
+        return window_end >= first_time or window_start <= last_time
+    return True
+
+
+def analyze_files(paths, config, workers=None, engine="compact", block_bytes=READ_BYTES):
+    """
+    -> (state, skipped): the merged per-IP state of every file that can overlap
+    the window, and the files skipped thanks to the cached ranges.
+    """
+    window_start, window_end = config.window_start, config.window_end
+    sensitive = frozenset(s.encode() for s in config.sensitive)
+    caches = {}
+    todo, skipped = [], []
+    for path in paths:
+        directory, name = os.path.split(os.path.abspath(path))
+        ranges = caches.setdefault(directory, load_ranges(directory))
+        key = file_key(path)  # taken before reading, so a growing log is rescanned next time
+        cached = ranges.get(name)
+        if cached and cached["key"] == key:
+            if cached["first"] is None or not overlaps(cached["first"], cached["last"], window_start, window_end):
+                skipped.append(path)
+                continue
+        todo.append((path, key))
+
+    total = ENGINES[engine](sensitive)
+    args = (window_start.encode(), window_end.encode(), sensitive, engine, block_bytes)
+    workers = min(workers or os.cpu_count() or 1, max(1, len(todo)))
+
+    def record(path, key, result):
+        state, first, last = result
+        total.merge(state)
+        directory, name = os.path.split(os.path.abspath(path))
+        caches[directory][name] = {"key": key, "first": first, "last": last}
+
+    if workers == 1:
+        for path, key in todo:
+            record(path, key, scan_file(path, *args))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [(path, key, pool.submit(scan_file, path, *args)) for path, key in todo]
+            for path, key, future in futures:
+                record(path, key, future.result())
+
+    for directory, ranges in caches.items():
+        save_ranges(directory, ranges)
+    return total, skipped
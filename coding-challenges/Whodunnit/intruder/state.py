@@ -0,0 +1,296 @@
+"""
+Per-IP state: which endpoints each IP hit, and which sensitive ones gave a 200.
+
+Both engines have the same interface (add / merge / suspects), so the
+analyzer can use either and print the same report:
+
+    SetState      the original layout: dict[ip, set[endpoint]] + dict[ip, set[endpoint]]
+                  one Python set of strings per IP -- gigabytes at millions of IPs
+    CompactState  one dict[int, int] entry per IP:
+                  - the IP packed into an int (IPv4: 32 bits, IPv6: 128 bits + a tag bit)
+                  - endpoints interned to small IDs, kept as bits of an int (a bitset)
+                  - one flag bit per sensitive endpoint that returned 200, in the low bits
+                  - a Sparse (sorted array of IDs) instead when the bitset would be
+                    mostly zeros: a few endpoints with high IDs
+                  - past ENDPOINT_CAP unique endpoints, a HyperLogLog sketch instead
+
+          value = ...0000 1 0 1 1 0 | 0 1
+                          \\_ endpoint IDs _/  \\_ 200 on /transfer? /admin? (sorted)
+
+Endpoint IDs are handed out in first-seen order, so the common endpoints get
+the low bits and most bitsets fit in one small int. An IP that only hit
+endpoints first seen late in the log (high IDs) stays a short Sparse array,
+so no IP's size depends on how many endpoints the whole log has.
+"""
+
+import hashlib
+import math
+import socket
+from array import array
+from bisect import bisect_left
+
+# exact counts up to here; the bitset is then 1 KB, as big as the sketch that replaces it
+ENDPOINT_CAP = 8192
+SKETCH_P = 10  # 2**10 one-byte registers, ~3% standard error
+# a bitset whose highest ID is T costs ~T/7.5 + 24 bytes, a Sparse ~4 per ID + 128:
+# stay a bitset while T <= SPARSE_BASE_BITS + SPARSE_ID_BITS * (number of IDs)
+SPARSE_BASE_BITS = 780
+SPARSE_ID_BITS = 30
+IPV6_TAG = 1 << 128
+
+
+class SetState:
+    def __init__(self, sensitive):
+        self.sensitive = sensitive
+        self.endpoints_by_ip = {}  # ip -> set of endpoints
+        self.sensitive_hits_by_ip = {}  # ip -> set of sensitive endpoints that returned 200
+
+    def __len__(self):
+        return len(self.endpoints_by_ip)
+
+    def add(self, ip, endpoint, sensitive_200):
+        endpoints = self.endpoints_by_ip.get(ip)
+        if endpoints is None:
+            endpoints = self.endpoints_by_ip[ip] = set()
+        endpoints.add(endpoint)
+        if sensitive_200:
+            hits = self.sensitive_hits_by_ip.get(ip)
+            if hits is None:
+                hits = self.sensitive_hits_by_ip[ip] = set()
+            hits.add(endpoint)
+
+    def merge(self, other):
+        for mine, theirs in ((self.endpoints_by_ip, other.endpoints_by_ip),
+                             (self.sensitive_hits_by_ip, other.sensitive_hits_by_ip)):
+            for ip, endpoints in theirs.items():
+                seen = mine.get(ip)
+                if seen is None:
+                    mine[ip] = endpoints
+                else:
+                    seen |= endpoints
+        return self
+
+    def suspects(self, threshold):
+        # [(ip, unique_count, sensitive_paths)] with str values, sorted like the original report
+        suspects = []
+        for ip, endpoints in self.endpoints_by_ip.items():
+            hits = self.sensitive_hits_by_ip.get(ip)
+            if len(endpoints) > threshold and hits:
+                suspects.append((ip.decode(), len(endpoints), {h.decode() for h in hits}))
+        return sorted(suspects)
+
+
+class Sketch:
+    """
+    HyperLogLog: estimates how many distinct endpoints an IP hit in 1 KB,
+    however many there are. `flags` carries the sensitive-200 bits along.
+    """
+
+    __slots__ = ("registers", "flags")
+
+    def __init__(self, flags=0):
+        self.registers = bytearray(1 << SKETCH_P)
+        self.flags = flags
+
+    def add(self, endpoint_hash):
+        index = endpoint_hash >> (64 - SKETCH_P)
+        rest = endpoint_hash & ((1 << (64 - SKETCH_P)) - 1)
+        rank = (64 - SKETCH_P) - rest.bit_length() + 1  # position of the first 1 bit
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        self.flags |= other.flags
+
+    def count(self):
+        m = len(self.registers)
+        estimate = 0.7213 / (1 + 1.079 / m) * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)  # small range: linear counting is more accurate
+        return round(estimate)
+
+
+def pack_ip(ip):
+    """
+    b"192.168.0.10" -> 3232235530; IPv6 -> its 128-bit value + IPV6_TAG.
+    Anything that wouldn't print back exactly as written (leading zeros,
+    upper-case or uncompressed IPv6, hostnames) stays as bytes, so the
+    report never changes an address's spelling.
+    """
+    text = ip.decode(errors="replace")
+    family = socket.AF_INET6 if ":" in text else socket.AF_INET
+    try:
+        packed = socket.inet_pton(family, text)
+    except OSError:
+        return ip
+    if family == socket.AF_INET:
+        return int.from_bytes(packed, "big")  # inet_pton only accepts the canonical form
+    if socket.inet_ntop(family, packed) != text:
+        return ip
+    return int.from_bytes(packed, "big") | IPV6_TAG
+
+
+def unpack_ip(key):
+    if isinstance(key, bytes):
+        return key.decode()
+    if key & IPV6_TAG:
+        return socket.inet_ntop(socket.AF_INET6, (key ^ IPV6_TAG).to_bytes(16, "big"))
+    return socket.inet_ntop(socket.AF_INET, key.to_bytes(4, "big"))
+
+
+class Sparse:
+    """
+    An IP's endpoints as a sorted array of IDs. Used when a bitset would be
+    mostly zeros: an IP that hit one endpoint with ID 100,000 would otherwise
+    carry a 12 KB int for a single bit. `flags` are the sensitive-200 bits.
+    """
+
+    __slots__ = ("ids", "flags")
+
+    def __init__(self, ids, flags=0):
+        self.ids = array("I", ids)
+        self.flags = flags
+
+    def add(self, endpoint_id):
+        # -> True if the ID was new
+        ids = self.ids
+        i = bisect_left(ids, endpoint_id)
+        if i < len(ids) and ids[i] == endpoint_id:
+            return False
+        ids.insert(i, endpoint_id)
+        return True
+
+
+class CompactState:
+    def __init__(self, sensitive, cap=ENDPOINT_CAP):
+        self.sensitive = sorted(sensitive)
+        self.flag_bits = {endpoint: 1 << i for i, endpoint in enumerate(self.sensitive)}
+        self.shift = len(self.sensitive)  # endpoint bits start above the flag bits
+        self.low = (1 << self.shift) - 1
+        self.cap = cap
+        # below this ID a bitset can neither pass the cap nor lose to a Sparse
+        self.check_from = min(cap, SPARSE_BASE_BITS - self.shift)
+        self.endpoint_ids = {}  # endpoint -> ID
+        self.endpoints = []  # ID -> endpoint
+        self.hashes = []  # ID -> 64-bit hash, for sketches (same in every process)
+        self.ips = {}  # packed ip -> bitset int, a Sparse, or a Sketch past the cap
+
+    def __len__(self):
+        return len(self.ips)
+
+    def intern(self, endpoint):
+        endpoint_id = self.endpoint_ids.get(endpoint)
+        if endpoint_id is None:
+            endpoint_id = self.endpoint_ids[endpoint] = len(self.endpoints)
+            self.endpoints.append(endpoint)
+            self.hashes.append(int.from_bytes(hashlib.blake2b(endpoint, digest_size=8).digest(), "big"))
+        return endpoint_id
+
+    def add(self, ip, endpoint, sensitive_200):
+        key = pack_ip(ip)
+        endpoint_id = self.intern(endpoint)
+        flag = self.flag_bits[endpoint] if sensitive_200 else 0
+        value = self.ips.get(key, 0)
+        if type(value) is int:
+            value |= (1 << (endpoint_id + self.shift)) | flag
+            if endpoint_id >= self.check_from:
+                count = (value >> self.shift).bit_count()
+                if count > self.cap or not self.fits_bitset(value.bit_length() - 1 - self.shift, count):
+                    value = self.build(*self.split(value))
+            self.ips[key] = value
+        elif type(value) is Sparse:
+            value.flags |= flag
+            if value.add(endpoint_id):
+                count = len(value.ids)
+                if count > self.cap or self.fits_bitset(value.ids[-1], count):
+                    self.ips[key] = self.build(*self.split(value))
+        else:
+            value.add(self.hashes[endpoint_id])
+            value.flags |= flag
+
+    def fits_bitset(self, top_id, count):
+        # is a bitset up to top_id no bigger than a Sparse holding `count` IDs?
+        return top_id + self.shift <= SPARSE_BASE_BITS + SPARSE_ID_BITS * count
+
+    def split(self, value):
+        # bitset int or Sparse -> (flags, sorted endpoint IDs)
+        if type(value) is int:
+            return value & self.low, list(self.ids(value >> self.shift))
+        return value.flags, list(value.ids)
+
+    def build(self, flags, ids):
+        # (flags, sorted endpoint IDs) -> the smallest exact form, or a Sketch past the cap
+        if len(ids) > self.cap:
+            return self.sketch(flags, ids)
+        if not ids or self.fits_bitset(ids[-1], len(ids)):
+            bits = 0
+            for endpoint_id in ids:
+                bits |= 1 << endpoint_id
+            return (bits << self.shift) | flags
+        return Sparse(ids, flags)
+
+    def sketch(self, flags, ids):
+        sketch = Sketch(flags)
+        for endpoint_id in ids:
+            sketch.add(self.hashes[endpoint_id])
+        return sketch
+
+    def to_sketch(self, value):
+        return self.sketch(*self.split(value))
+
+    @staticmethod
+    def ids(bits):
+        # the positions of the 1 bits, lowest first
+        while bits:
+            low = bits & -bits
+            yield low.bit_length() - 1
+            bits ^= low
+
+    def merge(self, other):
+        # other's endpoint IDs were handed out in its own order: translate them to ours
+        mapping = [self.intern(endpoint) for endpoint in other.endpoints]
+        same_ids = mapping == list(range(len(mapping)))
+        for key, value in other.ips.items():
+            if type(value) is not Sketch and not same_ids:
+                flags, ids = self.split(value)
+                value = self.build(flags, sorted(mapping[endpoint_id] for endpoint_id in ids))
+            mine = self.ips.get(key)
+            if mine is None:
+                self.ips[key] = value
+            elif type(mine) is Sketch or type(value) is Sketch:
+                if type(mine) is not Sketch:
+                    mine = self.ips[key] = self.to_sketch(mine)
+                if type(value) is not Sketch:
+                    value = self.to_sketch(value)
+                mine.merge(value)
+            elif type(mine) is int and type(value) is int:
+                # both fit as bitsets, so their union does too; only the cap can be crossed
+                mine |= value
+                if (mine >> self.shift).bit_count() > self.cap:
+                    mine = self.to_sketch(mine)
+                self.ips[key] = mine
+            else:
+                mine_flags, mine_ids = self.split(mine)
+                flags, ids = self.split(value)
+                self.ips[key] = self.build(mine_flags | flags, sorted(set(mine_ids).union(ids)))
+        return self
+
+    def suspects(self, threshold):
+        # same list as SetState.suspects(); counts past the cap are HyperLogLog estimates
+        suspects = []
+        for key, value in self.ips.items():
+            if type(value) is int:
+                count, flags = (value >> self.shift).bit_count(), value & self.low
+            elif type(value) is Sparse:
+                count, flags = len(value.ids), value.flags
+            else:
+                count, flags = value.count(), value.flags
+            if count > threshold and flags:
+                paths = {self.sensitive[i].decode() for i in self.ids(flags)}
+                suspects.append((unpack_ip(key), count, paths))
+        return sorted(suspects)
+
+
+ENGINES = {"compact": CompactState, "sets": SetState}
@@ -0,0 +1,108 @@
+"""
+Follow mode: the sliding window's counters, late lines, and tail() across
+rotation and truncation.
+"""
+
+import os
+import time
+
+from intruder.follow import SlidingWindow, TimestampParser, feed, format_alert, tail
+
+SENSITIVE = frozenset({b"/transfer", b"/admin"})
+
+
+def window(seconds=600, threshold=2):
+    return SlidingWindow(seconds, threshold, SENSITIVE)
+
+
+def test_alerts_once_when_the_rule_matches():
+    w = window()
+    assert w.add(0, b"ip", b"/a", 200) is None
+    assert w.add(1, b"ip", b"/transfer", 200) is None  # 2 endpoints: not more than 2
+    alert = w.add(2, b"ip", b"/b", 404)
+
+    assert alert == (b"ip", 3, {b"/transfer"})
+    assert w.add(3, b"ip", b"/c", 200) is None  # already alerted
+
+
+def test_old_events_expire_and_the_ip_can_alert_again():
+    w = window(seconds=60)
+    for second, endpoint in enumerate([b"/a", b"/b", b"/transfer"]):
+        w.add(second, b"ip", endpoint, 200)
+
+    w.add(100, b"other", b"/x", 200)  # everything above is now older than 60 s
+
+    assert b"ip" not in w.endpoints and b"ip" not in w.sensitive_hits
+    assert [e[0] for e in w.events] == [100]
+    for second, endpoint in enumerate([b"/a", b"/b"], 101):
+        assert w.add(second, b"ip", endpoint, 200) is None
+    assert w.add(103, b"ip", b"/admin", 200) == (b"ip", 3, {b"/admin"})
+
+
+def test_late_event_expires_on_its_own_timestamp():
+    w = window(seconds=60)
+    w.add(100, b"a", b"/x", 200)
+    w.add(130, b"b", b"/y", 200)
+    w.add(110, b"a", b"/late", 200)  # arrives after 130, still inside the window
+
+    assert [e[0] for e in w.events] == [100, 110, 130]
+    w.add(171, b"b", b"/z", 200)  # cutoff 111: both of a's events are gone
+
+    assert b"a" not in w.endpoints
+    assert [e[0] for e in w.events] == [130, 171]
+
+
+def test_too_late_event_is_dropped():
+    w = window(seconds=60)
+    w.add(100, b"a", b"/x", 200)
+
+    assert w.add(39, b"b", b"/y", 200) is None
+    assert b"b" not in w.endpoints and len(w.events) == 1
+
+
+def test_feed_skips_malformed_lines_and_formats_alerts():
+    lines = [
+        b"2025-11-15T23:00:00Z  10.0.0.7  /a  200",
+        b"2025-11-15T23:00:01Z  10.0.0.7  /b",
+        b"2025-11-15 23:00:02   10.0.0.7  /c  200",
+        b"2025-11-15T23:00:03Z  10.0.0.7  /d  OK",
+        b"not-a-timeTZ  10.0.0.7  /e  200",
+        b"2025-11-15T23:00:04Z  10.0.0.7  /transfer  200",
+        b"2025-11-15T23:00:05Z  10.0.0.7  /f  200  extra",
+    ]
+    alerts = list(feed(window(), lines, TimestampParser()))
+
+    assert [format_alert(ts, alert) for ts, alert in alerts] == [
+        "ALERT 2025-11-15T23:00:05 10.0.0.7 (3 endpoints, accessed /transfer with 200)"
+    ]
+
+
+def follow(path):
+    deadline = time.monotonic() + 5  # a broken tail() fails the test instead of hanging it
+    return tail(str(path), from_start=True, poll=0.01, stop=lambda: time.monotonic() > deadline)
+
+
+def test_tail_follows_rotation_and_keeps_the_last_partial_line(tmp_path):
+    log = tmp_path / "access.log"
+    log.write_bytes(b"one\ntwo")  # the writer hasn't finished "two" yet...
+    lines = follow(log)
+    assert next(lines) == [b"one"]
+
+    os.rename(log, tmp_path / "access.log.1")  # ...and never will: the log is rotated
+    log.write_bytes(b"three\n")
+
+    assert next(lines) == [b"two"]
+    assert next(lines) == [b"three"]
+
+
+def test_tail_restarts_after_truncation(tmp_path):
+    log = tmp_path / "access.log"
+    log.write_bytes(b"one\ntwo\n")
+    lines = follow(log)
+    assert next(lines) == [b"one", b"two"]
+
+    with open(log, "wb") as f:  # copytruncate, then a new line
+        f.write(b"3\n")
+
+    assert next(lines) == [b"3"]
+
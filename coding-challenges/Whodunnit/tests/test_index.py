@@ -0,0 +1,112 @@
+"""
+SparseIndex: the spans it hands out must hold every line of the window,
+and incremental updates must end up where a fresh build would.
+"""
+
+from datetime import datetime, timedelta
+
+from intruder.analyze import Config, analyze
+from intruder.index import SparseIndex, spans_for
+from intruder.parse import scan_lines
+from intruder.state import SetState
+
+SENSITIVE = frozenset({b"/transfer", b"/admin"})
+START = datetime(2025, 11, 15, 0, 0, 0)
+
+
+def log_lines(first, count):
+    # one line a minute from START + first minutes; IP and endpoint vary with the minute
+    for minute in range(first, first + count):
+        ts = (START + timedelta(minutes=minute)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        yield f"{ts}  10.0.{minute % 7}.1  /e{minute % 13}  200\n".encode()
+
+
+def write_log(path, first=0, count=2 * 24 * 60):
+    path.write_bytes(b"".join(log_lines(first, count)))
+    return str(path)
+
+
+def read_spans(path, spans, since, until):
+    state = SetState(SENSITIVE)
+    with open(path, "rb") as f:
+        for start, end in spans:
+            f.seek(start)
+            scan_lines(f.read(end - start), since.encode(), until.encode(), SENSITIVE, state)
+    return state
+
+
+def test_spans_cover_the_window_and_skip_the_rest(tmp_path):
+    path = write_log(tmp_path / "access.log")
+    since, until = "2025-11-15T23:55:00", "2025-11-16T00:05:00"
+
+    index = SparseIndex(path, every=100).update()
+    spans = index.spans(since, until)
+    full = read_spans(path, [(0, index.end)], since, until)
+
+    assert read_spans(path, spans, since, until).endpoints_by_ip == full.endpoints_by_ip
+    assert sum(end - start for start, end in spans) <= 2 * 100 * 60  # two blocks, not the file
+    assert sum(len(e) for e in full.endpoints_by_ip.values()) == 11
+
+
+def test_window_outside_the_log_reads_nothing(tmp_path):
+    path = write_log(tmp_path / "access.log")
+
+    assert SparseIndex(path, every=100).update().spans("2025-12-01T00:00:00", "2025-12-01T01:00:00") == []
+
+
+def test_update_only_scans_the_new_part(tmp_path):
+    log = tmp_path / "access.log"
+    path = write_log(log, count=1000)
+    SparseIndex(path, every=100).update()
+
+    with open(path, "ab") as f:
+        f.write(b"".join(log_lines(1000, 500)))
+    index = SparseIndex(path, every=100).update()
+    fresh = SparseIndex(path, every=100, path=str(tmp_path / "fresh.idx")).update()
+
+    assert index.blocks == fresh.blocks and index.end == fresh.end
+    assert index.scanned < log.stat().st_size // 2
+
+
+def test_rotated_log_is_reindexed(tmp_path):
+    log = tmp_path / "access.log"
+    path = write_log(log, count=1000)
+    SparseIndex(path, every=100).update()
+
+    write_log(log, first=5000, count=1200)  # different first bytes, bigger file
+    index = SparseIndex(path, every=100).update()
+
+    assert index.scanned == log.stat().st_size
+    assert index.blocks[0][1] == "2025-11-18T11:20:00"
+
+
+def test_trailing_partial_line_is_always_read(tmp_path):
+    log = tmp_path / "access.log"
+    path = write_log(log, count=300)
+    with open(path, "ab") as f:
+        f.write(b"2025-11-15T05:00:00Z  10.9.9.9  /late")  # still being written
+
+    index = SparseIndex(path, every=100).update()
+
+    assert index.end < log.stat().st_size
+    assert index.spans("2025-11-15T05:00:00", "2025-11-15T05:00:00")[-1] == (index.end, log.stat().st_size)
+
+
+def test_unwritable_index_is_still_used(tmp_path):
+    path = write_log(tmp_path / "access.log", count=300)
+
+    index = SparseIndex(path, every=100, path=str(tmp_path / "missing-dir" / "access.log.idx")).update()
+
+    assert len(index.blocks) == 3
+    assert index.spans("2025-11-15T00:00:00", "2025-11-15T00:10:00") == [(0, index.blocks[1][0])]
+
+
+def test_analyze_with_spans_matches_a_full_scan(tmp_path):
+    path = write_log(tmp_path / "access.log")
+    config = Config(window_start="2025-11-15T23:55:00", window_end="2025-11-16T00:05:00", threshold=0)
+    spans = spans_for(path, config.window_start, config.window_end, every=100)
+
+    indexed = analyze(path, config, workers=1, spans=spans, engine="sets")
+    full = analyze(path, config, workers=1, engine="sets")
+
+    assert indexed.endpoints_by_ip == full.endpoints_by_ip
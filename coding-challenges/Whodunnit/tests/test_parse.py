@@ -0,0 +1,108 @@
+"""
+scan_lines() (bytes, the hot loop) must agree with parse_line() (the
+original text parser) on every line, malformed ones included, and the
+parallel analyzer must print exactly what find_intruder-solution.py prints.
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from intruder.analyze import Config, analyze, report, split_ranges
+from intruder.parse import parse_line, scan_lines, time_in_window, window_key
+from intruder.state import CompactState, SetState
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+WHODUNNIT = os.path.dirname(HERE)
+SENSITIVE = frozenset({b"/transfer", b"/admin"})
+
+LOG = """\
+2025-11-15T22:54:59Z  10.0.0.1   /a         200
+2025-11-15T22:55:00Z  10.0.0.1   /b         200
+2025-11-15T23:05:00Z  10.0.0.1   /c         200
+2025-11-15T23:05:01Z  10.0.0.1   /d         200
+2025-11-15T23:00:00Z  10.0.0.2   /transfer  200
+2025-11-15T23:00:01Z  10.0.0.2   /admin     403
+2025-11-15T23:00:02Z  10.0.0.2   /x         200   extra columns are ignored
+2025-11-15T23:00:03Z  10.0.0.2   /y         abc
+2025-11-15 23:00:04   10.0.0.2   /z         200
+2025-11-15T23:00:05ZT 10.0.0.2   /w         200
+2025-11-15T23:00:06Z  10.0.0.2   /v
+   2025-11-15T23:00:07Z  10.0.0.3   /admin  200\r
+
+2025-11-16T22:59:00Z  10.0.0.3   /u         200
+"""
+
+
+def reference(text, start, end):
+    # the original script's loop, into a SetState
+    state = SetState(SENSITIVE)
+    for line in text.splitlines():
+        parsed = parse_line(line)
+        if parsed is None:
+            continue
+        time_str, ip, endpoint, status = parsed
+        if time_in_window(time_str, start, end):
+            ip, endpoint = ip.encode(), endpoint.encode()
+            state.add(ip, endpoint, status == 200 and endpoint in SENSITIVE)
+    return state
+
+
+@pytest.mark.parametrize("engine", [SetState, CompactState])
+@pytest.mark.parametrize("start,end", [("22:55:00", "23:05:00"), ("00:00:00", "23:59:59"), ("23:00:02", "23:00:02")])
+def test_scan_lines_matches_parse_line(engine, start, end):
+    expected = reference(LOG, start, end)
+    state = scan_lines(LOG.encode(), start.encode(), end.encode(), SENSITIVE, engine(SENSITIVE))
+
+    assert state.suspects(0) == expected.suspects(0)
+    assert len(state) == len(expected)
+
+
+def test_window_edges_are_inclusive():
+    state = scan_lines(LOG.encode(), b"22:55:00", b"23:05:00", SENSITIVE, SetState(SENSITIVE))
+
+    assert state.endpoints_by_ip[b"10.0.0.1"] == {b"/b", b"/c"}  # 22:54:59 and 23:05:01 are out
+    assert state.endpoints_by_ip[b"10.0.0.2"] == {b"/transfer", b"/admin", b"/x"}
+    assert state.sensitive_hits_by_ip[b"10.0.0.2"] == {b"/transfer"}  # the 403 doesn't count
+    assert state.sensitive_hits_by_ip[b"10.0.0.3"] == {b"/admin"}  # leading spaces, CRLF
+
+
+def test_full_datetime_window_crosses_midnight():
+    text = b"".join(
+        b"%s  10.0.0.9  /e%d  200\n" % (ts, i)
+        for i, ts in enumerate([b"2025-11-15T23:58:00Z", b"2025-11-16T00:02:00Z", b"2025-11-16T23:59:00Z"])
+    )
+    start, end = window_key("2025-11-15 23:55"), window_key("2025-11-16T00:05:00")
+    state = scan_lines(text, start.encode(), end.encode(), SENSITIVE, SetState(SENSITIVE))
+
+    assert (start, end) == ("2025-11-15T23:55:00", "2025-11-16T00:05:00")
+    assert state.endpoints_by_ip[b"10.0.0.9"] == {b"/e0", b"/e1"}
+
+
+def test_window_key_rejects_garbage():
+    assert window_key("22:55:00") == "22:55:00"
+    with pytest.raises(ValueError):
+        window_key("22h55")
+
+
+def test_split_ranges_end_on_line_boundaries(tmp_path):
+    path = tmp_path / "access.log"
+    path.write_bytes(LOG.encode())
+    ranges = split_ranges(str(path), chunk_bytes=50)
+    data = path.read_bytes()
+
+    assert ranges[0][0] == 0 and ranges[-1][1] == len(data)
+    assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+    assert all(data[end - 1:end] == b"\n" for _, end in ranges)
+
+
+@pytest.mark.parametrize("engine", ["compact", "sets"])
+def test_analyze_prints_what_the_original_script_prints(engine):
+    original = subprocess.run([sys.executable, "find_intruder-solution.py"], cwd=WHODUNNIT,
+                              capture_output=True, text=True, check=True).stdout
+    # many small ranges, so merging is exercised even on the small sample log
+    state = analyze(os.path.join(WHODUNNIT, "access.log"), Config(), workers=1, chunk_bytes=200, engine=engine)
+
+    assert report(state.suspects(Config().threshold)) == original.strip()
@@ -0,0 +1,97 @@
+"""
+Rule engine: malformed rule files fail with the rule's name, and metrics
+(burst especially) count what they say they count.
+"""
+
+import json
+import os
+
+import pytest
+
+from intruder.rules import RuleSet, load_rules, main
+
+WHODUNNIT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def rule(*conditions, **extra):
+    return {"name": "r", "when": list(conditions), **extra}
+
+
+@pytest.mark.parametrize("spec,message", [
+    (rule({"metric": "nope", "value": 1}), "unknown metric 'nope'"),
+    (rule({"metric": "requests", "op": "=>", "value": 1}), "unknown op '=>'"),
+    (rule({"metric": "requests"}), "'value'"),
+    (rule(), "needs at least one condition"),
+    ({"name": "r"}, "'when'"),
+    (rule({"metric": "status_count", "class": "4x", "value": 1}), "\"class\": \"4xx\""),
+    (rule({"metric": "status_ratio", "value": 0.5}), "\"class\": \"4xx\""),
+    (rule({"metric": "endpoint_status", "value": 1}), "non-empty \"endpoints\""),
+    (rule({"metric": "burst", "class": "4xx", "seconds": 0, "value": 1}), "\"seconds\" must be positive"),
+    (rule({"metric": "requests", "value": 1}, window=["22:55:00"]), "rule 'r'"),
+])
+def test_malformed_rules_name_the_rule(spec, message):
+    with pytest.raises(ValueError) as exc:
+        RuleSet([spec])
+
+    assert str(exc.value).startswith("rule 'r': ")
+    assert message in str(exc.value)
+
+
+def test_unnamed_rules_are_numbered():
+    with pytest.raises(ValueError, match="^rule 'rule-2': "):
+        RuleSet([rule({"metric": "requests", "value": 1}), {"when": [{"metric": "x", "value": 1}]}])
+
+
+def test_cli_exits_with_the_error(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps({"rules": [rule({"metric": "nope", "value": 1})]}))
+
+    with pytest.raises(SystemExit, match="unknown metric"):
+        main([str(path), os.path.join(WHODUNNIT, "access.log")])
+
+
+def test_sample_rules_find_the_intruder():
+    rule_set = load_rules(os.path.join(WHODUNNIT, "rules.json"))
+    with open(os.path.join(WHODUNNIT, "access.log"), encoding="utf-8") as f:
+        report = rule_set.scan(f).report()
+
+    assert report.splitlines()[:2] == [
+        "[whodunnit] 1 IP(s)",
+        "- 192.168.0.77 (unique_endpoints=8, endpoint_status=1 (/transfer))",
+    ]
+
+
+def test_rules_with_one_window_share_aggregations():
+    specs = [rule({"metric": "unique_endpoints", "value": n}, name=f"r{n}") for n in range(50)]
+    specs.append(rule({"metric": "status_ratio", "class": "5xx", "value": 0.5}, name="ratio"))
+
+    assert RuleSet(specs).aggregation_count() == 3  # endpoints, statuses, requests
+
+
+def burst(lines, **condition):
+    spec = {"metric": "burst", "class": "4xx", "seconds": 60, "value": 1, **condition}
+    rule_set = RuleSet([rule(spec)]).scan(lines)
+    _, measure, _, _ = rule_set.rules[0].conditions[0]
+    return {ip: measure(ip)[0] for ip in rule_set.windows[("00:00:00", "23:59:59")].ips()}
+
+
+def test_burst_does_not_add_up_the_same_minute_on_different_days():
+    lines = [f"2025-11-{day:02}T12:00:{s:02}Z  10.0.0.1  /x  404" for day in range(1, 11) for s in (0, 30)]
+
+    assert burst(lines) == {"10.0.0.1": 2}
+
+
+def test_burst_across_a_minute_boundary_is_found():
+    lines = [f"2025-11-15T13:0{(55 + i) // 60}:{(55 + i) % 60:02}Z  10.0.0.2  /y  404" for i in range(20)]
+    lines.append("2025-11-15T13:02:30Z  10.0.0.2  /y  200")  # not a 4xx
+
+    assert burst(lines) == {"10.0.0.2": 20}
+
+
+def test_burst_window_is_half_open_and_order_free():
+    times = ["10:00:00", "10:00:59", "10:01:00", "10:00:30"]  # 10:00:00 and 10:01:00 are 60 s apart
+    lines = [f"2025-11-15T{t}Z  10.0.0.3  /z  403" for t in times]
+
+    assert burst(lines) == {"10.0.0.3": 3}
+    assert burst(lines, seconds=61) == {"10.0.0.3": 4}
+    assert burst(lines, status=404) == {}
@@ -0,0 +1,117 @@
+"""
+Many files in, one report out: input expansion, gzip streaming, and the
+cached time ranges that let whole files be skipped (overlaps()).
+"""
+
+import gzip
+import json
+import os
+
+import pytest
+
+from intruder.analyze import Config
+from intruder.sources import RANGES_FILE, analyze_files, expand_inputs, overlaps, read_blocks
+
+SENSITIVE = frozenset({b"/transfer", b"/admin"})
+
+
+@pytest.mark.parametrize("first,last,start,end,expected", [
+    # one day: plain time-of-day comparison
+    ("2025-11-15T08:00:00", "2025-11-15T20:00:00", "22:55:00", "23:05:00", False),
+    ("2025-11-15T08:00:00", "2025-11-15T23:00:00", "22:55:00", "23:05:00", True),
+    ("2025-11-15T23:06:00", "2025-11-15T23:59:59", "22:55:00", "23:05:00", False),
+    # across midnight: 22:00 .. 24:00, then 00:00 .. 01:00
+    ("2025-11-15T22:00:00", "2025-11-16T01:00:00", "22:55:00", "23:05:00", True),
+    ("2025-11-15T22:00:00", "2025-11-16T01:00:00", "00:30:00", "00:40:00", True),
+    ("2025-11-15T23:10:00", "2025-11-16T01:00:00", "22:55:00", "23:05:00", False),
+    ("2025-11-15T23:10:00", "2025-11-16T01:00:00", "01:00:01", "23:00:00", False),
+    # two or more days hold every time of day
+    ("2025-11-15T23:10:00", "2025-11-17T00:10:00", "12:00:00", "12:01:00", True),
+    # full datetimes
+    ("2025-11-15T22:00:00", "2025-11-16T01:00:00", "2025-11-16T00:59:00", "2025-11-16T02:00:00", True),
+    ("2025-11-15T22:00:00", "2025-11-16T01:00:00", "2025-11-16T01:00:01", "2025-11-16T02:00:00", False),
+    # a timestamp format we don't know: read the file
+    ("15/Nov/2025:22:00:00", "15/Nov/2025:23:00:00", "22:55:00", "23:05:00", True),
+])
+def test_overlaps(first, last, start, end, expected):
+    assert overlaps(first, last, start, end) is expected
+
+
+def test_expand_inputs_skips_index_and_cache_files(tmp_path):
+    for name in ["access.log", "access.log.1", "access.log.2.gz", "access.log.idx", "access.log.1.tmp",
+                 "other.log", RANGES_FILE]:
+        (tmp_path / name).write_bytes(b"")
+    (tmp_path / "access.log.d").mkdir()
+
+    folder = expand_inputs([str(tmp_path)])
+    pattern = expand_inputs([str(tmp_path / "*.log*")])
+
+    assert [os.path.basename(p) for p in folder] == ["access.log", "access.log.1", "access.log.2.gz"]
+    assert [os.path.basename(p) for p in pattern] == ["access.log", "access.log.1", "access.log.2.gz", "other.log"]
+
+
+def test_read_blocks_end_on_line_boundaries(tmp_path):
+    lines = [b"2025-11-15T23:00:%02dZ  10.0.0.1  /e%d  200" % (i % 60, i) for i in range(500)]
+    path = tmp_path / "access.log.gz"
+    with gzip.open(path, "wb") as f:
+        f.write(b"\n".join(lines))  # no newline after the last line
+
+    blocks = list(read_blocks(str(path), block_bytes=1000))
+
+    assert len(blocks) > 10
+    assert all(block.endswith(b"\n") for block in blocks[:-1])
+    assert b"".join(blocks).split(b"\n") == lines
+
+
+def write_day(path, day, hours, intruder=False):
+    lines = [f"{day}T{h:02}:00:00Z  10.0.0.1  /home  200" for h in hours]
+    if intruder:
+        lines += [f"{day}T23:00:0{i}Z  10.6.6.6  /e{i}  200" for i in range(6)]
+        lines.append(f"{day}T23:01:00Z  10.6.6.6  /admin  200")
+    data = "\n".join(sorted(lines)).encode() + b"\n"
+    if path.endswith(".gz"):
+        with gzip.open(path, "wb") as f:
+            f.write(data)
+    else:
+        with open(path, "wb") as f:
+            f.write(data)
+
+
+def test_cached_ranges_skip_files_outside_the_window(tmp_path):
+    write_day(str(tmp_path / "access.log.2.gz"), "2025-11-14", range(0, 12))  # mornings only
+    write_day(str(tmp_path / "access.log.1.gz"), "2025-11-15", range(0, 24), intruder=True)
+    write_day(str(tmp_path / "access.log"), "2025-11-16", range(0, 12))
+    paths = expand_inputs([str(tmp_path)])
+    config = Config()
+
+    first, skipped_first = analyze_files(paths, config, workers=1)
+    again, skipped_again = analyze_files(paths, config, workers=1)
+
+    expected = [("10.6.6.6", 7, {"/admin"})]
+    assert first.suspects(config.threshold) == again.suspects(config.threshold) == expected
+    assert skipped_first == []
+    assert sorted(os.path.basename(p) for p in skipped_again) == ["access.log", "access.log.2.gz"]
+    ranges = json.loads((tmp_path / RANGES_FILE).read_text())
+    assert ranges["access.log.1.gz"]["first"] == "2025-11-15T00:00:00"
+
+
+def test_grown_log_is_rescanned(tmp_path):
+    path = str(tmp_path / "access.log")
+    write_day(path, "2025-11-15", range(0, 12))
+    analyze_files([path], Config(), workers=1)
+
+    write_day(path, "2025-11-15", range(0, 24), intruder=True)
+    state, skipped = analyze_files([path], Config(), workers=1)
+
+    assert skipped == []
+    assert [ip for ip, _, _ in state.suspects(5)] == ["10.6.6.6"]
+
+
+def test_unwritable_cache_is_not_an_error(tmp_path, monkeypatch):
+    path = str(tmp_path / "access.log")
+    write_day(path, "2025-11-15", range(0, 24), intruder=True)
+    monkeypatch.setattr("intruder.sources.RANGES_FILE", os.path.join("missing-dir", RANGES_FILE))
+
+    state, _ = analyze_files([path], Config(), workers=1)
+
+    assert len(state.suspects(5)) == 1
@@ -0,0 +1,106 @@
+"""
+CompactState must report exactly what SetState reports (below the cap),
+whatever mix of bitsets and sparse ID arrays it ends up using, and however
+the work was split and merged.
+"""
+
+import pickle
+import random
+
+import pytest
+
+from intruder.state import CompactState, SetState, Sketch, Sparse, pack_ip, unpack_ip
+
+SENSITIVE = frozenset({b"/transfer", b"/admin"})
+
+
+def random_events(seed, endpoints, count):
+    # a few IPs; endpoints skewed towards low IDs, with some from the whole range
+    rng = random.Random(seed)
+    names = [f"/e/{i}".encode() for i in range(endpoints)] + sorted(SENSITIVE)
+    events = []
+    for _ in range(count):
+        ip = f"10.0.0.{rng.randrange(30)}".encode()
+        if rng.random() < 0.5:
+            endpoint = rng.choice(names)
+        else:
+            endpoint = names[min(int(rng.expovariate(0.05)), len(names) - 1)]
+        events.append((ip, endpoint, endpoint in SENSITIVE and rng.random() < 0.3))
+    return events
+
+
+def fill(state, events):
+    for ip, endpoint, sensitive_200 in events:
+        state.add(ip, endpoint, sensitive_200)
+    return state
+
+
+@pytest.mark.parametrize("endpoints", [10, 3000, 50_000])
+@pytest.mark.parametrize("seed", range(5))
+def test_compact_state_matches_set_state(seed, endpoints):
+    events = random_events(seed, endpoints, 4000)
+    expected = fill(SetState(SENSITIVE), events)
+    compact = fill(CompactState(SENSITIVE), events)
+
+    for threshold in (0, 5, 50):
+        assert compact.suspects(threshold) == expected.suspects(threshold)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_merged_parts_match_one_pass(seed):
+    events = random_events(seed, 20_000, 4000)
+    expected = fill(SetState(SENSITIVE), events)
+    # each part interns endpoints in its own order, so merge() has to translate IDs
+    parts = [fill(CompactState(SENSITIVE), events[i::3]) for i in range(3)]
+    random.Random(seed).shuffle(parts)
+    merged = CompactState(SENSITIVE)
+    for part in parts:
+        merged.merge(pickle.loads(pickle.dumps(part)))  # as if it came back from a worker
+
+    assert merged.suspects(0) == expected.suspects(0)
+
+
+def test_high_endpoint_ids_stay_small():
+    state = CompactState(SENSITIVE)
+    for i in range(100_000):
+        state.intern(f"/static/{i}".encode())
+
+    state.add(b"10.0.0.1", b"/static/99999", False)
+    state.add(b"10.0.0.1", b"/static/5", False)
+    state.add(b"10.0.0.1", b"/transfer", True)
+
+    value = state.ips[pack_ip(b"10.0.0.1")]
+    assert type(value) is Sparse and list(value.ids) == [5, 99999, 100000]
+    assert state.suspects(2) == [("10.0.0.1", 3, {"/transfer"})]
+
+
+def test_sparse_becomes_a_bitset_when_that_is_smaller():
+    state = CompactState(SENSITIVE)
+    for i in range(5000):
+        state.intern(f"/e/{i}".encode())
+    state.add(b"10.0.0.1", b"/e/4000", False)
+    assert type(state.ips[pack_ip(b"10.0.0.1")]) is Sparse
+
+    for i in range(0, 4000, 20):  # 200 more IDs below 4000: a 4000-bit set is now the smaller one
+        state.add(b"10.0.0.1", f"/e/{i}".encode(), False)
+
+    assert type(state.ips[pack_ip(b"10.0.0.1")]) is int
+    assert state.suspects(0) == []  # no sensitive 200
+    assert (state.ips[pack_ip(b"10.0.0.1")] >> state.shift).bit_count() == 201
+
+
+def test_past_the_cap_counts_are_estimates():
+    state = CompactState(SENSITIVE, cap=100)
+    for i in range(400):
+        state.add(b"10.0.0.1", f"/e/{i}".encode(), False)
+    state.add(b"10.0.0.1", b"/admin", True)
+
+    assert type(state.ips[pack_ip(b"10.0.0.1")]) is Sketch
+    [(ip, count, paths)] = state.suspects(5)
+    assert ip == "10.0.0.1" and paths == {"/admin"}
+    assert abs(count - 401) < 401 * 0.1
+
+
+@pytest.mark.parametrize("ip", [b"192.168.0.10", b"::1", b"2001:db8::7", b"010.0.0.1", b"2001:DB8::7", b"host.local"])
+def test_ips_print_back_as_written(ip):
+    assert unpack_ip(pack_ip(ip)) == ip.decode()
@@ -0,0 +1,207 @@
+# 🚦 admission.py (Rate limits + concurrency limit: say "not now" early and cheaply)
+#
+# Without this, one client looping on POST /todos can use every pooled DB
+# connection, and everyone else's requests queue until they time out.
+# Two checks run before a request reaches the service layer:
+#
+#   1. per-client token bucket  -> 429 Too Many Requests + Retry-After
+#      every client (its IP, or a configured API key) gets `burst` tokens that
+#      refill at `rate` per second; each request spends one (batch requests
+#      spend more)
+#   2. global concurrency limit -> 503 Service Unavailable + Retry-After
+#      at most `max_concurrency` requests (default: PGPOOL_MAX) work at once;
+#      others wait up to `admit_wait` seconds for a slot, then are shed
+#
+# Rejecting in microseconds beats accepting and failing after 30 seconds.
+#
+#   Admission(LocalLimiter(rate=50, burst=100), ConcurrencyLimit(10)).init_app(app)
+#
+# Env vars:
+#   TODO_RATE_LIMIT=50           requests/second per client (0 = no rate limit)
+#   TODO_RATE_BURST=100          bucket size: short bursts above the rate are fine
+#   TODO_RATE_BACKEND=local      local | redis (shared by all app processes, uses REDIS_URL)
+#   TODO_MAX_CONCURRENCY=        defaults to PGPOOL_MAX
+#   TODO_ADMIT_WAIT=0.1          seconds a request may wait for a free slot
+#   TODO_API_KEYS=               comma-separated X-Api-Key values that get their own bucket
+
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, g, jsonify, request
+
+from metrics import ADMISSION_REJECTED
+
+RATE_LIMIT = float(os.getenv("TODO_RATE_LIMIT", "50"))
+RATE_BURST = float(os.getenv("TODO_RATE_BURST", "100"))
+RATE_BACKEND = os.getenv("TODO_RATE_BACKEND", "local")
+MAX_CONCURRENCY = os.getenv("TODO_MAX_CONCURRENCY")
+ADMIT_WAIT = float(os.getenv("TODO_ADMIT_WAIT", "0.1"))
+API_KEYS = {k.strip() for k in os.getenv("TODO_API_KEYS", "").split(",") if k.strip()}
+
+# monitoring must keep working while we shed load
+EXEMPT = {"health", "health_pool", "health_cache", "health_statements", "metrics"}
+# long-polls mostly sleep without a DB connection; don't let them hold a slot
+NO_SLOT = {"todo_changes"}
+# tokens per request; batch endpoints do up to MAX_BATCH rows of work
+COSTS = {"create_todos_batch": 10, "update_todos_batch": 10, "delete_todos_batch": 10, "export_todos": 10}
+
+
+class LocalLimiter:
+    """
+    Token buckets in this process's memory, one per client key.
+    The least recently seen clients are forgotten past `max_clients`
+    (they come back with a full bucket, which is harmless).
+    """
+
+    def __init__(self, rate, burst, clock=time.monotonic, max_clients=100_000):
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()  # key -> (tokens, updated_at)
+        self._lock = threading.Lock()
+
+    def check(self, key, cost=1):
+        # spend `cost` tokens; returns 0.0 when allowed, else seconds until it would be
+        with self._lock:
+            now = self._clock()
+            tokens, updated_at = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated_at) * self.rate)
+            if tokens >= cost:
+                tokens -= cost
+                retry_after = 0.0
+            else:
+                retry_after = (cost - tokens) / self.rate
+            self._buckets[key] = (tokens, now)  # re-inserted = most recently seen
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+            return retry_after
+
+
+class RedisLimiter:
+    """
+    The same limits shared by every app process, kept in Redis.
+
+    Uses GCRA, the token bucket stored as one timestamp per client, inside
+    a Lua script, so check-and-spend is atomic and the clock is Redis's own.
+    `client` is a redis.Redis; LocalLimiter is the drop-in local stand-in.
+    """
+
+    SCRIPT = """
+    local rate, burst, cost = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+    local t = redis.call('TIME')
+    local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+    local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+    if tat < now then tat = now end
+    local new_tat = tat + cost / rate
+    local retry_after = new_tat - burst / rate - now
+    if retry_after > 0 then return tostring(retry_after) end
+    redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil((new_tat - now) * 1000) + 1)
+    return '0'
+    """
+
+    def __init__(self, client, rate, burst, prefix="todo-api:rate:"):
+        self.rate = rate
+        self.burst = burst
+        self.prefix = prefix
+        self._script = client.register_script(self.SCRIPT)
+
+    def check(self, key, cost=1):
+        return float(self._script(keys=[self.prefix + key], args=[self.rate, self.burst, cost]))
+
+
+class ConcurrencyLimit:
+    # at most `slots` requests inside at once; acquire() gives up after `wait` seconds
+
+    def __init__(self, slots, wait=0.1):
+        self.slots = slots
+        self.wait = wait
+        self._sem = threading.BoundedSemaphore(slots)
+        self._lock = threading.Lock()
+        self.in_use = 0
+
+    def acquire(self):
+        if not self._sem.acquire(timeout=self.wait):
+            return False
+        with self._lock:
+            self.in_use += 1
+        return True
+
+    def release(self):
+        with self._lock:
+            self.in_use -= 1
+        self._sem.release()
+
+
+class Admission:
+    def __init__(self, limiter=None, concurrency=None):
+        self.limiter = limiter          # None = no rate limit
+        self.concurrency = concurrency  # None = no concurrency limit
+
+    def init_app(self, app):
+        # hooks look the Admission up on every request, so tests can swap it
+        app.extensions["admission"] = self
+        app.before_request(_admit)
+        app.teardown_request(_release)
+        return self
+
+    def admit(self):
+        # None = go ahead; otherwise the rejection response
+        endpoint = request.endpoint
+        if endpoint in EXEMPT or endpoint is None:
+            return None
+        if self.limiter is not None:
+            retry_after = self.limiter.check(client_key(), COSTS.get(endpoint, 1))
+            if retry_after > 0:
+                return reject(429, "rate_limited", "too many requests", retry_after)
+        if self.concurrency is not None and endpoint not in NO_SLOT:
+            if not self.concurrency.acquire():
+                return reject(503, "overloaded", "server busy, try again shortly", 1)
+            g.admission_slot = self.concurrency
+        return None
+
+
+def client_key():
+    # the peer address, unless the request carries one of the configured API
+    # keys (then it follows the client across IPs). Unchecked keys are ignored:
+    # a fresh random key per request would otherwise dodge the limit and flood
+    # the bucket LRU, pushing out real clients' buckets.
+    api_key = request.headers.get("X-Api-Key")
+    if api_key and api_key in API_KEYS:
+        return f"key:{api_key}"
+    return f"ip:{request.remote_addr}"
+
+
+def reject(status, reason, message, retry_after):
+    ADMISSION_REJECTED.inc(reason)
+    resp = jsonify({"error": message})
+    resp.status_code = status
+    resp.headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
+    return resp
+
+
+def _admit():
+    return current_app.extensions["admission"].admit()
+
+
+def _release(exc):
+    # teardown runs after the response (and after a streamed body) is done
+    slot = g.pop("admission_slot", None)
+    if slot is not None:
+        slot.release()
+
+
+def admission_from_env(pool_size):
+    if RATE_LIMIT <= 0:
+        limiter = None
+    elif RATE_BACKEND == "redis":
+        import redis  # optional dependency: pip install redis
+        from cache import REDIS_URL
+        limiter = RedisLimiter(redis.Redis.from_url(REDIS_URL), RATE_LIMIT, RATE_BURST)
+    else:
+        limiter = LocalLimiter(RATE_LIMIT, RATE_BURST)
+    slots = int(MAX_CONCURRENCY) if MAX_CONCURRENCY else pool_size
+    return Admission(limiter, ConcurrencyLimit(slots, ADMIT_WAIT))
@@ -1,16 +1,121 @@
 # Flask is a micro web framework for Python, used for building web applications and APIs
 # https://flask.palletsprojects.com/en/stable/quickstart/
 
-from flask import Flask, request, jsonify
-from service import TodoService
-from repo import init_db
+import time
+
+from flask import Flask, Response, g, request, jsonify, stream_with_context
+from werkzeug.http import unquote_etag
+import compression
+from admission import admission_from_env
+from cache import cached_repo_from_env
+from changefeed import HEARTBEAT, MAX_WAIT, ChangeFeed
+from domain import ConflictError
+from export import EXPORT_FORMATS
+from metrics import HTTP_IN_FLIGHT, HTTP_REQUESTS, HTTP_SECONDS, REGISTRY, Gauge, Timed
+from serialize import dumps, json_response, todo_dicts
+from service import TodoService, decode_change_token, page_etag, parse_fields, parse_limit
+from repo import POOL_MAX, TodoRepo, connect, init_db, ping, pool_stats, statement_stats
 
 app = Flask(__name__)
-svc = TodoService()
+# Timed(...) records per-call latency of each layer for GET /metrics
+svc = Timed(TodoService(repo=Timed(cached_repo_from_env(TodoRepo()), "repo")), "service")  # TODO_CACHE=off|lru|redis
+feed = ChangeFeed(connect)  # one LISTEN connection shared by every GET /todos/changes
+
+def todo_response(todo, status=200):
+    # single-todo JSON + its ETag (send it back as If-Match to avoid lost updates)
+    resp = json_response(todo_dicts([todo])[0], status)
+    resp.headers["ETag"] = todo.etag
+    resp.last_modified = todo.updated_at
+    return resp
+
+# ---- Conditional GET: answer 304 when the client's copy is still current ----
+def is_fresh(etag, last_modified):
+    # If-None-Match wins; If-Modified-Since is only used when it is absent
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(unquote_etag(etag)[0])
+    if request.if_modified_since and last_modified:
+        # HTTP dates have whole seconds
+        return last_modified.replace(microsecond=0) <= request.if_modified_since
+    return False
+
+def not_modified(etag, last_modified):
+    resp = Response(status=304)
+    resp.headers["ETag"] = etag
+    if last_modified:
+        resp.last_modified = last_modified
+    return resp
+
+# ---- Request instrumentation (served on GET /metrics) ----
+@app.before_request
+def start_timer():
+    g.started = time.perf_counter()
+    HTTP_IN_FLIGHT.inc()
+
+@app.after_request
+def record_request(resp):
+    route = request.url_rule.rule if request.url_rule else "<unmatched>"
+    HTTP_SECONDS.observe(time.perf_counter() - g.started, route, request.method)
+    HTTP_REQUESTS.inc(route, request.method, str(resp.status_code))
+    return resp
+
+@app.teardown_request
+def stop_timer(exc):
+    HTTP_IN_FLIGHT.dec()
+
+# per-client rate limits + at most PGPOOL_MAX requests at once (see admission.py)
+admission_from_env(pool_size=POOL_MAX).init_app(app)
+
+# gzip/brotli for bodies over TODO_COMPRESS_MIN_BYTES (see compression.py)
+compression.init_app(app)
+
+def _pool_gauges():
+    stats = pool_stats(start=False) or {}
+    return {(k,): v for k, v in stats.items()}
+
+Gauge("db_pool", "Connection pool counters (see GET /health/pool)", ["stat"], fn=_pool_gauges)
+def _statement_gauges():
+    by_statement = statement_stats()["by_statement"]
+    return {(name, kind): n for name, counts in by_statement.items() for kind, n in counts.items()}
+
+Gauge("db_prepared_statements", "Prepared statement executions: hits (no parse/plan) and prepares",
+      ["statement", "result"], fn=_statement_gauges)
+Gauge("todo_changefeed", "Change feed counters (LISTEN connection, waiting clients)", ["stat"],
+      fn=lambda: {(k,): v for k, v in feed.stats().items()})
+
+@app.get("/metrics")
+def metrics():
+    return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
 
 @app.get("/health")
 def health():
-    return {"ok": True}
+    if request.args.get("deep") not in ("1", "true"):
+        return {"ok": True}
+    # deep check: borrow a pooled connection and run SELECT 1
+    try:
+        acquire_s, query_s = ping()
+    except Exception as e:
+        return jsonify({"ok": False, "db": {"ok": False, "error": str(e)}}), 503
+    return jsonify({
+        "ok": True,
+        "db": {"ok": True, "acquire_ms": round(acquire_s * 1000, 3), "query_ms": round(query_s * 1000, 3)},
+        "pool": pool_stats(),
+    })
+
+@app.get("/health/pool")
+def health_pool():
+    # connection pool counters: checkouts, waits, time spent acquiring, ...
+    return jsonify(pool_stats())
+
+@app.get("/health/statements")
+def health_statements():
+    # prepared statements: how often parse/plan was skipped (hits) vs done (prepares)
+    return jsonify(statement_stats())
+
+@app.get("/health/cache")
+def health_cache():
+    # read-through cache counters: hits, misses, evictions, ...
+    cache = getattr(svc.repo, "cache", None)
+    return jsonify(cache.stats() if cache else {"backend": "off"})
 
 @app.post("/todos")
 def create_todo():
@@ -19,7 +124,7 @@ def create_todo():
     description = data.get("description")
     try:
         todo = svc.create(title, description)
-        return jsonify(todo.to_dict()), 201
+        return todo_response(todo, 201)
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
 
@@ -27,26 +132,158 @@ def create_todo():
 def list_todos():
     is_done = request.args.get("is_done")
     q = request.args.get("q")
-    limit = int(request.args.get("limit", 50))
-    offset = int(request.args.get("offset", 0))
-    todos = svc.list(is_done=is_done, q=q, limit=limit, offset=offset)
-    return jsonify([t.to_dict() for t in todos])
+    rank = request.args.get("rank", "").lower() in ("1", "true", "yes")
+    include_archived = request.args.get("include_archived", "").lower() in ("1", "true", "yes")
+    cursor = request.args.get("cursor")
+    if cursor is not None and rank:
+        return jsonify({"error": "rank cannot be combined with cursor; use offset"}), 400
+
+    try:
+        limit = parse_limit(request.args.get("limit"))  # capped at TODO_MAX_LIMIT
+        offset = int(request.args.get("offset", 0))
+        fields = parse_fields(request.args.get("fields"))
+        if request.if_none_match or request.if_modified_since:
+            # cheap check first: only (id, updated_at) of the page's rows
+            versions = svc.list_versions(is_done=is_done, q=q, limit=limit, offset=offset,
+                                         rank=rank, cursor=cursor or None, include_archived=include_archived)
+            etag = page_etag(request.args, versions)
+            last_modified = max((v[1] for v in versions), default=None)
+            if is_fresh(etag, last_modified):
+                return not_modified(etag, last_modified)
+
+        if cursor is not None:
+            # keyset mode: ?cursor= for the first page, then ?cursor=<next_cursor>
+            todos, next_cursor = svc.list_page(is_done=is_done, q=q, limit=limit, cursor=cursor, fields=fields,
+                                               include_archived=include_archived)
+            resp = json_response({"items": todo_dicts(todos, fields), "next_cursor": next_cursor})
+        else:
+            todos = svc.list(is_done=is_done, q=q, limit=limit, offset=offset, rank=rank, fields=fields,
+                             include_archived=include_archived)
+            resp = json_response(todo_dicts(todos, fields))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    resp.headers["ETag"] = page_etag(request.args, [(t.id, t.updated_at) for t in todos])
+    if todos:
+        resp.last_modified = max(t.updated_at for t in todos)
+    if request.args.get("count", "").lower() in ("1", "true", "yes"):
+        # from the todo_stats counters, never COUNT(*); skipped for q= searches
+        total = svc.total(is_done=is_done, q=q, include_archived=include_archived)
+        if total is not None:
+            resp.headers["X-Total-Count"] = str(total)
+    return resp
+
+@app.get("/todos/stats")
+def todo_stats():
+    # total / done / open, maintained by triggers (one-row lookup)
+    stats = svc.stats()
+    return jsonify({**stats, "reconciled_at": stats["reconciled_at"].isoformat()})
+
+# ---- Change feed: long-poll or Server-Sent Events instead of polling GET /todos ----
+def poll_changes(since, limit, timeout):
+    # changes after `since`, waiting up to `timeout` seconds for the first one
+    deadline = time.monotonic() + timeout
+    while True:
+        version = feed.version  # read BEFORE the query, so a NOTIFY in between isn't missed
+        items, next_since = svc.changes(since, limit)
+        remaining = deadline - time.monotonic()
+        if items or not since or remaining <= 0:
+            return items, next_since
+        since = next_since
+        feed.wait(version, remaining)
+
+def change_events(since, limit):
+    # SSE: one `changes` event per batch; its id is the resume token (Last-Event-ID)
+    while True:
+        items, since = poll_changes(since, limit, HEARTBEAT)
+        if items:
+            yield f"id: {since}\nevent: changes\ndata: {dumps(items).decode()}\n\n"
+        else:
+            yield ": keep-alive\n\n"
+
+@app.get("/todos/changes")
+def todo_changes():
+    # ?since=<token> from the previous response (omit it to start from now)
+    since = request.args.get("since") or request.headers.get("Last-Event-ID")
+    try:
+        limit = min(max(int(request.args.get("limit", 100)), 1), 1000)
+        timeout = min(max(float(request.args.get("timeout", 25)), 0.0), MAX_WAIT)
+        if request.accept_mimetypes.best == "text/event-stream":
+            if since:
+                decode_change_token(since)  # reject a bad token now, not mid-stream
+            else:
+                _, since = svc.changes()
+            return Response(stream_with_context(change_events(since, limit)), mimetype="text/event-stream",
+                            headers={"Cache-Control": "no-cache"})
+        items, next_since = poll_changes(since, limit, timeout)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return json_response({"changes": items, "next_since": next_since})
+
+@app.get("/todos/export")
+def export_todos():
+    # streams the whole (filtered) table; nothing is built up in memory
+    fmt = request.args.get("format", "ndjson")
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"error": f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+    to_chunks, mimetype = EXPORT_FORMATS[fmt]
+    todos = svc.export(is_done=request.args.get("is_done"), q=request.args.get("q"))
+    return Response(
+        stream_with_context(to_chunks(todos)),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename=todos.{fmt}"},
+    )
+
+# ---- Batch endpoints: one request + one DB transaction for many todos ----
+@app.post("/todos:batch")
+def create_todos_batch():
+    data = request.get_json(force=True) or {}
+    try:
+        created, errors = svc.create_many(data.get("items"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return json_response({"created": todo_dicts(created), "errors": errors}, 201)
+
+@app.patch("/todos:batch")
+def update_todos_batch():
+    data = request.get_json(force=True) or {}
+    try:
+        updated, errors = svc.update_many(data.get("items"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return json_response({"updated": todo_dicts(updated), "errors": errors})
+
+@app.delete("/todos:batch")
+def delete_todos_batch():
+    data = request.get_json(force=True) or {}
+    try:
+        deleted, errors = svc.delete_many(data.get("ids"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return json_response({"deleted": deleted, "errors": errors})
 
 @app.get("/todos/<int:todo_id>")
 def get_todo(todo_id):
+    # ?include_archived=1 also finds todos archive.py has moved out of the live table
+    include_archived = request.args.get("include_archived", "").lower() in ("1", "true", "yes")
     try:
-        todo = svc.get(todo_id)
-        return jsonify(todo.to_dict())
+        todo = svc.get(todo_id, include_archived=include_archived)
+        if is_fresh(todo.etag, todo.updated_at):
+            return not_modified(todo.etag, todo.updated_at)
+        return todo_response(todo)
     except ValueError:
         return jsonify({"error": "todo not found"}), 404
 
 @app.patch("/todos/<int:todo_id>/done")
 def mark_done(todo_id):
     try:
-        todo = svc.mark_done(todo_id)
-        return jsonify(todo.to_dict())
-    except ValueError:
-        return jsonify({"error": "todo not found"}), 404
+        todo = svc.mark_done(todo_id, if_match=request.headers.get("If-Match"))
+        return todo_response(todo)
+    except ConflictError as e:
+        return jsonify({"error": str(e)}), 409
+    except ValueError as e:
+        msg = str(e)
+        return jsonify({"error": msg}), 404 if "not found" in msg else 400
 
 @app.put("/todos/<int:todo_id>")
 def update_todo(todo_id):
@@ -57,8 +294,11 @@ def update_todo(todo_id):
             title=data.get("title"),
             description=data.get("description"),
             is_done=data.get("is_done"),
+            if_match=request.headers.get("If-Match"),
         )
-        return jsonify(todo.to_dict())
+        return todo_response(todo)
+    except ConflictError as e:
+        return jsonify({"error": str(e)}), 409
     except ValueError as e:
         msg = str(e)
         return jsonify({"error": msg}), 404 if "not found" in msg else 400
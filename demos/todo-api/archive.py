@@ -0,0 +1,63 @@
+"""
+Archive job: move completed todos out of the live `todos` table.
+
+Done todos last updated more than --days ago move to `todos_archive` in
+batches. Each batch is its own short transaction, so the job never holds
+locks for long and can be stopped at any point.
+
+    python archive.py                    # one sweep, then exit (cron)
+    python archive.py --days 7 --batch 500
+    python archive.py --every 600        # keep running: a sweep every 10 minutes
+
+Archived todos still show up with ?include_archived=1 on GET /todos and
+GET /todos/<id>, and appear as op "ARCHIVE" in GET /todos/changes.
+
+Env vars:
+  TODO_ARCHIVE_AFTER_DAYS=30
+  TODO_ARCHIVE_BATCH=1000
+"""
+
+import argparse
+import os
+import time
+
+from cache import cached_repo_from_env
+from repo import TodoRepo
+from service import TodoService
+
+ARCHIVE_AFTER_DAYS = float(os.getenv("TODO_ARCHIVE_AFTER_DAYS", "30"))
+ARCHIVE_BATCH = int(os.getenv("TODO_ARCHIVE_BATCH", "1000"))
+
+
+def sweep(svc, days, batch_size, pause=0.0):
+    # archive batch after batch until one comes back short; returns how many moved
+    moved = 0
+    while True:
+        ids = svc.archive_done(older_than_days=days, batch_size=batch_size)
+        moved += len(ids)
+        if len(ids) < batch_size:
+            return moved
+        time.sleep(pause)  # let other writers in between batches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="move old done todos to todos_archive")
+    parser.add_argument("--days", type=float, default=ARCHIVE_AFTER_DAYS, help="archive done todos older than this")
+    parser.add_argument("--batch", type=int, default=ARCHIVE_BATCH, help="rows per transaction")
+    parser.add_argument("--pause", type=float, default=0.05, help="seconds to sleep between batches")
+    parser.add_argument("--every", type=float, help="keep running, one sweep every N seconds")
+    args = parser.parse_args()
+
+    # through the cache wrapper so a shared (Redis) cache drops the moved todos
+    svc = TodoService(repo=cached_repo_from_env(TodoRepo()))
+    while True:
+        t0 = time.perf_counter()
+        moved = sweep(svc, args.days, args.batch, args.pause)
+        print(f"archived {moved} todos in {time.perf_counter() - t0:.2f}s")
+        if not args.every:
+            break
+        time.sleep(args.every)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+# Async (ASGI) version of app.py: same core routes, same JSON, but every handler is
+# `async def`, so a request waiting on Postgres doesn't hold a worker thread.
+# Quart is "Flask, but async" — compare this file with app.py line by line.
+# https://quart.palletsprojects.com/
+#
+#   pip install -r requirements-async.txt
+#   python asgi_app.py --init-db       # create the tables once
+#   uvicorn asgi_app:app --port 8001
+#
+# Kept at the feature set it was written with (see "Async version" in the
+# README): conditional GET, /todos/export, /metrics, the change feed
+# (/todos/changes), archived reads (?include_archived=1) and admission control
+# (per-client rate limits, concurrency cap) exist only in app.py.
+
+import argparse
+import asyncio
+
+from quart import Quart, request, jsonify
+from async_repo import AsyncTodoRepo, create_pool, init_db
+from async_service import AsyncTodoService
+from domain import ConflictError
+from serialize import project
+from service import parse_fields, parse_limit
+
+app = Quart(__name__)
+pool = None
+svc = None
+
+@app.before_serving
+async def startup():
+    # the asyncpg pool must be created inside the running event loop
+    # no schema DDL here: every uvicorn worker runs this, and concurrent
+    # CREATE EXTENSION / INDEX / TRIGGER can fail (see init_schema below)
+    global pool, svc
+    pool = await create_pool()
+    svc = AsyncTodoService(repo=AsyncTodoRepo(pool))
+
+@app.after_serving
+async def shutdown():
+    await pool.close()
+
+def wants_archived():
+    # archived reads are not ported (see the top of the file): refuse rather than quietly leave them out
+    return request.args.get("include_archived", "").lower() in ("1", "true", "yes")
+
+ARCHIVED_ERROR = {"error": "include_archived is only supported by app.py"}
+
+def todo_response(todo, status=200):
+    resp = jsonify(todo.to_dict())
+    resp.status_code = status
+    resp.headers["ETag"] = todo.etag
+    return resp
+
+@app.get("/health")
+async def health():
+    return {"ok": True}
+
+@app.get("/health/pool")
+async def health_pool():
+    return jsonify({
+        "size": pool.get_size(),
+        "idle": pool.get_idle_size(),
+        "minconn": pool.get_min_size(),
+        "maxconn": pool.get_max_size(),
+    })
+
+@app.get("/health/cache")
+async def health_cache():
+    return jsonify({"backend": "off"})
+
+@app.post("/todos")
+async def create_todo():
+    data = await request.get_json(force=True) or {}
+    title = (data.get("title") or "").strip()
+    description = data.get("description")
+    try:
+        todo = await svc.create(title, description)
+        return todo_response(todo, 201)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+@app.get("/todos")
+async def list_todos():
+    is_done = request.args.get("is_done")
+    q = request.args.get("q")
+    rank = request.args.get("rank", "").lower() in ("1", "true", "yes")
+    cursor = request.args.get("cursor")
+    if wants_archived():
+        return jsonify(ARCHIVED_ERROR), 400
+    try:
+        limit = parse_limit(request.args.get("limit"))
+        offset = int(request.args.get("offset", 0))
+        fields = parse_fields(request.args.get("fields"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if cursor is not None:
+        if rank:
+            return jsonify({"error": "rank cannot be combined with cursor; use offset"}), 400
+        try:
+            todos, next_cursor = await svc.list_page(is_done=is_done, q=q, limit=limit, cursor=cursor, fields=fields)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        return jsonify({"items": project([t.to_dict() for t in todos], fields), "next_cursor": next_cursor})
+    todos = await svc.list(is_done=is_done, q=q, limit=limit, offset=offset, rank=rank, fields=fields)
+    resp = jsonify(project([t.to_dict() for t in todos], fields))
+    if request.args.get("count", "").lower() in ("1", "true", "yes"):
+        total = await svc.total(is_done=is_done, q=q)
+        if total is not None:
+            resp.headers["X-Total-Count"] = str(total)
+    return resp
+
+@app.get("/todos/stats")
+async def todo_stats():
+    stats = await svc.stats()
+    return jsonify({**stats, "reconciled_at": stats["reconciled_at"].isoformat()})
+
+@app.post("/todos:batch")
+async def create_todos_batch():
+    data = await request.get_json(force=True) or {}
+    try:
+        created, errors = await svc.create_many(data.get("items"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"created": [t.to_dict() for t in created], "errors": errors}), 201
+
+@app.patch("/todos:batch")
+async def update_todos_batch():
+    data = await request.get_json(force=True) or {}
+    try:
+        updated, errors = await svc.update_many(data.get("items"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"updated": [t.to_dict() for t in updated], "errors": errors})
+
+@app.delete("/todos:batch")
+async def delete_todos_batch():
+    data = await request.get_json(force=True) or {}
+    try:
+        deleted, errors = await svc.delete_many(data.get("ids"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"deleted": deleted, "errors": errors})
+
+@app.get("/todos/<int:todo_id>")
+async def get_todo(todo_id):
+    if wants_archived():
+        return jsonify(ARCHIVED_ERROR), 400
+    try:
+        todo = await svc.get(todo_id)
+        return todo_response(todo)
+    except ValueError:
+        return jsonify({"error": "todo not found"}), 404
+
+@app.patch("/todos/<int:todo_id>/done")
+async def mark_done(todo_id):
+    try:
+        todo = await svc.mark_done(todo_id, if_match=request.headers.get("If-Match"))
+        return todo_response(todo)
+    except ConflictError as e:
+        return jsonify({"error": str(e)}), 409
+    except ValueError as e:
+        msg = str(e)
+        return jsonify({"error": msg}), 404 if "not found" in msg else 400
+
+@app.put("/todos/<int:todo_id>")
+async def update_todo(todo_id):
+    data = await request.get_json(force=True) or {}
+    try:
+        todo = await svc.update(
+            todo_id,
+            title=data.get("title"),
+            description=data.get("description"),
+            is_done=data.get("is_done"),
+            if_match=request.headers.get("If-Match"),
+        )
+        return todo_response(todo)
+    except ConflictError as e:
+        return jsonify({"error": str(e)}), 409
+    except ValueError as e:
+        msg = str(e)
+        return jsonify({"error": msg}), 404 if "not found" in msg else 400
+
+@app.delete("/todos/<int:todo_id>")
+async def delete_todo(todo_id):
+    try:
+        await svc.delete(todo_id)
+        return "", 204
+    except ValueError:
+        return jsonify({"error": "todo not found"}), 404
+
+async def init_schema():
+    # one-time schema init, run by one process before the workers start
+    schema_pool = await create_pool()
+    try:
+        await init_db(schema_pool)
+    finally:
+        await schema_pool.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="async todo API (dev server)")
+    parser.add_argument("--init-db", action="store_true", help="create the tables if missing, then exit")
+    args = parser.parse_args()
+    asyncio.run(init_schema())         # create table if missing
+    if not args.init_db:
+        app.run(host="127.0.0.1", port=8001)
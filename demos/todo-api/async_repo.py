@@ -0,0 +1,144 @@
+# ⚡ async_repo.py (Async repository = same SQL as repo.py, but non-blocking)
+#
+# asyncpg talks to Postgres without blocking the event loop, so one process
+# can have hundreds of queries in flight instead of one per worker thread.
+# Differences from psycopg2 you will notice below:
+#   * placeholders are $1, $2, ... instead of %s
+#   * the pool is asyncpg's own (create_pool), sized by the same PGPOOL_* env vars
+#   * rows are asyncpg Records; they unpack like tuples, so Todo.from_record works
+
+import asyncpg
+
+from domain import COLUMNS, ConflictError, Todo
+from repo import DB_HOST, DB_NAME, DB_PASS, DB_PORT, DB_USER, POOL_MAX, POOL_MIN, STATS_SQL, projected_columns
+
+
+async def create_pool():
+    return await asyncpg.create_pool(
+        database=DB_NAME, user=DB_USER, password=DB_PASS, host=DB_HOST, port=DB_PORT,
+        min_size=POOL_MIN, max_size=POOL_MAX,
+    )
+
+
+async def init_db(pool):
+    # one-time schema init (safe to re-run)
+    with open("schema.sql", "r", encoding="utf-8") as f:
+        schema = f.read()
+    async with pool.acquire() as conn:
+        await conn.execute(schema)
+
+
+class AsyncTodoRepo:
+    # Same methods as TodoRepo, but every one is `async def`
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def create(self, todo):
+        row = await self.pool.fetchrow(
+            f"""
+            INSERT INTO todos (title, description, is_done, created_at, updated_at)
+            VALUES ($1, $2, $3, $4, $5)
+            RETURNING {COLUMNS}
+            """,
+            todo.title, todo.description, todo.is_done, todo.created_at, todo.updated_at,
+        )
+        return Todo.from_record(row)
+
+    async def create_many(self, todos):
+        # unnest() turns parallel arrays into rows: one INSERT for the whole batch
+        rows = await self.pool.fetch(
+            f"""
+            INSERT INTO todos (title, description, is_done, created_at, updated_at)
+            SELECT * FROM unnest($1::text[], $2::text[], $3::boolean[], $4::timestamptz[], $5::timestamptz[])
+            RETURNING {COLUMNS}
+            """,
+            [t.title for t in todos], [t.description for t in todos], [t.is_done for t in todos],
+            [t.created_at for t in todos], [t.updated_at for t in todos],
+        )
+        return [Todo.from_record(r) for r in rows]
+
+    async def get(self, todo_id):
+        row = await self.pool.fetchrow(f"SELECT {COLUMNS} FROM todos WHERE id = $1", todo_id)
+        return Todo.from_record(row) if row else None
+
+    async def list(self, is_done=None, q=None, limit=50, offset=0, after=None, rank=False, fields=None):
+        # same filters and ordering as TodoRepo.list
+        clauses, params = [], []
+
+        def arg(value):
+            params.append(value)
+            return f"${len(params)}"
+
+        order = "created_at DESC, id DESC"
+        if is_done is not None:
+            clauses.append(f"is_done = {arg(str(is_done).lower() in ('1','true','t','yes','y'))}")
+        if q and rank:
+            query = f"websearch_to_tsquery('english', {arg(q)})"
+            clauses.append(f"search_tsv @@ {query}")
+            order = f"ts_rank(search_tsv, {query}) DESC, " + order
+        elif q:
+            pattern = arg(f"%{q}%")
+            clauses.append(f"(title ILIKE {pattern} OR description ILIKE {pattern})")
+        if after is not None:
+            clauses.append(f"(created_at, id) < ({arg(after[0])}, {arg(after[1])})")
+            offset = 0
+        where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+        sql = f"SELECT {projected_columns(fields)} FROM todos{where} ORDER BY {order} LIMIT {arg(limit)} OFFSET {arg(offset)}"
+        rows = await self.pool.fetch(sql, *params)
+        return [Todo.from_record(r) for r in rows]
+
+    async def patch(self, todo_id, title=None, description=None, is_done=None, expected_updated_at=None):
+        sql = """
+        UPDATE todos
+        SET title = COALESCE($1, title),
+            description = COALESCE($2, description),
+            is_done = COALESCE($3, is_done),
+            updated_at = now()
+        WHERE id = $4
+        """
+        params = [title, description, is_done, todo_id]
+        if expected_updated_at is not None:
+            sql += " AND updated_at = $5"
+            params.append(expected_updated_at)
+        sql += f" RETURNING {COLUMNS}"
+        async with self.pool.acquire() as conn:
+            row = await conn.fetchrow(sql, *params)
+            if row:
+                return Todo.from_record(row)
+            if expected_updated_at is not None and await conn.fetchval("SELECT 1 FROM todos WHERE id = $1", todo_id):
+                raise ConflictError("todo was modified by someone else")
+            return None
+
+    async def update(self, todo):
+        return await self.patch(todo.id, todo.title, todo.description, todo.is_done)
+
+    async def update_many(self, changes):
+        ids, titles, descriptions, dones = (list(col) for col in zip(*changes))
+        rows = await self.pool.fetch(
+            f"""
+            UPDATE todos AS t
+            SET title = COALESCE(v.title, t.title),
+                description = COALESCE(v.description, t.description),
+                is_done = COALESCE(v.is_done, t.is_done),
+                updated_at = now()
+            FROM unnest($1::int[], $2::text[], $3::text[], $4::boolean[]) AS v (id, title, description, is_done)
+            WHERE t.id = v.id
+            RETURNING {", ".join("t." + c for c in COLUMNS.split(", "))}
+            """,
+            ids, titles, descriptions, dones,
+        )
+        return [Todo.from_record(r) for r in rows]
+
+    async def delete(self, todo_id):
+        status = await self.pool.execute("DELETE FROM todos WHERE id = $1", todo_id)
+        return status != "DELETE 0"
+
+    async def stats(self):
+        row = await self.pool.fetchrow(STATS_SQL)
+        return {"total": row["total"], "done": row["done"], "open": row["total"] - row["done"],
+                "archived": row["archived"], "reconciled_at": row["reconciled_at"]}
+
+    async def delete_many(self, todo_ids):
+        rows = await self.pool.fetch("DELETE FROM todos WHERE id = ANY($1::int[]) RETURNING id", list(todo_ids))
+        return [r["id"] for r in rows]
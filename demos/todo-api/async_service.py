@@ -0,0 +1,101 @@
+import inspect
+
+from domain import Todo
+from service import (
+    add_not_found,
+    changes_from,
+    clean_changes,
+    decode_cursor,
+    expected_version,
+    ids_from,
+    new_todos_from,
+    split_page,
+    total_for,
+)
+
+
+class SyncRepoAdapter:
+    """
+    Lets the async service use a plain (blocking) repo such as FakeTodoRepo:
+    every method call returns an awaitable instead of a value.
+
+    Only meant for fast in-memory repos: a slow blocking call here would
+    still block the event loop.
+    """
+
+    def __init__(self, repo):
+        self.repo = repo
+
+    def __getattr__(self, name):
+        method = getattr(self.repo, name)
+
+        async def call(*args, **kwargs):
+            return method(*args, **kwargs)
+
+        return call
+
+
+class AsyncTodoService:
+    # Same use-cases and rules as TodoService; only the repo calls are awaited
+    def __init__(self, repo):
+        if not inspect.iscoroutinefunction(getattr(repo, "get", None)):
+            repo = SyncRepoAdapter(repo)
+        self.repo = repo
+
+    async def create(self, title, description=None):
+        todo = Todo(id=None, title=title, description=description)
+        return await self.repo.create(todo)
+
+    async def get(self, todo_id):
+        todo = await self.repo.get(todo_id)
+        if not todo:
+            raise ValueError("todo not found")
+        return todo
+
+    async def list(self, is_done=None, q=None, limit=50, offset=0, rank=False, fields=None):
+        return await self.repo.list(is_done=is_done, q=q, limit=limit, offset=offset, rank=rank, fields=fields)
+
+    async def stats(self):
+        return await self.repo.stats()
+
+    async def total(self, is_done=None, q=None):
+        return None if q else total_for(await self.repo.stats(), is_done)
+
+    async def list_page(self, is_done=None, q=None, limit=50, cursor=None, fields=None):
+        after = decode_cursor(cursor) if cursor else None
+        todos = await self.repo.list(is_done=is_done, q=q, limit=limit + 1, after=after, fields=fields)
+        return split_page(todos, limit)
+
+    async def mark_done(self, todo_id, if_match=None):
+        return await self._patch(todo_id, if_match, is_done=True)
+
+    async def update(self, todo_id, title=None, description=None, is_done=None, if_match=None):
+        return await self._patch(todo_id, if_match, **clean_changes(title, description, is_done))
+
+    async def _patch(self, todo_id, if_match, **changes):
+        expected = expected_version(todo_id, if_match)
+        todo = await self.repo.patch(todo_id, expected_updated_at=expected, **changes)
+        if not todo:
+            raise ValueError("todo not found")
+        return todo
+
+    async def delete(self, todo_id):
+        ok = await self.repo.delete(todo_id)
+        if not ok:
+            raise ValueError("todo not found")
+
+    # ---- Batch operations (same (results, errors) shape as TodoService) ----
+    async def create_many(self, items):
+        todos, errors = new_todos_from(items)
+        created = await self.repo.create_many(todos) if todos else []
+        return created, errors
+
+    async def update_many(self, items):
+        changes, positions, errors = changes_from(items)
+        updated = await self.repo.update_many(changes) if changes else []
+        return updated, add_not_found(errors, positions.items(), {t.id for t in updated})
+
+    async def delete_many(self, todo_ids):
+        ids, positions, errors = ids_from(todo_ids)
+        deleted = await self.repo.delete_many(ids) if ids else []
+        return deleted, add_not_found(errors, positions, set(deleted))
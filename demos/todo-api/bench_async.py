@@ -0,0 +1,42 @@
+"""
+Load-test comparison: sync Flask app vs async (ASGI) app at the same concurrency.
+
+Start both servers against the same database first, e.g.
+
+    python asgi_app.py --init-db                              # tables, once
+    TODO_RATE_LIMIT=0 gunicorn -w 4 --threads 8 -b 127.0.0.1:8000 app:app      # sync
+    uvicorn asgi_app:app --workers 4 --port 8001              # async
+
+then
+
+    python bench_async.py --todo-id 1 -c 64 -d 30
+
+The Flask dev server (`python app.py`) is single-process and not a fair
+baseline; use a real WSGI server for the sync side.
+"""
+
+import argparse
+import asyncio
+
+from loadgen import run
+
+
+def main():
+    parser = argparse.ArgumentParser(description="sync vs async todo API load test")
+    parser.add_argument("--sync-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--async-url", default="http://127.0.0.1:8001")
+    parser.add_argument("--todo-id", type=int, default=1, help="existing todo for GET /todos/<id>")
+    parser.add_argument("-c", "--concurrency", type=int, default=64)
+    parser.add_argument("-d", "--duration", type=float, default=20.0)
+    args = parser.parse_args()
+
+    routes = [f"/todos/{args.todo_id}", "/todos?limit=50"]
+    print(f"{'route':<20} {'server':<6} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for route in routes:
+        for name, base in (("sync", args.sync_url), ("async", args.async_url)):
+            r = asyncio.run(run(base + route, args.concurrency, args.duration))
+            print(f"{route:<20} {name:<6} {r['rps']:>9.1f} {r['p50_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['errors']:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Benchmark: N inserts through the single-item path vs the batch path.
+
+Needs the same Postgres database as app.py (see README for the PG* env vars).
+
+    python bench_batch.py            # 10,000 todos each way
+    python bench_batch.py -n 2000
+
+Every todo created here is deleted again at the end.
+"""
+
+import argparse
+import time
+
+from repo import init_db, pool_stats
+from service import MAX_BATCH, TodoService
+
+
+def bench_single(svc, n):
+    ids = []
+    start = time.perf_counter()
+    for i in range(n):
+        ids.append(svc.create(f"bench single {i}", "benchmark row").id)
+    return time.perf_counter() - start, ids
+
+
+def bench_batch(svc, n):
+    ids = []
+    start = time.perf_counter()
+    for first in range(0, n, MAX_BATCH):
+        items = [{"title": f"bench batch {i}", "description": "benchmark row"}
+                 for i in range(first, min(first + MAX_BATCH, n))]
+        created, errors = svc.create_many(items)
+        assert not errors, errors
+        ids.extend(t.id for t in created)
+    return time.perf_counter() - start, ids
+
+
+def cleanup(svc, ids):
+    for first in range(0, len(ids), MAX_BATCH):
+        svc.delete_many(ids[first : first + MAX_BATCH])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-n", type=int, default=10_000, help="todos to insert per path")
+    args = parser.parse_args()
+
+    init_db()
+    svc = TodoService()
+
+    single_s, single_ids = bench_single(svc, args.n)
+    batch_s, batch_ids = bench_batch(svc, args.n)
+    cleanup(svc, single_ids + batch_ids)
+
+    print(f"{'path':<8} {'seconds':>9} {'rows/s':>10}")
+    print(f"{'single':<8} {single_s:>9.2f} {args.n / single_s:>10.0f}")
+    print(f"{'batch':<8} {batch_s:>9.2f} {args.n / batch_s:>10.0f}")
+    print(f"speedup: {single_s / batch_s:.1f}x")
+    print(f"pool: {pool_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Microbenchmark: turning DB rows into Todos and Todos into JSON (no database needed).
+
+    python bench_hydration.py            # 100,000 rows
+    python bench_hydration.py -n 500000
+
+Compares
+  * hydration:     dict rows + Todo.from_row (validates)  vs  tuple rows + Todo.from_record
+  * serialization: to_dict() + json.dumps                 vs  serialize.dumps(todo_dicts(...))
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
+import serialize
+from domain import Todo
+
+
+def make_rows(n):
+    base = datetime(2025, 11, 15, tzinfo=timezone.utc)
+    tuples = [
+        (i, f"Todo number {i}", "some description text" if i % 3 else None, i % 2 == 0,
+         base + timedelta(seconds=i), base + timedelta(seconds=i, microseconds=123))
+        for i in range(n)
+    ]
+    keys = ("id", "title", "description", "is_done", "created_at", "updated_at")
+    dicts = [dict(zip(keys, t)) for t in tuples]
+    return tuples, dicts
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Todo hydration/serialization microbenchmark")
+    parser.add_argument("-n", type=int, default=100_000)
+    args = parser.parse_args()
+
+    tuples, dicts = make_rows(args.n)
+
+    slow_load, todos = timed(lambda: [Todo.from_row(r) for r in dicts])
+    fast_load, _ = timed(lambda: [Todo.from_record(r) for r in tuples])
+    slow_dump, _ = timed(lambda: json.dumps([t.to_dict() for t in todos]))
+    fast_dump, _ = timed(lambda: serialize.dumps(serialize.todo_dicts(todos)))
+
+    encoder = "orjson" if serialize.orjson else "json (install orjson for the fast encoder)"
+    print(f"{args.n:,} rows, fast encoder: {encoder}")
+    print(f"{'step':<14} {'before s':>9} {'after s':>9} {'speedup':>8}")
+    print(f"{'hydrate':<14} {slow_load:>9.3f} {fast_load:>9.3f} {slow_load / fast_load:>7.1f}x")
+    print(f"{'serialize':<14} {slow_dump:>9.3f} {fast_dump:>9.3f} {slow_dump / fast_dump:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark: TodoRepo.get / TodoRepo.list with and without prepared statements.
+
+Needs the same Postgres database as app.py (see README for the PG* env vars).
+
+    python bench_prepared.py            # 5,000 calls per query shape
+    python bench_prepared.py -n 20000
+
+Seeds 1,000 todos (deleted again at the end) and runs each query shape with
+TODO_PREPARED off (plain SQL text, parsed + planned every time) and on
+(PREPARE once per pooled connection, then EXECUTE). Talks to the repo
+directly, so the cache in front of it doesn't hide the difference.
+"""
+
+import argparse
+import random
+import time
+
+import repo
+from repo import TodoRepo, init_db, statement_stats
+from service import MAX_BATCH, TodoService
+
+SHAPES = {
+    "get": lambda r, ids, rng: r.get(rng.choice(ids)),
+    "list": lambda r, ids, rng: r.list(limit=50),
+    "list is_done": lambda r, ids, rng: r.list(is_done=rng.choice(["true", "false"]), limit=50),
+    "list q": lambda r, ids, rng: r.list(q=rng.choice(["milk", "fence", "report"]), limit=20),
+    "list is_done+q": lambda r, ids, rng: r.list(is_done="false", q="bench", limit=20),
+}
+
+
+def seed(svc, n=1000):
+    items = [{"title": f"bench prepared {i} {random.choice(['milk', 'fence', 'report'])}"} for i in range(n)]
+    ids = []
+    for first in range(0, n, MAX_BATCH):
+        created, _ = svc.create_many(items[first : first + MAX_BATCH])
+        ids.extend(t.id for t in created)
+    return ids
+
+
+def run(todo_repo, shape, ids, n, prepared):
+    repo.PREPARED = prepared
+    call, rng = SHAPES[shape], random.Random(0)
+    for _ in range(50):  # warm up: pool connections opened, statements prepared
+        call(todo_repo, ids, rng)
+    start = time.perf_counter()
+    for _ in range(n):
+        call(todo_repo, ids, rng)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-n", type=int, default=5_000, help="calls per query shape and mode")
+    args = parser.parse_args()
+
+    init_db()
+    todo_repo = TodoRepo()
+    svc = TodoService(repo=todo_repo)
+    ids = seed(svc)
+    try:
+        print(f"{'query':<16} {'plain µs':>9} {'prepared µs':>12} {'speedup':>8}")
+        for shape in SHAPES:
+            plain = run(todo_repo, shape, ids, args.n, prepared=False)
+            prepared = run(todo_repo, shape, ids, args.n, prepared=True)
+            print(f"{shape:<16} {plain / args.n * 1e6:>9.0f} {prepared / args.n * 1e6:>12.0f} "
+                  f"{plain / prepared:>7.2f}x")
+    finally:
+        for first in range(0, len(ids), MAX_BATCH):
+            svc.delete_many(ids[first : first + MAX_BATCH])
+
+    stats = statement_stats()
+    print(f"prepared statements: {stats['statements']}, hits: {stats['hits']}, prepares: {stats['prepares']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Reproducible load-test suite for the todo API.
+
+1. seeds N todos into the database from schema.sql (same PG* env vars as app.py)
+2. drives a running server with a weighted mix of operations
+3. reports throughput and p50/p95/p99 per operation
+4. saves the results as JSON and/or compares them with a saved baseline
+
+    TODO_RATE_LIMIT=0 python app.py                         # or gunicorn / uvicorn, in another terminal
+    python bench_suite.py --seed 100000 --workload mixed --save bench_results/baseline.json
+    ... change code ...
+    python bench_suite.py --workload mixed --compare bench_results/baseline.json
+
+All load comes from one IP, so start the server with TODO_RATE_LIMIT=0
+(admission.py would otherwise answer most requests with 429).
+The same --rng-seed gives the same request sequence, so runs are comparable.
+--compare exits with status 1 when throughput or p99 got worse than --tolerance.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+from loadgen import run
+
+WORDS = ["buy", "call", "email", "fix", "paint", "book", "clean", "pay", "write", "plan",
+         "groceries", "mom", "report", "fence", "flight", "kitchen", "bills", "essay", "trip", "car"]
+
+# operation -> weight (relative share of requests)
+WORKLOADS = {
+    "read_heavy": {"get": 70, "list": 15, "list_filtered": 5, "search": 5, "create": 3, "update": 2},
+    "mixed": {"get": 35, "list": 10, "list_filtered": 10, "list_deep": 5, "search": 10,
+              "create": 15, "update": 10, "delete": 5},
+    "write_heavy": {"get": 20, "list": 5, "create": 40, "update": 25, "delete": 10},
+}
+
+
+def seed(n):
+    # bulk insert n todos through the batch path; returns their ids
+    from repo import init_db
+    from service import MAX_BATCH, TodoService
+
+    init_db()
+    svc = TodoService()
+    rng = random.Random(0)
+    ids = []
+    for first in range(0, n, MAX_BATCH):
+        items = [
+            {"title": " ".join(rng.sample(WORDS, 3)) + f" #{i}",
+             "description": " ".join(rng.choices(WORDS, k=8))}
+            for i in range(first, min(first + MAX_BATCH, n))
+        ]
+        created, errors = svc.create_many(items)
+        ids.extend(t.id for t in created)
+    return ids
+
+
+def existing_ids():
+    from repo import get_conn
+
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute("SELECT id FROM todos ORDER BY id")
+        return [r[0] for r in cur.fetchall()]
+
+
+def request_maker(workload, ids, rng_seed):
+    """
+    Returns make_request(i) for loadgen.run. The sequence of requests only
+    depends on rng_seed and the seeded ids, so it is the same on every run.
+    Deletes consume ids from the tail of the list so gets/updates keep hitting live rows.
+    """
+    rng = random.Random(rng_seed)
+    ops, weights = zip(*WORKLOADS[workload].items())
+    ids = list(ids)
+    deletable = ids[len(ids) // 2 :]
+    readable = ids[: len(ids) // 2] or ids
+    rng.shuffle(deletable)
+    max_offset = max(0, len(ids) - 50)
+
+    def make_request(i):
+        op = rng.choices(ops, weights)[0]
+        if op == "get":
+            return op, "GET", f"/todos/{rng.choice(readable)}", b""
+        if op == "list":
+            return op, "GET", "/todos?limit=50", b""
+        if op == "list_filtered":
+            return op, "GET", f"/todos?limit=50&is_done={rng.choice(['true', 'false'])}", b""
+        if op == "list_deep":
+            return op, "GET", f"/todos?limit=50&offset={rng.randint(0, max_offset)}", b""
+        if op == "search":
+            return op, "GET", f"/todos?limit=20&q={rng.choice(WORDS)}", b""
+        if op == "create":
+            body = {"title": " ".join(rng.sample(WORDS, 3)), "description": "bench"}
+            return op, "POST", "/todos", json.dumps(body).encode()
+        if op == "update":
+            body = {"title": " ".join(rng.sample(WORDS, 2)), "is_done": rng.random() < 0.5}
+            return op, "PUT", f"/todos/{rng.choice(readable)}", json.dumps(body).encode()
+        if op == "delete" and deletable:
+            return op, "DELETE", f"/todos/{deletable.pop()}", b""
+        return "get", "GET", f"/todos/{rng.choice(readable)}", b""
+
+    return make_request
+
+
+def print_report(result):
+    print(f"{'op':<14} {'requests':>9} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for op, r in list(result["ops"].items()) + [("ALL", result)]:
+        print(f"{op:<14} {r['requests']:>9} {r['rps']:>9.1f} {r['p50_ms']:>8.2f} "
+              f"{r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['errors']:>7}")
+
+
+def compare(result, baseline, tolerance):
+    # returns True when nothing regressed by more than `tolerance` (0.10 = 10%)
+    ok = True
+    print(f"\n{'op':<14} {'req/s base':>11} {'req/s now':>10} {'p99 base':>9} {'p99 now':>8}  verdict")
+    rows = [(op, baseline["ops"].get(op), r) for op, r in result["ops"].items()]
+    rows.append(("ALL", baseline, result))
+    for op, base, now in rows:
+        if not base:
+            continue
+        slower = now["rps"] < base["rps"] * (1 - tolerance)
+        laggier = now["p99_ms"] > base["p99_ms"] * (1 + tolerance)
+        verdict = "REGRESSION" if (slower or laggier) else "ok"
+        ok = ok and verdict == "ok"
+        print(f"{op:<14} {base['rps']:>11.1f} {now['rps']:>10.1f} {base['p99_ms']:>9.2f} {now['p99_ms']:>8.2f}  {verdict}")
+    return ok
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="todo API benchmark suite")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--seed", type=int, default=0, help="insert this many todos before the run")
+    parser.add_argument("--workload", choices=sorted(WORKLOADS), default="mixed")
+    parser.add_argument("-c", "--concurrency", type=int, default=32)
+    parser.add_argument("-d", "--duration", type=float, default=30.0)
+    parser.add_argument("--rng-seed", type=int, default=42)
+    parser.add_argument("--save", help="write results JSON here (e.g. bench_results/baseline.json)")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    args = parser.parse_args()
+
+    ids = seed(args.seed) if args.seed else []
+    ids = ids or existing_ids()
+    if not ids:
+        sys.exit("no todos in the database; run with --seed N first")
+
+    make_request = request_maker(args.workload, ids, args.rng_seed)
+    result = asyncio.run(run(args.url, args.concurrency, args.duration, make_request))
+    result["meta"] = {
+        "workload": args.workload, "rows": len(ids), "concurrency": args.concurrency,
+        "duration": args.duration, "rng_seed": args.rng_seed, "url": args.url,
+        "git": git_revision(), "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    print_report(result)
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.save) or ".", exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"\nsaved {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if not compare(result, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+# 🧊 cache.py (Read-through cache in front of TodoRepo)
+#
+# Most traffic is reads of the same few todos / list pages. Instead of asking
+# Postgres every time, CachedTodoRepo remembers recent answers and forgets
+# them as soon as a write could have changed them.
+#
+#   repo = CachedTodoRepo(TodoRepo(), LRUCache(maxsize=10_000, ttl=30))
+#   svc = TodoService(repo=repo)     # the service doesn't know the difference
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from domain import FIELDS, Todo
+
+CACHE_BACKEND = os.getenv("TODO_CACHE", "off")           # off | lru (one process) | redis (shared)
+CACHE_MAXSIZE = int(os.getenv("TODO_CACHE_MAXSIZE", "10000"))
+CACHE_TTL = float(os.getenv("TODO_CACHE_TTL", "30"))     # seconds
+REDIS_URL = os.getenv("REDIS_URL", "redis://127.0.0.1:6379/0")
+
+
+class LRUCache:
+    """
+    In-process cache: least-recently-used entries are evicted past `maxsize`,
+    and entries older than `ttl` seconds are treated as missing.
+    Thread-safe. Counters (hits/misses/evictions/expirations) in stats().
+    """
+
+    def __init__(self, maxsize=10_000, ttl=30.0, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data = OrderedDict()   # key -> (expires_at, value), oldest first
+        self._counters = {}          # incr() values; never evicted
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (self._clock() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def incr(self, key):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def counter(self, key):
+        with self._lock:
+            return self._counters.get(key, 0)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend": "lru",
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class RedisCache:
+    """
+    Out-of-process cache shared by every app process.
+
+    `client` only needs redis-py's get / set(ex=) / delete / incr, so a
+    local stand-in object works just as well (see the tests).
+    Values are stored as JSON; Redis does its own TTL expiry and LRU eviction
+    (maxmemory-policy), so only hits/misses are counted here.
+    """
+
+    def __init__(self, client, ttl=30.0, prefix="todo-api:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        with self._lock:
+            if raw is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return _loads(raw)
+
+    def set(self, key, value):
+        self.client.set(self.prefix + key, _dumps(value), ex=max(1, int(self.ttl)))
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*(self.prefix + k for k in keys))
+
+    def incr(self, key):
+        return int(self.client.incr(self.prefix + key))
+
+    def counter(self, key):
+        return int(self.client.get(self.prefix + key) or 0)
+
+    def stats(self):
+        with self._lock:
+            return {"backend": "redis", "ttl": self.ttl, "hits": self.hits, "misses": self.misses}
+
+
+def _dumps(value):
+    # a Todo or a list of Todos -> JSON text
+    if isinstance(value, list):
+        return json.dumps([t.to_dict() for t in value])
+    return json.dumps(value.to_dict())
+
+def _loads(raw):
+    data = json.loads(raw)
+    if isinstance(data, list):
+        return [_todo_from_json(d) for d in data]
+    return _todo_from_json(data)
+
+def _todo_from_json(d):
+    # cached todos came from the repo, so skip validation like the repo does:
+    # a `fields=` projection legitimately holds title=None
+    d["created_at"] = datetime.fromisoformat(d["created_at"])
+    d["updated_at"] = datetime.fromisoformat(d["updated_at"])
+    return Todo.from_record(tuple(d[f] for f in FIELDS))
+
+
+class CachedTodoRepo:
+    """
+    Wraps any repo (TodoRepo, FakeTodoRepo, ...) with the same methods.
+
+    - get(id)   -> cached under "todo:<id>"
+    - list(...) -> cached under "todos:<generation>:<filters>"
+    - writes delete the exact "todo:<id>" keys they touch and bump the
+      generation, so every cached list page is ignored from then on
+      (any write can change which rows a filter/page returns).
+    - a get() that raced a write (the generation moved while it read the
+      row) returns the row but doesn't cache it: it may be the old version.
+      Writes bump the generation *before* deleting, so a reader that passed
+      its check before the bump has its entry removed by the delete.
+      One small window is left: a write that bumps and deletes between a
+      reader's check and its set() leaves the old row cached until the TTL.
+
+    Methods we don't wrap are passed straight to the inner repo.
+    """
+
+    GENERATION = "todos:generation"
+
+    def __init__(self, repo, cache):
+        self.repo = repo
+        self.cache = cache
+
+    def __getattr__(self, name):
+        return getattr(self.repo, name)
+
+    # ---- reads ----
+    def get(self, todo_id, include_archived=False):
+        key = f"todo:{todo_id}"
+        todo = self.cache.get(key)
+        if todo is None:
+            generation = self.cache.counter(self.GENERATION)
+            todo = self.repo.get(todo_id)
+            if todo is not None and self.cache.counter(self.GENERATION) == generation:
+                self.cache.set(key, todo)
+            elif include_archived:
+                # archived reads are rare; not worth a cache entry
+                todo = self.repo.get(todo_id, include_archived=True)
+        return todo
+
+    def list(self, **filters):
+        generation = self.cache.counter(self.GENERATION)
+        key = f"todos:{generation}:" + "&".join(f"{k}={_key_part(v)}" for k, v in sorted(filters.items()))
+        todos = self.cache.get(key)
+        if todos is None:
+            todos = self.repo.list(**filters)
+            self.cache.set(key, todos)
+        return todos
+
+    # ---- writes (invalidate) ----
+    def create(self, todo):
+        created = self.repo.create(todo)
+        self._invalidate()
+        return created
+
+    def create_many(self, todos):
+        created = self.repo.create_many(todos)
+        self._invalidate()
+        return created
+
+    def update(self, todo):
+        updated = self.repo.update(todo)
+        self._invalidate(todo.id)
+        return updated
+
+    def patch(self, todo_id, **changes):
+        try:
+            return self.repo.patch(todo_id, **changes)
+        finally:
+            self._invalidate(todo_id)
+
+    def update_many(self, changes):
+        updated = self.repo.update_many(changes)
+        self._invalidate(*(c[0] for c in changes))
+        return updated
+
+    def delete(self, todo_id):
+        deleted = self.repo.delete(todo_id)
+        self._invalidate(todo_id)
+        return deleted
+
+    def delete_many(self, todo_ids):
+        deleted = self.repo.delete_many(todo_ids)
+        self._invalidate(*todo_ids)
+        return deleted
+
+    def archive_done(self, **kwargs):
+        archived = self.repo.archive_done(**kwargs)
+        if archived:
+            self._invalidate(*archived)
+        return archived
+
+    def _invalidate(self, *todo_ids):
+        # bump first: a racing get() either sees the new generation or set()s
+        # before the delete below removes its entry again
+        self.cache.incr(self.GENERATION)
+        self.cache.delete(*(f"todo:{i}" for i in todo_ids))
+
+
+def _key_part(value):
+    if isinstance(value, tuple):
+        return ",".join(_key_part(v) for v in value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def cached_repo_from_env(repo):
+    # TODO_CACHE=off (default) | lru | redis
+    # lru lives inside one process: with several workers (gunicorn -w 4) a write
+    # only invalidates its own worker's copy, so the others serve stale todos
+    # until the TTL runs out. Use it with a single worker, redis otherwise.
+    if CACHE_BACKEND == "off":
+        return repo
+    if CACHE_BACKEND == "redis":
+        import redis  # optional dependency: pip install redis
+        return CachedTodoRepo(repo, RedisCache(redis.Redis.from_url(REDIS_URL), ttl=CACHE_TTL))
+    return CachedTodoRepo(repo, LRUCache(maxsize=CACHE_MAXSIZE, ttl=CACHE_TTL))
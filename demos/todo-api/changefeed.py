@@ -0,0 +1,121 @@
+# 📣 changefeed.py (One LISTEN connection, many waiting clients)
+#
+# The triggers in schema.sql send a NOTIFY on channel `todo_changes` whenever
+# a transaction that touched todos commits. Instead of every waiting client
+# holding its own DB connection, ONE background thread LISTENs and bumps a
+# version number; waiting requests sleep on a Condition and all wake up
+# together. 1,000 idle long-polls cost 1 DB connection.
+#
+#   feed = ChangeFeed(connect)
+#   version = feed.version
+#   ... read todo_changes; nothing new? ...
+#   feed.wait(version, timeout=25)   # returns early as soon as something changed
+#
+# Env vars:
+#   TODO_CHANGES_RETENTION=604800   seconds of history kept in todo_changes (7 days)
+
+import os
+import select
+import threading
+import time
+
+import psycopg2
+
+CHANNEL = "todo_changes"
+RETENTION = float(os.getenv("TODO_CHANGES_RETENTION", str(7 * 24 * 3600)))
+PRUNE_EVERY = 3600.0  # seconds between DELETEs of expired history
+MAX_WAIT = 55.0       # longest long-poll we allow (stay under typical proxy timeouts)
+HEARTBEAT = 15.0      # SSE: send a comment line this often so idle streams stay open
+
+
+class ChangeFeed:
+    """
+    Fan-out of Postgres NOTIFYs to threads blocked in wait().
+
+    The listener thread starts lazily on the first wait(). connect=None makes
+    a feed without a listener that only moves when publish() is called
+    (that is what the tests use).
+    """
+
+    def __init__(self, connect, channel=CHANNEL, retention=RETENTION):
+        self.connect = connect
+        self.channel = channel
+        self.retention = retention
+        self.version = 0
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stop = threading.Event()
+        self._counters = {"notifications": 0, "reconnects": 0, "waiting": 0, "pruned": 0}
+
+    def start(self):
+        with self._cond:
+            if self._thread is None and self.connect is not None:
+                self._thread = threading.Thread(target=self._run, name="changefeed", daemon=True)
+                self._thread.start()
+
+    def close(self):
+        self._stop.set()
+
+    def publish(self):
+        # something changed: wake up every waiter
+        with self._cond:
+            self.version += 1
+            self._cond.notify_all()
+
+    def wait(self, version, timeout):
+        # block until the version moves past `version` (or timeout); returns the current version
+        self.start()
+        with self._cond:
+            self._counters["waiting"] += 1
+            try:
+                self._cond.wait_for(lambda: self.version != version, timeout)
+            finally:
+                self._counters["waiting"] -= 1
+            return self.version
+
+    def stats(self):
+        with self._cond:
+            return dict(self._counters, version=self.version)
+
+    def _count(self, name, amount=1):
+        with self._cond:
+            self._counters[name] += amount
+
+    # ---- listener thread ----
+    def _run(self):
+        backoff = 0.5
+        while not self._stop.is_set():
+            try:
+                conn = self.connect()
+                try:
+                    conn.autocommit = True  # LISTEN must not sit inside an open transaction
+                    with conn.cursor() as cur:
+                        cur.execute(f"LISTEN {self.channel}")
+                    # NOTIFYs sent while we were disconnected are lost: make waiters re-check
+                    self.publish()
+                    backoff = 0.5
+                    self._listen(conn)
+                finally:
+                    conn.close()
+            except psycopg2.Error:
+                self._count("reconnects")
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 30.0)
+
+    def _listen(self, conn):
+        next_prune = time.monotonic()
+        while not self._stop.is_set():
+            if select.select([conn], [], [], 5.0)[0]:
+                conn.poll()
+                if conn.notifies:
+                    self._count("notifications", len(conn.notifies))
+                    conn.notifies.clear()
+                    self.publish()
+            if time.monotonic() >= next_prune:
+                # history older than the retention window; clients that were away
+                # longer than that should re-read GET /todos instead
+                with conn.cursor() as cur:
+                    cur.execute("DELETE FROM todo_changes WHERE changed_at < now() - %s * interval '1 second'",
+                                (self.retention,))
+                    self._count("pruned", cur.rowcount)
+                next_prune = time.monotonic() + PRUNE_EVERY
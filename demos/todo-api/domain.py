@@ -1,25 +1,42 @@
 # Domain model: holds data + behavior (encapsulation)
 # Consider making some attributes private and creating getters and setters
 
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# column order used by every SELECT/RETURNING that feeds Todo.from_record
+COLUMNS = "id, title, description, is_done, created_at, updated_at"
+FIELDS = tuple(COLUMNS.split(", "))
+
+class ConflictError(Exception):
+    # someone else changed the todo since the client last read it
+    pass
 
 class Todo:
+    # __slots__: no per-object __dict__ -> smaller objects, faster attribute access
+    __slots__ = ("id", "title", "description", "is_done", "created_at", "updated_at")
+
     def __init__(self, id, title, description=None, is_done=False, created_at=None, updated_at=None):
-        if not (1 <= len(title.strip()) <= 120):
-            raise ValueError("title must be 1..120 characters")
         self.id = id
-        self.title = title.strip()
+        self.title = self.clean_title(title)
         self.description = description
         self.is_done = bool(is_done)
         self.created_at = created_at or datetime.now(timezone.utc)
         self.updated_at = updated_at or datetime.now(timezone.utc)
 
-    # ---- Behavior (business rules) ----
-    def rename(self, title):
+    # ---- Validation ----
+    @staticmethod
+    def clean_title(title):
+        # the one place the title rule lives (also used to validate batch input)
         title = (title or "").strip()
         if not (1 <= len(title) <= 120):
             raise ValueError("title must be 1..120 characters")
-        self.title = title
+        return title
+
+    # ---- Behavior (business rules) ----
+    def rename(self, title):
+        self.title = self.clean_title(title)
         self.touch()
 
     def describe(self, text):
@@ -33,6 +50,27 @@ class Todo:
     def touch(self):
         self.updated_at = datetime.now(timezone.utc)
 
+    # ---- Versioning (optimistic concurrency) ----
+    # updated_at changes on every write, so it doubles as a version number.
+    # The ETag is "<id>-<updated_at in microseconds>", exact to the microsecond
+    # like Postgres' timestamptz.
+    @property
+    def etag(self):
+        version = (self.updated_at - EPOCH) // timedelta(microseconds=1)
+        return f'"{self.id}-{version}"'
+
+    @staticmethod
+    def parse_etag(etag):
+        # '"12-1700000000123456"' -> (12, datetime(...)); accepts weak W/"..." too
+        try:
+            value = etag.strip()
+            if value.startswith("W/"):
+                value = value[2:]
+            todo_id, version = value.strip('"').split("-")
+            return int(todo_id), EPOCH + timedelta(microseconds=int(version))
+        except (AttributeError, ValueError, OverflowError):
+            raise ValueError("invalid ETag")
+
     # ---- Mapping helpers (domain <-> persistence) ----
     @classmethod
     def from_row(cls, row):
@@ -46,6 +84,15 @@ class Todo:
             updated_at=row.get("updated_at"),
         )
 
+    @classmethod
+    def from_record(cls, row):
+        # FAST path for tuples read back from our own table (columns in COLUMNS
+        # order). The DB's CHECK constraint already enforced the title rule,
+        # so we skip __init__ and its validation entirely.
+        todo = cls.__new__(cls)
+        todo.id, todo.title, todo.description, todo.is_done, todo.created_at, todo.updated_at = row
+        return todo
+
     def to_dict(self):
         # clean JSON shape for the API
         return {
@@ -0,0 +1,48 @@
+# 📤 export.py (Turn a stream of Todo objects into NDJSON or CSV text chunks)
+#
+# Each function is a generator: it never holds more than `chunk_rows` rows of
+# output in memory, so Flask can stream the response while the repo is still
+# reading rows from Postgres.
+
+import csv
+import io
+
+from serialize import dumps, todo_dicts
+
+FIELDS = ["id", "title", "description", "is_done", "created_at", "updated_at"]
+
+
+def ndjson_chunks(todos, chunk_rows=500):
+    # one JSON object per line (same shape as GET /todos/<id>)
+    batch = []
+    for todo in todos:
+        batch.append(todo)
+        if len(batch) >= chunk_rows:
+            yield b"\n".join(dumps(d) for d in todo_dicts(batch)) + b"\n"
+            batch = []
+    if batch:
+        yield b"\n".join(dumps(d) for d in todo_dicts(batch)) + b"\n"
+
+
+def csv_chunks(todos, chunk_rows=500):
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=FIELDS)
+    writer.writeheader()
+    rows = 0
+    for todo in todos:
+        writer.writerow(todo.to_dict())
+        rows += 1
+        if rows >= chunk_rows:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+            rows = 0
+    # always yields at least the header
+    yield buf.getvalue()
+
+
+# format name -> (chunk generator, mimetype)
+EXPORT_FORMATS = {
+    "ndjson": (ndjson_chunks, "application/x-ndjson"),
+    "csv": (csv_chunks, "text/csv"),
+}
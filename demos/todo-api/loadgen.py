@@ -0,0 +1,137 @@
+"""
+Tiny HTTP load generator (standard library only).
+
+Keeps `concurrency` keep-alive connections busy for `duration` seconds and
+reports requests/sec and latency percentiles.
+
+    python loadgen.py http://127.0.0.1:8000/todos/1 -c 64 -d 20
+"""
+
+import argparse
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, round(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+def summarize(latencies, errors, elapsed):
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+async def _request(reader, writer, method, path, host, body=b"", headers=None):
+    lines = [f"{method} {path} HTTP/1.1", f"Host: {host}", f"Content-Length: {len(body)}"]
+    if body:
+        lines.append("Content-Type: application/json")
+    for name, value in (headers or {}).items():
+        lines.append(f"{name}: {value}")
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+    await writer.drain()
+
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("server closed the connection")
+    version, status = status_line.split()[:2]
+    status = int(status)
+    # HTTP/1.0 servers close after each response unless they say keep-alive
+    length, chunked, close = 0, False, version == b"HTTP/1.0"
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        name, value = name.strip().lower(), value.strip().lower()
+        if name == "content-length":
+            length = int(value)
+        elif name == "transfer-encoding" and "chunked" in value:
+            chunked = True
+        elif name == "connection":
+            close = value == "close" or (close and value != "keep-alive")
+    if chunked:
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif length:
+        await reader.readexactly(length)
+    return status, close
+
+
+async def run(url, concurrency=32, duration=10.0, make_request=None):
+    """
+    Hammer `url` and return summarize(...) stats, plus an "ops" breakdown.
+
+    make_request(i) -> (op_name, method, path, body_bytes) lets callers mix
+    operations; by default every request is ("GET", "GET", <url path>, b"").
+    """
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    default_path = parts.path + (f"?{parts.query}" if parts.query else "")
+    make_request = make_request or (lambda i: ("GET", "GET", default_path, b""))
+    latencies, errors = [], 0
+    by_op = {}  # op -> ([latencies], errors)
+    deadline = time.perf_counter() + duration
+    counter = iter(range(10**12))
+
+    async def worker():
+        nonlocal errors
+        reader = writer = None
+        while time.perf_counter() < deadline:
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.open_connection(host, port)
+                op, method, path, body = make_request(next(counter))
+                op_stats = by_op.setdefault(op, [[], 0])
+                t0 = time.perf_counter()
+                status, close = await _request(reader, writer, method, path, parts.netloc, body)
+                elapsed = time.perf_counter() - t0
+                latencies.append(elapsed)
+                op_stats[0].append(elapsed)
+                if status >= 500:
+                    errors += 1
+                    op_stats[1] += 1
+                if close:
+                    writer.close()
+                    writer = None
+            except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError):
+                errors += 1
+                if writer is not None:
+                    writer.close()
+                writer = None
+        if writer is not None:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    result = summarize(latencies, errors, elapsed)
+    result["ops"] = {op: summarize(lats, errs, elapsed) for op, (lats, errs) in sorted(by_op.items())}
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP load generator")
+    parser.add_argument("url")
+    parser.add_argument("-c", "--concurrency", type=int, default=32)
+    parser.add_argument("-d", "--duration", type=float, default=10.0)
+    args = parser.parse_args()
+    print(asyncio.run(run(args.url, args.concurrency, args.duration)))
+
+
+if __name__ == "__main__":
+    main()
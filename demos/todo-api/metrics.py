@@ -0,0 +1,189 @@
+# 📈 metrics.py (Counters, gauges and latency histograms in Prometheus text format)
+#
+# Small on purpose: no dependencies, one lock per metric, and observe() is a
+# bisect + two additions, so instrumenting a ~1 ms request costs microseconds.
+#
+#   REQUESTS = Counter("http_requests_total", "Requests served", ["route", "status"])
+#   REQUESTS.inc("/todos", "200")
+#   with LATENCY.time("/todos"): ...
+#   text = REGISTRY.render()       # what GET /metrics returns
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def _labels(names, values, extra=""):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help, labels=(), registry=REGISTRY):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        return self._values.get(label_values, 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labels, k)} {_number(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    """
+    A value that goes up and down. Either set()/inc()/dec() it, or pass
+    fn=callable returning {label_values_tuple: value}, read at scrape time.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name, help, labels=(), fn=None, registry=REGISTRY):
+        super().__init__(name, help, labels, registry)
+        self._fn = fn
+
+    def set(self, value, *label_values):
+        with self._lock:
+            self._values[label_values] = value
+
+    def dec(self, *label_values, amount=1):
+        self.inc(*label_values, amount=-amount)
+
+    def samples(self):
+        if self._fn is not None:
+            with self._lock:
+                self._values = dict(self._fn() or {})
+        return super().samples()
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}   # label values -> [per-bucket counts..., +Inf count], sum
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def observe(self, value, *label_values):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][i] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, *label_values):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *label_values)
+
+    def count(self, *label_values):
+        series = self._series.get(label_values)
+        return sum(series[0]) if series else 0
+
+    def samples(self):
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1])) for k, v in self._series.items())
+        lines = []
+        for label_values, (counts, total) in items:
+            running = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                running += n
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labels, label_values, le)} {running}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, label_values)} {total!r}")
+            lines.append(f"{self.name}_count{_labels(self.labels, label_values)} {running}")
+        return lines
+
+
+class Timed:
+    """
+    Proxy that records how long every method call on `target` takes,
+    under LAYER_SECONDS{layer=..., method=...}. Attributes pass through.
+
+        svc = Timed(TodoService(repo=Timed(TodoRepo(), "repo")), "service")
+    """
+
+    def __init__(self, target, layer):
+        self._target = target
+        self._layer = layer
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if not callable(attr):
+            return attr
+        layer, observe = self._layer, LAYER_SECONDS.observe
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return attr(*args, **kwargs)
+            finally:
+                observe(time.perf_counter() - start, layer, name)
+
+        setattr(self, name, timed)  # next lookup skips __getattr__
+        return timed
+
+
+# ---- The todo API's metrics ----
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP requests by route, method and status",
+                        ["route", "method", "status"])
+HTTP_SECONDS = Histogram("http_request_duration_seconds", "HTTP request latency by route",
+                         ["route", "method"])
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests currently being served")
+LAYER_SECONDS = Histogram("todo_layer_duration_seconds",
+                          "Time per call in each layer (service includes its repo calls)",
+                          ["layer", "method"])
+SQL_SECONDS = Histogram("db_statement_duration_seconds", "Time to execute each SQL statement in repo.py",
+                        ["statement"])
+ADMISSION_REJECTED = Counter("http_rejected_total", "Requests shed by admission.py (rate_limited=429, overloaded=503)",
+                             ["reason"])
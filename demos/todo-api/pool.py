@@ -0,0 +1,223 @@
+# 🏊 pool.py (Connection pool = reuse DB connections instead of reconnecting per call)
+#
+# Opening a Postgres connection means a TCP handshake + authentication + a new
+# backend process on the server. That is usually MORE expensive than the query
+# we want to run. A pool keeps a few connections open and lends them out.
+#
+#   pool = ConnectionPool(connect, minconn=1, maxconn=10)
+#   with pool.connection() as conn:
+#       ...   # commit on success, rollback on error (same as `with psycopg2.connect() as conn`)
+
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_UNKNOWN
+
+
+class PoolError(Exception):
+    pass
+
+
+class PoolTimeout(PoolError):
+    pass
+
+
+# Errors that mean "this connection is dead", not "your SQL was wrong".
+BROKEN_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError)
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of DB connections (safe for Flask's threaded server).
+
+    - keeps between `minconn` and `maxconn` connections open
+    - callers wait (up to `timeout` seconds) when all connections are busy
+    - checks a connection's health before handing it out
+    - throws away broken connections instead of giving them to the next caller
+    - counts checkouts, waits and time spent acquiring (see stats())
+    """
+
+    def __init__(self, connect, minconn=1, maxconn=10, timeout=30.0, ping_after=30.0):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError("pool size must satisfy 0 <= minconn <= maxconn and maxconn >= 1")
+        self._connect = connect
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        # idle connections older than this get a "SELECT 1" before being reused
+        self.ping_after = ping_after
+
+        self._cond = threading.Condition()
+        self._idle = []      # stack of (conn, returned_at); LIFO keeps hot connections hot
+        self._size = 0       # open connections (idle + checked out)
+        self._in_use = 0
+        self._closed = False
+
+        # counters for stats()
+        self._checkouts = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._created = 0
+        self._recycled = 0
+        self._acquire_seconds = 0.0
+        self._wait_seconds = 0.0
+        self._max_in_use = 0
+
+        for _ in range(minconn):
+            conn = self._open()
+            with self._cond:
+                self._size += 1
+                self._idle.append((conn, time.monotonic()))
+
+    # ---- checkout / return ----
+    def getconn(self):
+        start = time.perf_counter()
+        deadline = start + self.timeout
+        waited = 0.0
+
+        while True:
+            conn, returned_at = None, None
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise PoolError("pool is closed")
+                    if self._idle:
+                        conn, returned_at = self._idle.pop()
+                        break
+                    if self._size < self.maxconn:
+                        self._size += 1  # reserve a slot; connect outside the lock
+                        break
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeout(f"no connection available within {self.timeout}s")
+                    t0 = time.perf_counter()
+                    self._cond.wait(remaining)
+                    waited += time.perf_counter() - t0
+
+            if conn is None:
+                try:
+                    conn = self._open()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+            elif not self._is_healthy(conn, returned_at):
+                self._discard(conn)
+                continue  # try the next idle connection (or open a fresh one)
+
+            with self._cond:
+                self._in_use += 1
+                self._max_in_use = max(self._max_in_use, self._in_use)
+                self._checkouts += 1
+                if waited:
+                    self._waits += 1
+                    self._wait_seconds += waited
+                self._acquire_seconds += time.perf_counter() - start
+            return conn
+
+    def putconn(self, conn, broken=False):
+        with self._cond:
+            self._in_use -= 1
+
+        if broken or self._closed or conn.closed:
+            self._discard(conn)
+            return
+
+        # Hand the connection back in a clean state (no open transaction).
+        try:
+            if conn.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+        except BROKEN_ERRORS:
+            self._discard(conn)
+            return
+
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        conn = self.getconn()
+        try:
+            yield conn
+        except BaseException as e:
+            broken = isinstance(e, BROKEN_ERRORS) or conn.closed
+            if not broken:
+                try:
+                    conn.rollback()
+                except BROKEN_ERRORS:
+                    broken = True
+            self.putconn(conn, broken=broken)
+            raise
+        else:
+            try:
+                conn.commit()
+            except BaseException as e:
+                self.putconn(conn, broken=isinstance(e, BROKEN_ERRORS) or conn.closed)
+                raise
+            self.putconn(conn)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for conn, _ in idle:
+            self._discard(conn)
+
+    # ---- stats ----
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                "max_in_use": self._max_in_use,
+                "minconn": self.minconn,
+                "maxconn": self.maxconn,
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "timeouts": self._timeouts,
+                "created": self._created,
+                "recycled": self._recycled,
+                "acquire_seconds_total": round(self._acquire_seconds, 6),
+                "wait_seconds_total": round(self._wait_seconds, 6),
+            }
+
+    # ---- helpers ----
+    def _open(self):
+        conn = self._connect()
+        with self._cond:
+            self._created += 1
+        return conn
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._recycled += 1
+            self._cond.notify()
+
+    def _is_healthy(self, conn, returned_at):
+        if conn.closed:
+            return False
+        if conn.get_transaction_status() == TRANSACTION_STATUS_UNKNOWN:
+            return False
+        # Only ping connections that sat idle for a while; a round trip on
+        # every checkout would eat most of what pooling saves.
+        if time.monotonic() - returned_at < self.ping_after:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except BROKEN_ERRORS:
+            return False
@@ -0,0 +1,94 @@
+# 📌 prepared.py (Server-side prepared statements, per pooled connection)
+#
+# Every query text Postgres receives gets parsed, analyzed and planned.
+# PREPARE does that once per connection; afterwards EXECUTE only ships the
+# parameters. After a few executions Postgres can also switch to a cached
+# generic plan and skip planning entirely.
+#
+#   statements = StatementCache()
+#   statements.execute(cur, "get", "SELECT ... WHERE id = %s", (42,))
+#     first time on this connection:  PREPARE get_1 AS SELECT ... WHERE id = $1
+#     every time:                     EXECUTE get_1 (42)
+#
+# Callers keep writing %s placeholders; they are numbered ($1, $2, ...) once
+# per distinct SQL text. Prepared statements live as long as the connection,
+# which is why this pays off with a pool (and why it must be off behind
+# PgBouncer in transaction mode).
+
+import re
+import threading
+import weakref
+
+import psycopg2
+
+_PLACEHOLDER = re.compile(r"%s|%%")
+
+
+def numbered(sql):
+    # "a = %s AND b = %s" -> ("a = $1 AND b = $2", 2)
+    count = 0
+
+    def number(match):
+        nonlocal count
+        if match.group() == "%%":
+            return "%"
+        count += 1
+        return f"${count}"
+
+    return _PLACEHOLDER.sub(number, sql), count
+
+
+class StatementCache:
+    """
+    Remembers which statements each connection has prepared.
+
+    Connections are weak keys, so when the pool throws one away its entry
+    goes with it. hits = executions that skipped parse/plan; prepares = misses.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._statements = {}  # sql -> (name, "PREPARE ...", "EXECUTE ...")
+        self._prepared = weakref.WeakKeyDictionary()  # connection -> {names}
+        self._counts = {}  # statement label -> [hits, prepares]
+
+    def execute(self, cur, label, sql, params=None):
+        name, prepare_sql, execute_sql = self._statement(label, sql)
+        with self._lock:
+            prepared = self._prepared.setdefault(cur.connection, set())
+            counts = self._counts.setdefault(label, [0, 0])
+        if name not in prepared:
+            cur.execute(prepare_sql)
+            prepared.add(name)
+            counts[1] += 1
+        else:
+            counts[0] += 1
+        try:
+            cur.execute(execute_sql, params)
+        except psycopg2.errors.InvalidSqlStatementName:
+            # the server lost it (e.g. someone ran DISCARD ALL): prepare again next time
+            prepared.clear()
+            raise
+
+    def stats(self):
+        with self._lock:
+            by_statement = {label: {"hits": h, "prepares": p} for label, (h, p) in sorted(self._counts.items())}
+            return {
+                "statements": len(self._statements),
+                "connections": len(self._prepared),
+                "hits": sum(s["hits"] for s in by_statement.values()),
+                "prepares": sum(s["prepares"] for s in by_statement.values()),
+                "by_statement": by_statement,
+            }
+
+    def _statement(self, label, sql):
+        statement = self._statements.get(sql)
+        if statement is None:
+            with self._lock:
+                statement = self._statements.get(sql)
+                if statement is None:
+                    body, count = numbered(sql)
+                    name = f"{label}_{len(self._statements) + 1}"
+                    args = f" ({', '.join(['%s'] * count)})" if count else ""
+                    statement = self._statements[sql] = (name, f"PREPARE {name} AS {body}", f"EXECUTE {name}{args}")
+        return statement
@@ -0,0 +1,30 @@
+"""
+Rebuild the todo_stats counters from the todos table.
+
+The triggers in schema.sql keep todo_stats exact, so this normally finds
+nothing to fix. Run it after bulk loads that bypass triggers
+(e.g. `ALTER TABLE ... DISABLE TRIGGER`, `pg_restore --disable-triggers`)
+or on a schedule as a safety net:
+
+    python reconcile_stats.py          # e.g. nightly from cron
+
+Writes to todos wait while the recount runs (one sequential scan).
+Exits with status 1 when drift was found (handy for alerting).
+"""
+
+import sys
+
+from repo import TodoRepo
+
+
+def main():
+    before, after = TodoRepo().reconcile_stats()
+    print(f"before: total={before[0]} done={before[1]} archived={before[2]}" if before else "before: (no row)")
+    print(f"after:  total={after[0]} done={after[1]} archived={after[2]}")
+    if before != after:
+        print("drift found and fixed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,82 @@
 # 🗄️ repo.py (Repository = DB adapter; hides SQL from the rest)
 
 import os
+import threading
+import time
 import psycopg2
-from psycopg2.extras import RealDictCursor
-from domain import Todo
+from psycopg2.extras import execute_values
+from domain import COLUMNS, FIELDS, ConflictError, Todo
+from metrics import SQL_SECONDS
+from pool import ConnectionPool
+from prepared import StatementCache
 
 DB_NAME = os.getenv("PGDB", "todo_db")
 DB_USER = os.getenv("PGUSER", "postgres")
 DB_PASS = os.getenv("PGPASS", "final2kk")  # your postgres password for this user
 DB_HOST = os.getenv("PGHOST", "127.0.0.1") # 127.0.0.1 is localhost
 DB_PORT = int(os.getenv("PGPORT", "5432")) # 5432 is the default port for postgres dbs
+POOL_MIN = int(os.getenv("PGPOOL_MIN", "1"))           # connections opened up front
+POOL_MAX = int(os.getenv("PGPOOL_MAX", "10"))          # hard cap on open connections
+POOL_TIMEOUT = float(os.getenv("PGPOOL_TIMEOUT", "30")) # seconds to wait for a free connection
+PREPARED = os.getenv("TODO_PREPARED", "on").lower() not in ("0", "off", "false", "no")  # off behind PgBouncer (transaction mode)
 
-#
-def get_conn():
+STATEMENTS = StatementCache()  # which statements each pooled connection has prepared
+
+def connect():
+    # one brand-new connection (used by the pool when it needs to grow)
     return psycopg2.connect(
         dbname=DB_NAME, user=DB_USER, password=DB_PASS, host=DB_HOST, port=DB_PORT
     )
 
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    # created lazily, so importing this module never touches the database
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(connect, minconn=POOL_MIN, maxconn=POOL_MAX, timeout=POOL_TIMEOUT)
+    return _pool
+
+def get_conn():
+    # borrow a pooled connection: `with get_conn() as conn:` commits on success,
+    # rolls back on error, and hands the connection back to the pool
+    return get_pool().connection()
+
+def pool_stats(start=True):
+    # start=False: report None instead of opening the pool just to describe it
+    if _pool is None and not start:
+        return None
+    return get_pool().stats()
+
+def execute(cur, statement, sql, params=None, prepare=False):
+    # run one SQL statement and record its latency per statement name
+    # (db_statement_duration_seconds on GET /metrics).
+    # prepare=True runs it as a server-side prepared statement (TODO_PREPARED=on).
+    t0 = time.perf_counter()
+    try:
+        if prepare and PREPARED:
+            STATEMENTS.execute(cur, statement, sql, params)
+        else:
+            cur.execute(sql, params)
+    finally:
+        SQL_SECONDS.observe(time.perf_counter() - t0, statement)
+
+def statement_stats():
+    # prepared-statement cache: hits (parse/plan skipped) vs prepares, per statement
+    return dict(STATEMENTS.stats(), enabled=PREPARED)
+
+def ping():
+    # round trip through the pool: (seconds to get a connection, seconds for SELECT 1)
+    t0 = time.perf_counter()
+    with get_conn() as conn, conn.cursor() as cur:
+        t1 = time.perf_counter()
+        execute(cur, "ping", "SELECT 1")
+        cur.fetchone()
+        return t1 - t0, time.perf_counter() - t1
+
 def init_db():
     # one-time schema init (safe to re-run)
     with get_conn() as conn, conn.cursor() as cur:
@@ -24,6 +84,65 @@ def init_db():
             cur.execute(f.read())
         conn.commit()
 
+# list() always reads these: keyset cursors need (created_at, id), ETags need updated_at
+ALWAYS_SELECTED = {"id", "created_at", "updated_at"}
+
+def projected_columns(fields):
+    # SELECT list for a `fields=` projection. Columns keep COLUMNS order (so
+    # Todo.from_record still works); the ones nobody asked for become NULL,
+    # so Postgres never reads them (e.g. large descriptions).
+    if not fields:
+        return COLUMNS
+    keep = ALWAYS_SELECTED.union(fields)
+    return ", ".join(c if c in keep else f"NULL AS {c}" for c in FIELDS)
+
+# include_archived=True reads both tables as one. Postgres pushes the WHERE,
+# ORDER BY and LIMIT into each side (a Merge Append of two index scans).
+WITH_ARCHIVE = f"""(
+    SELECT {COLUMNS}, search_tsv FROM todos
+    UNION ALL
+    SELECT {COLUMNS}, search_tsv FROM todos_archive
+) AS todos"""
+
+GET_SQL = f"SELECT {COLUMNS} FROM todos WHERE id = %s"
+# todo_stats is sharded (see schema.sql): the counters are the sum of its rows
+STATS_SQL = """
+    SELECT sum(total)::bigint AS total, sum(done)::bigint AS done, sum(archived)::bigint AS archived,
+           max(reconciled_at) AS reconciled_at
+    FROM todo_stats
+"""
+GET_ARCHIVED_SQL = f"""
+    SELECT {COLUMNS} FROM todos WHERE id = %s
+    UNION ALL
+    SELECT {COLUMNS} FROM todos_archive WHERE id = %s
+    LIMIT 1
+"""
+_LIST_SQL = {}  # (columns, filters present...) -> SQL text, filled by TodoRepo._list_query
+
+def list_sql(columns, by_done, by_q, rank, after, include_archived):
+    # SELECT for list()/list_versions()/iter_export() with placeholders for the
+    # filters that are present; params go in the order TodoRepo._list_query adds them
+    clauses = []
+    order = "created_at DESC, id DESC"
+    if by_done:
+        clauses.append("is_done = %s")
+    if rank:
+        clauses.append("search_tsv @@ websearch_to_tsquery('english', %s)")
+        order = "ts_rank(search_tsv, websearch_to_tsquery('english', %s)) DESC, " + order
+    elif by_q:
+        # served by the pg_trgm indexes, despite the leading wildcard
+        clauses.append("(title ILIKE %s OR description ILIKE %s)")
+    if after:
+        clauses.append("(created_at, id) < (%s, %s)")
+    where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+    return f"""
+        SELECT {columns}
+        FROM {WITH_ARCHIVE if include_archived else "todos"}
+        {where}
+        ORDER BY {order}
+        LIMIT %s OFFSET %s
+    """
+
 class TodoRepo:
     # CRUD using SQL; returns/accepts Todo domain objects
 
@@ -33,44 +152,98 @@ class TodoRepo:
         VALUES (%s, %s, %s, %s, %s) 
         RETURNING id, title, description, is_done, created_at, updated_at
         """
-        with get_conn() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute(sql, (todo.title, todo.description, todo.is_done, todo.created_at, todo.updated_at))
+        with get_conn() as conn, conn.cursor() as cur:
+            execute(cur, "create", sql, (todo.title, todo.description, todo.is_done, todo.created_at, todo.updated_at))
             row = cur.fetchone()
             conn.commit()
-            return Todo.from_row(row)
-
-    def get(self, todo_id):
-        with get_conn() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute("""
-                SELECT id, title, description, is_done, created_at, updated_at
-                FROM todos WHERE id = %s
-            """, (todo_id,))
+            return Todo.from_record(row)
+
+    def create_many(self, todos):
+        # multi-row INSERT ... VALUES (...), (...), ... RETURNING; one transaction
+        # and one connection for the whole batch instead of one per todo
+        sql = """
+        INSERT INTO todos (title, description, is_done, created_at, updated_at)
+        VALUES %s
+        RETURNING id, title, description, is_done, created_at, updated_at
+        """
+        values = [(t.title, t.description, t.is_done, t.created_at, t.updated_at) for t in todos]
+        with get_conn() as conn, conn.cursor() as cur:
+            with SQL_SECONDS.time("create_many"):
+                rows = execute_values(cur, sql, values, page_size=1000, fetch=True)
+            conn.commit()
+            return [Todo.from_record(r) for r in rows]
+
+    def get(self, todo_id, include_archived=False):
+        with get_conn() as conn, conn.cursor() as cur:
+            if include_archived:
+                execute(cur, "get_archived", GET_ARCHIVED_SQL, (todo_id, todo_id), prepare=True)
+            else:
+                execute(cur, "get", GET_SQL, (todo_id,), prepare=True)
             row = cur.fetchone()
             if not row:
                 return None
-            return Todo.from_row(row)
+            return Todo.from_record(row)
 
-    def list(self, is_done=None, q=None, limit=50, offset=0):
-        clauses, params = [], []
+    def list(self, is_done=None, q=None, limit=50, offset=0, after=None, rank=False, fields=None,
+             include_archived=False):
+        # after=(created_at, id) switches to keyset pagination: we continue right
+        # after the last row of the previous page (an index seek) instead of
+        # scanning and throwing away `offset` rows.
+        # rank=True turns `q` into a full-text search ordered by relevance.
+        # fields=["id", "title"] only reads those columns (others come back as None).
+        # include_archived=True also searches todos_archive (see archive_done).
+        sql, params = self._list_query(projected_columns(fields), is_done, q, limit, offset, after, rank,
+                                       include_archived)
+        with get_conn() as conn, conn.cursor() as cur:
+            execute(cur, "list", sql, params, prepare=True)
+            rows = cur.fetchall()
+            return [Todo.from_record(r) for r in rows]
+
+    def list_versions(self, is_done=None, q=None, limit=50, offset=0, after=None, rank=False,
+                      include_archived=False):
+        # same rows as list(), but only (id, updated_at): a cheap
+        # "did this page change?" check for conditional GETs
+        sql, params = self._list_query("id, updated_at", is_done, q, limit, offset, after, rank,
+                                       include_archived)
+        with get_conn() as conn, conn.cursor() as cur:
+            execute(cur, "list_versions", sql, params, prepare=True)
+            return cur.fetchall()
+
+    def iter_export(self, is_done=None, q=None, batch_size=2000):
+        # Generator over EVERY matching todo. A named cursor is a server-side
+        # cursor: Postgres keeps the result and we pull `batch_size` rows per
+        # round trip, so memory stays flat for 1k or 50M rows. The pooled
+        # connection is held until the generator is exhausted or closed.
+        sql, params = self._list_query(COLUMNS, is_done, q, None, 0, None, False)  # LIMIT NULL = no limit
+        with get_conn() as conn, conn.cursor(name="todos_export") as cur:
+            cur.itersize = batch_size
+            execute(cur, "export", sql, params)
+            for row in cur:
+                yield Todo.from_record(row)
+
+    def _list_query(self, columns, is_done, q, limit, offset, after, rank, include_archived=False):
+        # The SQL text only depends on WHICH filters are present, so each
+        # combination is built once and reused (same text -> same prepared
+        # statement, see prepared.py); only the params change per call.
+        rank = bool(q and rank)
+        key = (columns, is_done is not None, bool(q), rank, after is not None, include_archived)
+        sql = _LIST_SQL.get(key)
+        if sql is None:
+            sql = _LIST_SQL.setdefault(key, list_sql(*key))
+        params = []
         if is_done is not None:
-            clauses.append("is_done = %s")
             params.append(bool(str(is_done).lower() in ("1","true","t","yes","y")))
-        if q:
-            clauses.append("(title ILIKE %s OR description ILIKE %s)")
+        if rank:
+            params.append(q)
+        elif q:
             params.extend([f"%{q}%", f"%{q}%"])
-        where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
-        sql = f"""
-            SELECT id, title, description, is_done, created_at, updated_at
-            FROM todos
-            {where}
-            ORDER BY created_at DESC
-            LIMIT %s OFFSET %s
-        """
+        if after is not None:
+            params.extend(after)
+            offset = 0
+        if rank:
+            params.append(q)  # the ORDER BY ts_rank(...) parameter
         params.extend([limit, offset])
-        with get_conn() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute(sql, tuple(params))
-            rows = cur.fetchall()
-            return [Todo.from_row(r) for r in rows]
+        return sql, tuple(params)
 
     def update(self, todo):
         sql = """
@@ -79,17 +252,156 @@ class TodoRepo:
         WHERE id=%s
         RETURNING id, title, description, is_done, created_at, updated_at
         """
-        with get_conn() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute(sql, (todo.title, todo.description, todo.is_done, todo.id))
+        with get_conn() as conn, conn.cursor() as cur:
+            execute(cur, "update", sql, (todo.title, todo.description, todo.is_done, todo.id))
             row = cur.fetchone()
             if not row:
                 return None
             conn.commit()
-            return Todo.from_row(row)
+            return Todo.from_record(row)
+
+    def patch(self, todo_id, title=None, description=None, is_done=None, expected_updated_at=None):
+        # Partial update in ONE statement: only non-None fields change, and the
+        # row comes back via RETURNING (no SELECT first, no lost updates).
+        # expected_updated_at makes it conditional (optimistic concurrency).
+        sql = """
+        UPDATE todos
+        SET title = COALESCE(%s, title),
+            description = COALESCE(%s, description),
+            is_done = COALESCE(%s, is_done),
+            updated_at = now()
+        WHERE id = %s
+        """
+        params = [title, description, is_done, todo_id]
+        if expected_updated_at is not None:
+            sql += " AND updated_at = %s"
+            params.append(expected_updated_at)
+        sql += " RETURNING id, title, description, is_done, created_at, updated_at"
+        with get_conn() as conn, conn.cursor() as cur:
+            execute(cur, "patch", sql, tuple(params))
+            row = cur.fetchone()
+            if row:
+                return Todo.from_record(row)
+            if expected_updated_at is not None:
+                # no row matched: missing todo, or a newer version exists?
+                execute(cur, "patch_exists", "SELECT 1 FROM todos WHERE id = %s", (todo_id,))
+                if cur.fetchone():
+                    raise ConflictError("todo was modified by someone else")
+            return None
+
+    def update_many(self, changes):
+        # changes: [(id, title, description, is_done)]; None means "keep the current value"
+        sql = """
+        UPDATE todos AS t
+        SET title = COALESCE(v.title, t.title),
+            description = COALESCE(v.description, t.description),
+            is_done = COALESCE(v.is_done, t.is_done),
+            updated_at = now()
+        FROM (VALUES %s) AS v (id, title, description, is_done)
+        WHERE t.id = v.id
+        RETURNING t.id, t.title, t.description, t.is_done, t.created_at, t.updated_at
+        """
+        template = "(%s::int, %s::text, %s::text, %s::boolean)"
+        with get_conn() as conn, conn.cursor() as cur:
+            with SQL_SECONDS.time("update_many"):
+                rows = execute_values(cur, sql, changes, template=template, page_size=1000, fetch=True)
+            conn.commit()
+            return [Todo.from_record(r) for r in rows]
+
+    def delete_many(self, todo_ids):
+        # returns the ids that actually existed
+        with get_conn() as conn, conn.cursor() as cur:
+            execute(cur, "delete_many", "DELETE FROM todos WHERE id = ANY(%s) RETURNING id", (list(todo_ids),))
+            deleted = [r[0] for r in cur.fetchall()]
+            conn.commit()
+            return deleted
 
     def delete(self, todo_id):
         with get_conn() as conn, conn.cursor() as cur:
-            cur.execute("DELETE FROM todos WHERE id = %s", (todo_id,))
+            execute(cur, "delete", "DELETE FROM todos WHERE id = %s", (todo_id,))
             deleted = cur.rowcount
             conn.commit()
             return deleted > 0
+
+    # ---- Archive ----
+    def archive_done(self, older_than, batch_size=1000):
+        # Move up to `batch_size` done todos, last updated more than `older_than`
+        # seconds ago, into todos_archive: one short transaction, returns their ids.
+        # SKIP LOCKED leaves rows someone is editing right now for the next batch.
+        with get_conn() as conn, conn.cursor() as cur:
+            execute(cur, "archive_op", "SET LOCAL todo.change_op = 'ARCHIVE'")  # for the change feed
+            execute(cur, "archive", f"""
+                WITH moved AS (
+                    DELETE FROM todos
+                    WHERE id IN (
+                        SELECT id FROM todos
+                        WHERE is_done AND updated_at < now() - %s * interval '1 second'
+                        ORDER BY updated_at
+                        LIMIT %s
+                        FOR UPDATE SKIP LOCKED
+                    )
+                    RETURNING {COLUMNS}
+                )
+                INSERT INTO todos_archive ({COLUMNS})
+                SELECT {COLUMNS} FROM moved
+                RETURNING id
+            """, (older_than, batch_size))
+            ids = [r[0] for r in cur.fetchall()]
+            conn.commit()
+            return ids
+
+    # ---- Change feed (todo_changes is filled by triggers, see schema.sql) ----
+    def changes(self, after=None, limit=100):
+        # -> (rows, head)
+        #   rows: [(xid, seq, todo_id, op, changed_at)] positioned after `after` = (xid, seq)
+        #   head: the position "now" starts at; every transaction below it has finished
+        # Only rows from transactions older than the oldest running one are
+        # returned, so a change that commits late can't land behind a client.
+        with get_conn() as conn, conn.cursor() as cur:
+            execute(cur, "changes_head", "SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint")
+            head = (cur.fetchone()[0], 0)
+            if after is None:
+                return [], head
+            execute(cur, "changes", """
+                SELECT xid::text::bigint, seq, todo_id, op, changed_at
+                FROM todo_changes
+                WHERE (xid, seq) > (%s::text::xid8, %s) AND xid < %s::text::xid8
+                ORDER BY xid, seq
+                LIMIT %s
+            """, (str(after[0]), after[1], str(head[0]), limit))
+            return cur.fetchall(), head
+
+    # ---- Counters (todo_stats is kept up to date by triggers, see schema.sql) ----
+    def stats(self):
+        # sums 16 tiny counter rows instead of COUNT(*) over the whole table
+        with get_conn() as conn, conn.cursor() as cur:
+            execute(cur, "stats", STATS_SQL)
+            total, done, archived, reconciled_at = cur.fetchone()
+            return {"total": total, "done": done, "open": total - done, "archived": archived,
+                    "reconciled_at": reconciled_at}
+
+    def reconcile_stats(self):
+        # Recount from todos and overwrite todo_stats; returns (before, after).
+        # SHARE mode waits for in-flight writes and holds new ones back until
+        # we commit, so no write can slip between the count and the update.
+        # The exact counts go to shard 0; the other shards start again from 0.
+        with get_conn() as conn, conn.cursor() as cur:
+            execute(cur, "reconcile_lock", "LOCK TABLE todos, todos_archive IN SHARE MODE")
+            execute(cur, "reconcile_before", STATS_SQL)
+            before = cur.fetchone()[:3]
+            execute(cur, "reconcile_shards",
+                    "INSERT INTO todo_stats (id) SELECT generate_series(0, 15) ON CONFLICT (id) DO NOTHING")
+            execute(cur, "reconcile", """
+                UPDATE todo_stats
+                SET total = CASE WHEN todo_stats.id = 0 THEN c.n_total ELSE 0 END,
+                    done = CASE WHEN todo_stats.id = 0 THEN c.n_done ELSE 0 END,
+                    archived = CASE WHEN todo_stats.id = 0 THEN c.n_archived ELSE 0 END,
+                    reconciled_at = now()
+                FROM (SELECT count(*) AS n_total, count(*) FILTER (WHERE is_done) AS n_done,
+                             (SELECT count(*) FROM todos_archive) AS n_archived
+                      FROM todos) AS c
+            """)
+            execute(cur, "reconcile_after", STATS_SQL)
+            after = cur.fetchone()[:3]
+            conn.commit()
+            return before, after
@@ -8,4 +8,201 @@ CREATE TABLE IF NOT EXISTS todos (
   updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
 );
 
-CREATE INDEX IF NOT EXISTS idx_todos_done ON todos (is_done);
+-- a plain index on a boolean is rarely selective enough to use; the partial
+-- index below only holds done rows, ordered by age (what archive.py scans)
+DROP INDEX IF EXISTS idx_todos_done;
+CREATE INDEX IF NOT EXISTS idx_todos_done_updated ON todos (updated_at) WHERE is_done;
+
+-- keyset pagination: ORDER BY created_at DESC, id DESC + WHERE (created_at, id) < (...)
+CREATE INDEX IF NOT EXISTS idx_todos_created_id ON todos (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_todos_done_created_id ON todos (is_done, created_at DESC, id DESC);
+
+-- search for the `q` filter:
+--   * trigram GIN indexes let `title/description ILIKE '%q%'` use an index
+--   * search_tsv is recomputed by Postgres on every INSERT/UPDATE and powers
+--     the ranked full-text mode (GET /todos?q=...&rank=1)
+ALTER TABLE todos ADD COLUMN IF NOT EXISTS search_tsv tsvector
+  GENERATED ALWAYS AS (
+    setweight(to_tsvector('english', title), 'A') ||
+    setweight(to_tsvector('english', coalesce(description, '')), 'B')
+  ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_todos_search_tsv ON todos USING GIN (search_tsv);
+
+-- pg_trgm is a contrib extension: some servers don't ship it, and creating it
+-- needs CREATE privilege on the database. Without it `q` still works (ILIKE
+-- scans the rows, rank=1 uses search_tsv as above); it just has no index.
+DO $$
+BEGIN
+  CREATE EXTENSION IF NOT EXISTS pg_trgm;
+  CREATE INDEX IF NOT EXISTS idx_todos_title_trgm ON todos USING GIN (title gin_trgm_ops);
+  CREATE INDEX IF NOT EXISTS idx_todos_description_trgm ON todos USING GIN (description gin_trgm_ops);
+EXCEPTION WHEN feature_not_supported OR undefined_file OR insufficient_privilege THEN
+  RAISE WARNING 'pg_trgm unavailable (%): substring search (?q=) will scan instead of using an index', SQLERRM;
+END $$;
+
+-- maintained counters for GET /todos/stats and X-Total-Count (no COUNT(*) per request):
+--   * kept exact by statement-level triggers in the same transaction as the
+--     write; transition tables mean a 1,000-row batch bumps them once
+--   * sharded: 16 rows, and each write bumps the row picked by its backend
+--     pid (pg_backend_pid() % 16). With a single row every write transaction
+--     would queue on that row's lock until the one before it committed;
+--     now writers on different connections lock different rows.
+--     Readers sum the 16 rows (tiny and always cached).
+--   * `python reconcile_stats.py` rebuilds them from todos if they ever drift
+CREATE TABLE IF NOT EXISTS todo_stats (
+  id SMALLINT PRIMARY KEY,
+  total BIGINT NOT NULL DEFAULT 0,
+  done BIGINT NOT NULL DEFAULT 0,
+  reconciled_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- earlier versions kept one row (id = 1); it simply becomes shard 1
+ALTER TABLE todo_stats DROP CONSTRAINT IF EXISTS todo_stats_id_check;
+ALTER TABLE todo_stats ADD CONSTRAINT todo_stats_id_check CHECK (id BETWEEN 0 AND 15);
+
+-- first run: shard 0 starts with whatever todos already holds
+INSERT INTO todo_stats (id, total, done)
+SELECT 0, count(*), count(*) FILTER (WHERE is_done) FROM todos
+ON CONFLICT (id) DO NOTHING;
+INSERT INTO todo_stats (id) SELECT generate_series(1, 15) ON CONFLICT (id) DO NOTHING;
+
+-- the columns are qualified: bare `total` would be ambiguous next to n.total
+CREATE OR REPLACE FUNCTION todo_stats_on_insert() RETURNS trigger AS $$
+BEGIN
+  UPDATE todo_stats
+  SET total = todo_stats.total + n.n_total, done = todo_stats.done + n.n_done
+  FROM (SELECT count(*) AS n_total, count(*) FILTER (WHERE is_done) AS n_done FROM new_rows) AS n
+  WHERE todo_stats.id = pg_backend_pid() % 16 AND n.n_total > 0;
+  RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION todo_stats_on_delete() RETURNS trigger AS $$
+BEGIN
+  UPDATE todo_stats
+  SET total = todo_stats.total - o.o_total, done = todo_stats.done - o.o_done
+  FROM (SELECT count(*) AS o_total, count(*) FILTER (WHERE is_done) AS o_done FROM old_rows) AS o
+  WHERE todo_stats.id = pg_backend_pid() % 16 AND o.o_total > 0;
+  RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION todo_stats_on_update() RETURNS trigger AS $$
+BEGIN
+  -- only is_done can move a row between buckets; title edits don't touch todo_stats
+  UPDATE todo_stats
+  SET done = todo_stats.done + d.delta
+  FROM (SELECT (SELECT count(*) FILTER (WHERE is_done) FROM new_rows)
+             - (SELECT count(*) FILTER (WHERE is_done) FROM old_rows) AS delta) AS d
+  WHERE todo_stats.id = pg_backend_pid() % 16 AND d.delta <> 0;
+  RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION todo_stats_on_truncate() RETURNS trigger AS $$
+BEGIN
+  UPDATE todo_stats SET total = 0, done = 0, reconciled_at = now();
+  RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+-- transition tables allow one event per trigger, hence four triggers
+DROP TRIGGER IF EXISTS todos_stats_insert ON todos;
+CREATE TRIGGER todos_stats_insert AFTER INSERT ON todos
+  REFERENCING NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION todo_stats_on_insert();
+
+DROP TRIGGER IF EXISTS todos_stats_delete ON todos;
+CREATE TRIGGER todos_stats_delete AFTER DELETE ON todos
+  REFERENCING OLD TABLE AS old_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION todo_stats_on_delete();
+
+DROP TRIGGER IF EXISTS todos_stats_update ON todos;
+CREATE TRIGGER todos_stats_update AFTER UPDATE ON todos
+  REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION todo_stats_on_update();
+
+DROP TRIGGER IF EXISTS todos_stats_truncate ON todos;
+CREATE TRIGGER todos_stats_truncate AFTER TRUNCATE ON todos
+  FOR EACH STATEMENT EXECUTE FUNCTION todo_stats_on_truncate();
+
+-- change feed for GET /todos/changes:
+--   * every insert/update/delete appends one row per todo to todo_changes
+--   * xid is the writing transaction's id; readers only return rows whose
+--     transaction is older than every still-running one, so a slow commit
+--     can never be skipped by a client that already moved past it
+--   * one NOTIFY per statement (empty payload, delivered on commit) wakes
+--     the app's single LISTEN connection, which fans out to waiting clients
+CREATE TABLE IF NOT EXISTS todo_changes (
+  seq BIGSERIAL PRIMARY KEY,
+  xid XID8 NOT NULL DEFAULT pg_current_xact_id(),
+  todo_id INTEGER NOT NULL,
+  op TEXT NOT NULL,
+  changed_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_todo_changes_xid_seq ON todo_changes (xid, seq);
+CREATE INDEX IF NOT EXISTS idx_todo_changes_changed_at ON todo_changes (changed_at);
+
+CREATE OR REPLACE FUNCTION todo_changes_record() RETURNS trigger AS $$
+DECLARE
+  -- archive.py sets todo.change_op = 'ARCHIVE' so its DELETEs aren't reported as deletes
+  change_op TEXT := coalesce(nullif(current_setting('todo.change_op', true), ''), TG_OP);
+BEGIN
+  IF TG_OP = 'DELETE' THEN
+    INSERT INTO todo_changes (todo_id, op) SELECT id, change_op FROM old_rows;
+  ELSE
+    INSERT INTO todo_changes (todo_id, op) SELECT id, change_op FROM new_rows;
+  END IF;
+  IF FOUND THEN
+    PERFORM pg_notify('todo_changes', '');
+  END IF;
+  RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS todos_changes_insert ON todos;
+CREATE TRIGGER todos_changes_insert AFTER INSERT ON todos
+  REFERENCING NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION todo_changes_record();
+
+DROP TRIGGER IF EXISTS todos_changes_update ON todos;
+CREATE TRIGGER todos_changes_update AFTER UPDATE ON todos
+  REFERENCING NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION todo_changes_record();
+
+DROP TRIGGER IF EXISTS todos_changes_delete ON todos;
+CREATE TRIGGER todos_changes_delete AFTER DELETE ON todos
+  REFERENCING OLD TABLE AS old_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION todo_changes_record();
+
+-- archive: done todos older than TODO_ARCHIVE_AFTER_DAYS are moved here in
+-- batches (python archive.py), so hot queries only touch live rows.
+-- Same columns (including the generated search_tsv) plus archived_at.
+CREATE TABLE IF NOT EXISTS todos_archive (
+  LIKE todos INCLUDING GENERATED INCLUDING CONSTRAINTS,
+  archived_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_todos_archive_id ON todos_archive (id);
+CREATE INDEX IF NOT EXISTS idx_todos_archive_created_id ON todos_archive (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_todos_archive_search_tsv ON todos_archive USING GIN (search_tsv);
+
+-- archived rows leave todos (the stats DELETE trigger counts them out) and are counted here
+ALTER TABLE todo_stats ADD COLUMN IF NOT EXISTS archived BIGINT NOT NULL DEFAULT 0;
+
+CREATE OR REPLACE FUNCTION todo_stats_on_archive() RETURNS trigger AS $$
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    UPDATE todo_stats SET archived = archived + (SELECT count(*) FROM new_rows) WHERE id = pg_backend_pid() % 16;
+  ELSE
+    UPDATE todo_stats SET archived = archived - (SELECT count(*) FROM old_rows) WHERE id = pg_backend_pid() % 16;
+  END IF;
+  RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS todos_archive_stats_insert ON todos_archive;
+CREATE TRIGGER todos_archive_stats_insert AFTER INSERT ON todos_archive
+  REFERENCING NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION todo_stats_on_archive();
+
+DROP TRIGGER IF EXISTS todos_archive_stats_delete ON todos_archive;
+CREATE TRIGGER todos_archive_stats_delete AFTER DELETE ON todos_archive
+  REFERENCING OLD TABLE AS old_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION todo_stats_on_archive();
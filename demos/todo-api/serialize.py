@@ -0,0 +1,63 @@
+# 🚀 serialize.py (Fast JSON for list-heavy responses)
+#
+# orjson (optional: pip install orjson) is a C JSON encoder that also knows how
+# to write datetimes, so we can skip the two isoformat() calls per todo and
+# the slower stdlib encoder. Without orjson everything falls back to the
+# standard json module and Todo.to_dict(); the JSON is the same either way.
+
+import json
+
+from flask import Response
+
+from metrics import LAYER_SECONDS
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+def todo_dicts(todos, fields=None):
+    # fields=["id", "title"] keeps only those keys (the `fields=` projection)
+    with LAYER_SECONDS.time("serialize", "todo_dicts"):
+        return project(_todo_dicts(todos), fields)
+
+
+def project(dicts, fields=None):
+    # keep only `fields` keys, in the order they were asked for
+    if not fields:
+        return dicts
+    return [{f: d[f] for f in fields} for d in dicts]
+
+
+def _todo_dicts(todos):
+    if orjson is None:
+        return [t.to_dict() for t in todos]
+    # datetimes stay datetime objects; orjson writes them in isoformat()
+    return [
+        {
+            "id": t.id,
+            "title": t.title,
+            "description": t.description,
+            "is_done": t.is_done,
+            "created_at": t.created_at,
+            "updated_at": t.updated_at,
+        }
+        for t in todos
+    ]
+
+
+def dumps(obj):
+    with LAYER_SECONDS.time("serialize", "dumps"):
+        return _dumps(obj)
+
+
+def _dumps(obj):
+    # -> bytes
+    if orjson is None:
+        return json.dumps(obj).encode("utf-8")
+    return orjson.dumps(obj)
+
+
+def json_response(obj, status=200):
+    return Response(dumps(obj), status=status, mimetype="application/json")
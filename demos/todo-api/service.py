@@ -1,6 +1,162 @@
-from domain import Todo
+import base64
+import hashlib
+import os
+from datetime import datetime
+
+from domain import FIELDS, ConflictError, Todo
 from repo import TodoRepo
 
+MAX_BATCH = 1000  # items per batch request
+MAX_LIMIT = int(os.getenv("TODO_MAX_LIMIT", "500"))  # rows per GET /todos page
+
+
+# ---- Opaque pagination cursors ----
+# A cursor remembers where the previous page stopped: (created_at, id) of its
+# last row. Clients treat it as an opaque string and just send it back.
+def encode_cursor(todo):
+    raw = f"{todo.created_at.isoformat()}|{todo.id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        created_at, todo_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(todo_id)
+    except (ValueError, UnicodeError):
+        raise ValueError("invalid cursor")
+
+# ---- Request rules shared by TodoService and AsyncTodoService ----
+# Pure functions (no I/O), so the sync and async services apply exactly the
+# same validation and only differ in how they call the repo.
+def expected_version(todo_id, if_match):
+    # If-Match ETag -> updated_at the row must still have (None = no precondition)
+    if not if_match or if_match.strip() == "*":
+        return None
+    etag_id, expected = Todo.parse_etag(if_match)
+    if etag_id != todo_id:
+        raise ConflictError("ETag belongs to a different todo")
+    return expected
+
+def clean_changes(title=None, description=None, is_done=None):
+    if title is not None:
+        title = Todo.clean_title(title)  # same rule as Todo.rename
+    if is_done is not None:
+        is_done = bool(is_done)
+    return {"title": title, "description": description, "is_done": is_done}
+
+def parse_limit(value, default=50):
+    # ?limit= -> int in 1..MAX_LIMIT; a client can't ask for the whole table at once
+    try:
+        limit = default if value in (None, "") else int(value)
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ValueError(f"limit must be between 1 and {MAX_LIMIT}")
+    return limit
+
+def parse_fields(value):
+    # "id,title" -> ["id", "title"]; None/"" -> None (all fields)
+    if not value:
+        return None
+    fields = [f.strip() for f in value.split(",") if f.strip()]
+    unknown = [f for f in fields if f not in FIELDS]
+    if unknown:
+        raise ValueError(f"unknown field(s): {', '.join(unknown)}; choose from {', '.join(FIELDS)}")
+    return fields
+
+def split_page(todos, limit):
+    # we fetched limit + 1 rows: the extra one only tells us another page exists
+    if len(todos) <= limit:
+        return todos, None
+    todos = todos[:limit]
+    return todos, encode_cursor(todos[-1])
+
+def page_etag(params, versions):
+    # ETag for a list response: the request's filter/paging params plus the
+    # (id, updated_at) of every row on the page. Any edit, insert or delete
+    # that changes the page changes the ETag.
+    h = hashlib.sha1()
+    h.update("&".join(f"{k}={v}" for k, v in sorted(params.items())).encode("utf-8"))
+    for todo_id, updated_at in versions:
+        h.update(f"|{todo_id}:{updated_at.isoformat()}".encode("utf-8"))
+    return f'"{h.hexdigest()[:20]}"'
+
+def check_batch(items):
+    if not isinstance(items, list):
+        raise ValueError("batch must be a list")
+    if len(items) > MAX_BATCH:
+        raise ValueError(f"batch is limited to {MAX_BATCH} items")
+
+def new_todos_from(items):
+    # -> (valid Todo objects, errors for the rest)
+    check_batch(items)
+    todos, errors = [], []
+    for i, item in enumerate(items):
+        try:
+            if not isinstance(item, dict):
+                raise ValueError("item must be an object")
+            todos.append(Todo(id=None, title=item.get("title"), description=item.get("description")))
+        except ValueError as e:
+            errors.append({"index": i, "error": str(e)})
+    return todos, errors
+
+def changes_from(items):
+    # -> (repo.update_many rows, {id: position in request}, errors)
+    check_batch(items)
+    changes, positions, errors = [], {}, []
+    for i, item in enumerate(items):
+        try:
+            if not isinstance(item, dict) or not isinstance(item.get("id"), int):
+                raise ValueError("item must be an object with an integer id")
+            if item["id"] in positions:
+                raise ValueError("duplicate id in batch")
+            c = clean_changes(item.get("title"), item.get("description"), item.get("is_done"))
+            changes.append((item["id"], c["title"], c["description"], c["is_done"]))
+            positions[item["id"]] = i
+        except ValueError as e:
+            errors.append({"index": i, "error": str(e)})
+    return changes, positions, errors
+
+def ids_from(todo_ids):
+    # -> (integer ids, [(id, position in request)], errors for the rest)
+    check_batch(todo_ids)
+    ids, positions, errors = [], [], []
+    for i, todo_id in enumerate(todo_ids):
+        if isinstance(todo_id, int):
+            ids.append(todo_id)
+            positions.append((todo_id, i))
+        else:
+            errors.append({"index": i, "error": "id must be an integer"})
+    return ids, positions, errors
+
+def add_not_found(errors, positions, found_ids):
+    # report every requested id the repo didn't find, in request order
+    errors.extend({"index": i, "error": "todo not found"}
+                  for todo_id, i in positions if todo_id not in found_ids)
+    errors.sort(key=lambda e: e["index"])
+    return errors
+
+
+def encode_change_token(position):
+    # (xid, seq) -> "xid-seq", the `since` value for GET /todos/changes
+    return f"{position[0]}-{position[1]}"
+
+def decode_change_token(token):
+    try:
+        xid, seq = (int(part) for part in token.split("-"))
+    except ValueError:
+        raise ValueError("invalid since token")
+    return xid, seq
+
+def total_for(stats, is_done=None, include_archived=False):
+    # how many rows an unsearched list matches, straight from the counters
+    # (archived todos are always done ones)
+    archived = stats.get("archived", 0) if include_archived else 0
+    if is_done is None:
+        return stats["total"] + archived
+    return stats["done"] + archived if str(is_done).lower() in ("1", "true", "t", "yes", "y") else stats["open"]
+
+
 class TodoService:
     # The service depends on an abstract "repo" behavior (here: concrete class)
     def __init__(self, repo=None):
@@ -10,32 +166,99 @@ class TodoService:
         todo = Todo(id=None, title=title, description=description)
         return self.repo.create(todo)
 
-    def get(self, todo_id):
-        todo = self.repo.get(todo_id)
+    def get(self, todo_id, include_archived=False):
+        todo = self.repo.get(todo_id, include_archived=include_archived)
         if not todo:
             raise ValueError("todo not found")
         return todo
 
-    def list(self, is_done=None, q=None, limit=50, offset=0):
-        return self.repo.list(is_done=is_done, q=q, limit=limit, offset=offset)
-
-    def mark_done(self, todo_id):
-        todo = self.get(todo_id)
-        todo.mark_done()
-        return self.repo.update(todo)
-
-    def update(self, todo_id, title=None, description=None, is_done=None):
-        todo = self.get(todo_id)
-        if title is not None:
-            todo.rename(title)
-        if description is not None:
-            todo.describe(description)
-        if is_done is not None:
-            todo.is_done = bool(is_done)
-            todo.touch()
-        return self.repo.update(todo)
+    def list(self, is_done=None, q=None, limit=50, offset=0, rank=False, fields=None, include_archived=False):
+        return self.repo.list(is_done=is_done, q=q, limit=limit, offset=offset, rank=rank, fields=fields,
+                              include_archived=include_archived)
+
+    def list_page(self, is_done=None, q=None, limit=50, cursor=None, fields=None, include_archived=False):
+        # keyset pagination; returns (todos, next_cursor or None on the last page)
+        after = decode_cursor(cursor) if cursor else None
+        # ask for one extra row so we know whether another page exists
+        todos = self.repo.list(is_done=is_done, q=q, limit=limit + 1, after=after, fields=fields,
+                               include_archived=include_archived)
+        return split_page(todos, limit)
+
+    def list_versions(self, is_done=None, q=None, limit=50, offset=0, rank=False, cursor=None,
+                      include_archived=False):
+        # (id, updated_at) of exactly the rows list()/list_page() would return
+        after = decode_cursor(cursor) if cursor else None
+        return self.repo.list_versions(is_done=is_done, q=q, limit=limit, offset=offset, after=after, rank=rank,
+                                       include_archived=include_archived)
+
+    def stats(self):
+        # {"total", "done", "open", "archived", "reconciled_at"}; O(1), see TodoRepo.stats
+        return self.repo.stats()
+
+    def total(self, is_done=None, q=None, include_archived=False):
+        # X-Total-Count; None when it would need a real COUNT(*)
+        # (a text search can match any subset of rows)
+        return None if q else total_for(self.repo.stats(), is_done, include_archived)
+
+    def archive_done(self, older_than_days, batch_size=1000):
+        # one batch of the archive job (archive.py); returns the moved ids
+        if older_than_days < 0:
+            raise ValueError("older_than_days must be >= 0")
+        if not 1 <= batch_size <= MAX_BATCH:
+            raise ValueError(f"batch_size must be 1..{MAX_BATCH}")
+        return self.repo.archive_done(older_than=older_than_days * 86400, batch_size=batch_size)
+
+    def changes(self, since=None, limit=100):
+        # -> (changes, next_since). No `since` means "start from now": no
+        # changes, just the token to pass on the next call.
+        after = decode_change_token(since) if since else None
+        rows, head = self.repo.changes(after=after, limit=limit)
+        items = [{"id": todo_id, "op": op, "at": changed_at.isoformat()}
+                 for _, _, todo_id, op, changed_at in rows]
+        if len(rows) == limit:
+            position = rows[-1][:2]  # a full page: more may be waiting right after it
+        else:
+            position = max(head, after) if after else head
+        return items, encode_change_token(position)
+
+    def export(self, is_done=None, q=None):
+        # lazily yields every matching todo (see TodoRepo.iter_export)
+        return self.repo.iter_export(is_done=is_done, q=q)
+
+    # Writes send only the changed fields to repo.patch (one UPDATE ... RETURNING).
+    # if_match is the ETag the client last saw; a newer version raises ConflictError.
+    def mark_done(self, todo_id, if_match=None):
+        return self._patch(todo_id, if_match, is_done=True)
+
+    def update(self, todo_id, title=None, description=None, is_done=None, if_match=None):
+        return self._patch(todo_id, if_match, **clean_changes(title, description, is_done))
+
+    def _patch(self, todo_id, if_match, **changes):
+        expected = expected_version(todo_id, if_match)
+        todo = self.repo.patch(todo_id, expected_updated_at=expected, **changes)
+        if not todo:
+            raise ValueError("todo not found")
+        return todo
 
     def delete(self, todo_id):
         ok = self.repo.delete(todo_id)
         if not ok:
             raise ValueError("todo not found")
+
+    # ---- Batch operations ----
+    # Each returns (results, errors) where errors = [{"index": i, "error": "..."}].
+    # Invalid items are reported and skipped; valid items go to the repo in ONE call.
+    def create_many(self, items):
+        todos, errors = new_todos_from(items)
+        created = self.repo.create_many(todos) if todos else []
+        return created, errors
+
+    def update_many(self, items):
+        changes, positions, errors = changes_from(items)
+        updated = self.repo.update_many(changes) if changes else []
+        return updated, add_not_found(errors, positions.items(), {t.id for t in updated})
+
+    def delete_many(self, todo_ids):
+        ids, positions, errors = ids_from(todo_ids)
+        deleted = self.repo.delete_many(ids) if ids else []
+        return deleted, add_not_found(errors, positions, set(deleted))
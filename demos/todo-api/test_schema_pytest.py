@@ -0,0 +1,197 @@
+"""
+Tests that run schema.sql and TodoRepo against a real Postgres.
+
+The fake repos in test_todo_pytest.py never execute SQL, so a broken
+trigger or query only shows up here. Point TODO_TEST_DSN at a scratch
+database (anything psycopg2.connect() accepts):
+
+    TODO_TEST_DSN="dbname=todo_test user=postgres" python -m pytest -q test_schema_pytest.py
+
+Every test gets its own Postgres schema (dropped afterwards), so the
+database can be shared. Without TODO_TEST_DSN the tests are skipped.
+schema.sql is applied as-is: on a server without pg_trgm it skips the
+trigram indexes by itself.
+"""
+
+import os
+import uuid
+
+import pytest
+
+import repo
+from domain import Todo
+from repo import TodoRepo
+
+psycopg2 = pytest.importorskip("psycopg2")
+
+DSN = os.getenv("TODO_TEST_DSN")
+
+pytestmark = pytest.mark.skipif(not DSN, reason="set TODO_TEST_DSN to run the Postgres tests")
+
+
+def schema_sql():
+    with open(os.path.join(os.path.dirname(__file__), "schema.sql"), encoding="utf-8") as f:
+        return f.read()
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """
+    A fresh schema with schema.sql applied, and TodoRepo's pool pointed at it.
+    Yields a function that opens extra connections to the same schema.
+    """
+    name = f"todo_test_{uuid.uuid4().hex[:12]}"
+    admin = psycopg2.connect(DSN)
+    admin.autocommit = True
+    with admin.cursor() as cur:
+        cur.execute(f"CREATE SCHEMA {name}")
+
+    def connect():
+        return psycopg2.connect(DSN, options=f"-c search_path={name},public")
+
+    conn = connect()
+    with conn, conn.cursor() as cur:
+        cur.execute(schema_sql())
+    conn.close()
+
+    monkeypatch.setattr(repo, "connect", connect)
+    monkeypatch.setattr(repo, "_pool", None)
+    try:
+        yield connect
+    finally:
+        if repo._pool is not None:
+            repo._pool.close()
+        with admin.cursor() as cur:
+            cur.execute(f"DROP SCHEMA {name} CASCADE")
+        admin.close()
+
+
+def counted(connect):
+    # what todo_stats should say, counted the slow way
+    conn = connect()
+    with conn, conn.cursor() as cur:
+        cur.execute("""
+            SELECT count(*), count(*) FILTER (WHERE is_done), (SELECT count(*) FROM todos_archive)
+            FROM todos
+        """)
+        total, done, archived = cur.fetchone()
+    conn.close()
+    return {"total": total, "done": done, "open": total - done, "archived": archived}
+
+
+def stats_counts(r):
+    stats = r.stats()
+    return {k: stats[k] for k in ("total", "done", "open", "archived")}
+
+
+def test_schema_applies_twice(db):
+    # schema.sql is re-run on every deploy (init_db), so it must be idempotent
+    conn = db()
+    with conn, conn.cursor() as cur:
+        cur.execute(schema_sql())
+        cur.execute("SELECT count(*) FROM todo_stats")
+        assert cur.fetchone()[0] == 16
+    conn.close()
+
+
+def test_search_works_with_or_without_pg_trgm(db):
+    r = TodoRepo()
+    r.create_many([Todo(id=None, title="buy milk"), Todo(id=None, title="walk the dog")])
+
+    assert [t.title for t in r.list(q="mil")] == ["buy milk"]
+    assert [t.title for t in r.list(q="dog", rank=True)] == ["walk the dog"]
+
+    conn = db()
+    with conn, conn.cursor() as cur:
+        cur.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        available = cur.fetchone() is not None
+        cur.execute("SELECT count(*) FROM pg_indexes WHERE indexname LIKE %s AND schemaname = current_schema()",
+                    ("%trgm",))
+        assert cur.fetchone()[0] == (2 if available else 0)
+    conn.close()
+
+
+def test_stats_follow_inserts_updates_and_deletes(db):
+    r = TodoRepo()
+    created = r.create_many([Todo(id=None, title=f"t{i}") for i in range(5)])
+    assert stats_counts(r) == counted(db) == {"total": 5, "done": 0, "open": 5, "archived": 0}
+
+    r.patch(created[0].id, is_done=True)
+    r.update_many([(created[1].id, None, None, True)])
+    assert stats_counts(r) == counted(db) == {"total": 5, "done": 2, "open": 3, "archived": 0}
+
+    assert r.delete(created[0].id)
+    r.delete_many([created[2].id, created[3].id])
+    assert stats_counts(r) == counted(db) == {"total": 2, "done": 1, "open": 1, "archived": 0}
+
+
+def test_stats_follow_truncate(db):
+    r = TodoRepo()
+    r.create_many([Todo(id=None, title="a"), Todo(id=None, title="b")])
+    conn = db()
+    with conn, conn.cursor() as cur:
+        cur.execute("TRUNCATE todos")
+    conn.close()
+    assert stats_counts(r) == counted(db) == {"total": 0, "done": 0, "open": 0, "archived": 0}
+
+
+def test_archive_moves_rows_and_counts_them(db):
+    r = TodoRepo()
+    created = r.create_many([Todo(id=None, title=f"t{i}") for i in range(3)])
+    r.update_many([(created[0].id, None, None, True), (created[1].id, None, None, True)])
+
+    moved = r.archive_done(older_than=0, batch_size=10)
+
+    assert sorted(moved) == sorted([created[0].id, created[1].id])
+    assert stats_counts(r) == counted(db) == {"total": 1, "done": 0, "open": 1, "archived": 2}
+    assert r.get(created[0].id) is None
+    assert r.get(created[0].id, include_archived=True).title == "t0"
+    rows, _ = r.changes(after=(0, 0))
+    assert [op for _, _, todo_id, op, _ in rows if todo_id == created[0].id][-1] == "ARCHIVE"
+
+
+def test_reconcile_fixes_drift(db):
+    r = TodoRepo()
+    r.create_many([Todo(id=None, title="a"), Todo(id=None, title="b")])
+    conn = db()
+    with conn, conn.cursor() as cur:
+        cur.execute("UPDATE todo_stats SET total = total + 40 WHERE id = 3")
+    conn.close()
+
+    before, after = r.reconcile_stats()
+
+    assert before[0] == 42
+    assert after == (2, 0, 0)
+    assert stats_counts(r) == counted(db)
+
+
+def test_concurrent_writers_do_not_wait_on_one_counter_row(db):
+    # two open write transactions on connections that map to different shards
+    first = db()
+    with first.cursor() as cur:
+        cur.execute("SELECT pg_backend_pid() % 16")
+        first_shard = cur.fetchone()[0]
+    others = []
+    second = None
+    while second is None:
+        conn = db()
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_backend_pid() % 16")
+            if cur.fetchone()[0] != first_shard:
+                second = conn
+            else:
+                others.append(conn)
+    conn.rollback()
+
+    with first.cursor() as cur:
+        cur.execute("INSERT INTO todos (title) VALUES ('first')")  # stays uncommitted
+    with second.cursor() as cur:
+        cur.execute("SET lock_timeout = '2s'")
+        cur.execute("INSERT INTO todos (title) VALUES ('second')")  # would time out on a single row
+    second.commit()
+    first.commit()
+
+    assert counted(db)["total"] == 2
+    assert stats_counts(TodoRepo())["total"] == 2
+    for conn in [first, second] + others:
+        conn.close()
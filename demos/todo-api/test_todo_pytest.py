@@ -10,11 +10,97 @@ This file mirrors the unittest example, but shows:
 This shows the difference in style between unittest and pytest.
 """
 
+import asyncio
+import copy
+import csv
+import gzip
+import io
+import json
+import re
+import threading
+import time
+from collections import defaultdict
+
 import pytest
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_INTRANS
+from werkzeug.datastructures import Accept
+from werkzeug.http import parse_accept_header
+
+import admission
+import app as app_module
+from admission import Admission, ConcurrencyLimit, LocalLimiter, admission_from_env
+from async_service import AsyncTodoService
+from cache import CachedTodoRepo, LRUCache, RedisCache
+from changefeed import ChangeFeed
+from compression import choose_encoding
+from domain import EPOCH, FIELDS, ConflictError, Todo
+from metrics import Histogram, Registry
+from pool import ConnectionPool, PoolTimeout
+from prepared import StatementCache, numbered
+from repo import ALWAYS_SELECTED, TodoRepo, projected_columns
+from service import MAX_BATCH, MAX_LIMIT, TodoService
+
+
+class InMemorySearchIndex:
+    """
+    Inverted index that plays the role of the Postgres search indexes.
+
+    - trigrams -> ids        (like pg_trgm: narrows the candidates for ILIKE '%q%')
+    - words    -> {id: hits} (like search_tsv: ranked full-text search)
+
+    Words are not stemmed, so "buying" does not match "buy" here (Postgres would).
+    """
+
+    def __init__(self):
+        self._trigrams = defaultdict(set)
+        self._words = defaultdict(dict)
+        self._docs = {}  # id -> (trigrams, words), so a todo can be un-indexed
+
+    @staticmethod
+    def _text(todo):
+        return f"{todo.title or ''} {todo.description or ''}".lower()
+
+    @staticmethod
+    def _grams(text):
+        return {text[i : i + 3] for i in range(len(text) - 2)}
 
-from domain import Todo
-from service import TodoService
+    def add(self, todo):
+        self.remove(todo.id)
+        text = self._text(todo)
+        grams = self._grams(text)
+        words = defaultdict(int)
+        for w in re.findall(r"\w+", (todo.title or "").lower()):
+            words[w] += 2  # title matches weigh more, like setweight(..., 'A')
+        for w in re.findall(r"\w+", (todo.description or "").lower()):
+            words[w] += 1
+        for g in grams:
+            self._trigrams[g].add(todo.id)
+        for w, hits in words.items():
+            self._words[w][todo.id] = hits
+        self._docs[todo.id] = (grams, words)
+
+    def remove(self, todo_id):
+        grams, words = self._docs.pop(todo_id, (set(), {}))
+        for g in grams:
+            self._trigrams[g].discard(todo_id)
+        for w in words:
+            self._words[w].pop(todo_id, None)
+
+    def candidates(self, q):
+        # ids that *may* contain q; None means "too short to use the index"
+        grams = self._grams(q.lower())
+        if not grams:
+            return None
+        return set.intersection(*(self._trigrams.get(g, set()) for g in grams))
+
+    def ranked(self, q):
+        # {id: score} for todos containing every word of q
+        words = re.findall(r"\w+", q.lower())
+        if not words:
+            return {}
+        ids = set.intersection(*(set(self._words.get(w, {})) for w in words))
+        return {i: sum(self._words[w][i] for w in words) for i in ids}
 
 
 class FakeTodoRepo:
@@ -27,45 +113,150 @@ class FakeTodoRepo:
     def __init__(self):
         self._store = {}
         self._next_id = 1
+        self._search = InMemorySearchIndex()
+        self._changes = []  # what the todo_changes triggers record
+        self._archive = {}  # todos_archive
+
+    def _log(self, op, todo_id):
+        # rows look like TodoRepo.changes() rows: (xid, seq, todo_id, op, changed_at); here xid == seq
+        seq = len(self._changes) + 1
+        self._changes.append((seq, seq, todo_id, op, datetime.now(timezone.utc)))
 
     def create(self, todo):
         todo.id = self._next_id
         self._next_id += 1
         self._store[todo.id] = todo
+        self._search.add(todo)
+        self._log("INSERT", todo.id)
         return todo
 
-    def get(self, todo_id):
-        return self._store.get(todo_id)
+    def create_many(self, todos):
+        return [self.create(t) for t in todos]
 
-    def list(self, is_done=None, q=None, limit=50, offset=0):
-        todos = list(self._store.values())
+    def get(self, todo_id, include_archived=False):
+        todo = self._store.get(todo_id)
+        if todo is None and include_archived:
+            todo = self._archive.get(todo_id)
+        return todo
+
+    def list(self, is_done=None, q=None, limit=50, offset=0, after=None, rank=False, fields=None,
+             include_archived=False):
+        # newest first, like ORDER BY created_at DESC, id DESC
+        rows = list(self._store.values()) + (list(self._archive.values()) if include_archived else [])
+        todos = sorted(rows, key=lambda t: (t.created_at, t.id), reverse=True)
 
         if is_done is not None:
             todos = [t for t in todos if t.is_done == bool(is_done)]
 
-        if q:
+        if q and rank:
+            scores = self._search.ranked(q)
+            todos = [t for t in todos if t.id in scores]
+            todos.sort(key=lambda t: scores[t.id], reverse=True)  # stable: ties stay newest first
+        elif q:
             q_lower = q.lower()
+            candidates = self._search.candidates(q)
             todos = [
                 t
                 for t in todos
-                if q_lower in (t.title or "").lower()
-                or q_lower in (t.description or "").lower()
+                if (candidates is None or t.id in candidates)
+                and (q_lower in (t.title or "").lower()
+                     or q_lower in (t.description or "").lower())
             ]
 
-        return todos[offset : offset + limit]
+        if after is not None:
+            todos = [t for t in todos if (t.created_at, t.id) < after]
+            offset = 0
+
+        todos = todos[offset : offset + limit]
+        if fields:
+            # like projected_columns(): columns nobody asked for come back as None
+            keep = ALWAYS_SELECTED.union(fields)
+            todos = [Todo.from_record([getattr(t, f) if f in keep else None for f in FIELDS]) for t in todos]
+        return todos
 
     def update(self, todo):
         if todo.id not in self._store:
             return None
         self._store[todo.id] = todo
+        self._search.add(todo)
+        self._log("UPDATE", todo.id)
         return todo
 
+    def patch(self, todo_id, title=None, description=None, is_done=None, expected_updated_at=None):
+        todo = self._store.get(todo_id)
+        if todo is None:
+            return None
+        if expected_updated_at is not None and todo.updated_at != expected_updated_at:
+            raise ConflictError("todo was modified by someone else")
+        if title is not None:
+            todo.rename(title)
+        if description is not None:
+            todo.describe(description)
+        if is_done is not None:
+            todo.is_done = is_done
+        todo.touch()
+        self._search.add(todo)
+        self._log("UPDATE", todo_id)
+        return todo
+
+    def iter_export(self, is_done=None, q=None):
+        yield from self.list(is_done=is_done, q=q, limit=len(self._store))
+
+    def list_versions(self, **filters):
+        return [(t.id, t.updated_at) for t in self.list(**filters)]
+
+    def update_many(self, changes):
+        updated = []
+        for todo_id, title, description, is_done in changes:
+            todo = self._store.get(todo_id)
+            if todo is None:
+                continue
+            if title is not None:
+                todo.rename(title)
+            if description is not None:
+                todo.describe(description)
+            if is_done is not None:
+                todo.is_done = is_done
+                todo.touch()
+            self._search.add(todo)
+            self._log("UPDATE", todo_id)
+            updated.append(todo)
+        return updated
+
+    def delete_many(self, todo_ids):
+        return [todo_id for todo_id in todo_ids if self.delete(todo_id)]
+
     def delete(self, todo_id):
         if todo_id in self._store:
             del self._store[todo_id]
+            self._search.remove(todo_id)
+            self._log("DELETE", todo_id)
             return True
         return False
 
+    def archive_done(self, older_than, batch_size=1000):
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=older_than)
+        old = sorted((t for t in self._store.values() if t.is_done and t.updated_at < cutoff),
+                     key=lambda t: t.updated_at)[:batch_size]
+        for todo in old:
+            self._archive[todo.id] = self._store.pop(todo.id)
+            self._search.remove(todo.id)
+            self._log("ARCHIVE", todo.id)
+        return [t.id for t in old]
+
+    def changes(self, after=None, limit=100):
+        head = (len(self._changes) + 1, 0)
+        if after is None:
+            return [], head
+        return [c for c in self._changes if c[:2] > after][:limit], head
+
+    def stats(self):
+        # the real repo reads these from todo_stats instead of counting
+        done = sum(1 for t in self._store.values() if t.is_done)
+        total = len(self._store)
+        return {"total": total, "done": done, "open": total - done, "archived": len(self._archive),
+                "reconciled_at": EPOCH}
+
 
 # ---------- pytest fixtures ----------
 
@@ -128,6 +319,16 @@ def test_rename_raises_for_empty_title():
         todo.rename("   ")
 
 
+def test_from_record_builds_todo_from_tuple_row():
+    now = datetime.now(timezone.utc)
+
+    todo = Todo.from_record((3, "From DB", None, True, now, now))
+
+    assert (todo.id, todo.title, todo.is_done) == (3, "From DB", True)
+    assert todo.to_dict()["created_at"] == now.isoformat()
+    assert not hasattr(todo, "__dict__")  # __slots__
+
+
 # ---------- Service tests ----------
 
 def test_service_create_persists_and_assigns_id(service, repo):
@@ -176,6 +377,45 @@ def test_service_update_changes_title_and_description(service):
     assert updated.description == "New description"
 
 
+def test_service_update_keeps_unchanged_fields(service):
+    created = service.create("Old title", "Keep me")
+
+    updated = service.update(created.id, is_done=True)
+
+    assert updated.title == "Old title"
+    assert updated.description == "Keep me"
+    assert updated.is_done is True
+
+
+def test_service_update_validates_title(service):
+    created = service.create("Old title", None)
+
+    with pytest.raises(ValueError):
+        service.update(created.id, title="   ")
+
+
+def test_service_update_with_stale_etag_conflicts(service):
+    created = service.create("Shared", None)
+    created.updated_at -= timedelta(seconds=1)  # pretend it was written a moment ago
+    etag = created.etag
+
+    service.update(created.id, title="First writer", if_match=etag)
+
+    # the second writer still holds the old ETag
+    with pytest.raises(ConflictError):
+        service.update(created.id, title="Second writer", if_match=etag)
+    assert service.get(created.id).title == "First writer"
+
+
+def test_etag_round_trips_updated_at():
+    todo = Todo(id=7, title="x")
+
+    assert Todo.parse_etag(todo.etag) == (7, todo.updated_at)
+    assert Todo.parse_etag("W/" + todo.etag) == (7, todo.updated_at)
+    with pytest.raises(ValueError):
+        Todo.parse_etag('"nope"')
+
+
 def test_service_delete_removes_todo_or_raises(service, repo):
     created = service.create("Temp", None)
     todo_id = created.id
@@ -187,3 +427,767 @@ def test_service_delete_removes_todo_or_raises(service, repo):
     # Second delete should raise ValueError
     with pytest.raises(ValueError):
         service.delete(todo_id)
+
+
+def test_service_list_page_walks_all_todos_with_cursor(service):
+    for i in range(5):
+        service.create(f"Todo {i}", None)
+
+    seen, cursor = [], None
+    while True:
+        todos, cursor = service.list_page(limit=2, cursor=cursor)
+        seen.extend(t.title for t in todos)
+        if cursor is None:
+            break
+
+    # newest first, every todo exactly once
+    assert seen == [f"Todo {i}" for i in reversed(range(5))]
+
+
+def test_service_list_page_rejects_garbage_cursor(service):
+    with pytest.raises(ValueError):
+        service.list_page(cursor="not-a-cursor")
+
+
+# ---------- Batch tests ----------
+
+def test_service_create_many_reports_invalid_items(service, repo):
+    created, errors = service.create_many([
+        {"title": "Buy eggs"},
+        {"title": "   "},
+        "not an object",
+        {"title": "Buy milk", "description": "2%"},
+    ])
+
+    assert [t.title for t in created] == ["Buy eggs", "Buy milk"]
+    assert [e["index"] for e in errors] == [1, 2]
+    assert errors[0]["error"] == "title must be 1..120 characters"
+    assert len(repo.list()) == 2
+
+
+def test_service_update_many_applies_partial_changes(service):
+    a = service.create("A", "keep me")
+    b = service.create("B", None)
+
+    updated, errors = service.update_many([
+        {"id": a.id, "title": "A2"},
+        {"id": b.id, "is_done": True},
+        {"id": 999, "title": "ghost"},
+        {"id": a.id, "title": "dup"},
+    ])
+
+    assert {t.id for t in updated} == {a.id, b.id}
+    assert service.get(a.id).title == "A2"
+    assert service.get(a.id).description == "keep me"
+    assert service.get(b.id).is_done is True
+    assert errors == [
+        {"index": 2, "error": "todo not found"},
+        {"index": 3, "error": "duplicate id in batch"},
+    ]
+
+
+def test_service_delete_many_reports_missing_ids(service):
+    a = service.create("A", None)
+
+    deleted, errors = service.delete_many([a.id, 999])
+
+    assert deleted == [a.id]
+    assert errors == [{"index": 1, "error": "todo not found"}]
+
+
+def test_service_batch_size_is_capped(service):
+    with pytest.raises(ValueError):
+        service.create_many([{"title": "x"}] * (MAX_BATCH + 1))
+
+
+# ---------- Search tests ----------
+
+def test_service_list_q_matches_substrings(service):
+    service.create("Buy groceries", "milk and eggs")
+    service.create("Call mom", None)
+
+    found = service.list(q="EGG")
+
+    assert [t.title for t in found] == ["Buy groceries"]
+
+
+def test_service_list_rank_orders_by_relevance(service):
+    service.create("Paint fence", "fence in the back yard")
+    service.create("Pay bills", "electricity bill")
+    service.create("Paint bedroom", None)
+
+    found = service.list(q="paint fence", rank=True)
+
+    # only todos with every word; title + description hits rank first
+    assert [t.title for t in found] == ["Paint fence"]
+    assert [t.title for t in service.list(q="paint", rank=True)] == ["Paint bedroom", "Paint fence"]
+
+
+def test_search_index_follows_updates_and_deletes(service):
+    todo = service.create("Walk dog", None)
+
+    service.update(todo.id, title="Feed cat")
+    assert service.list(q="dog") == []
+    assert [t.id for t in service.list(q="cat", rank=True)] == [todo.id]
+
+    service.delete(todo.id)
+    assert service.list(q="cat", rank=True) == []
+
+
+# ---------- Cache tests ----------
+
+class CountingRepo(FakeTodoRepo):
+    """FakeTodoRepo that counts how often reads reach the "database"."""
+
+    def __init__(self):
+        super().__init__()
+        self.reads = 0
+
+    def get(self, todo_id):
+        self.reads += 1
+        return super().get(todo_id)
+
+    def list(self, **filters):
+        self.reads += 1
+        return super().list(**filters)
+
+
+class FakeRedis:
+    """Local stand-in for a redis.Redis client (just the calls RedisCache makes)."""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    def incr(self, key):
+        self.data[key] = int(self.data.get(key, 0)) + 1
+        return self.data[key]
+
+
+@pytest.fixture(params=["lru", "redis"])
+def cached(request):
+    inner = CountingRepo()
+    cache = LRUCache(maxsize=100, ttl=60) if request.param == "lru" else RedisCache(FakeRedis())
+    return TodoService(repo=CachedTodoRepo(inner, cache)), inner, cache
+
+
+def test_cache_serves_repeated_reads(cached):
+    service, inner, cache = cached
+    todo = service.create("Cached", None)
+
+    service.get(todo.id)
+    service.get(todo.id)
+    service.list(limit=10)
+    service.list(limit=10)
+
+    assert inner.reads == 2
+    assert cache.stats()["hits"] == 2
+
+
+def test_cache_is_invalidated_by_writes(cached):
+    service, inner, cache = cached
+    todo = service.create("Before", None)
+    service.get(todo.id)
+    service.list()
+
+    service.update(todo.id, title="After")
+
+    assert service.get(todo.id).title == "After"
+    assert [t.title for t in service.list()] == ["After"]
+
+    service.delete(todo.id)
+    with pytest.raises(ValueError):
+        service.get(todo.id)
+    assert service.list() == []
+
+
+def test_cache_does_not_store_a_read_that_raced_a_write(cached):
+    service, inner, cache = cached
+    todo = service.create("Old", None)
+    plain_get = inner.get
+
+    def racing_get(todo_id):
+        row = copy.copy(plain_get(todo_id))         # the old version is read...
+        service.repo.patch(todo_id, title="New")    # ...then another request writes and invalidates
+        return row
+
+    inner.get = racing_get
+    assert service.get(todo.id).title == "Old"
+    inner.get = plain_get
+
+    assert service.get(todo.id).title == "New"
+
+
+def test_cache_does_not_store_a_read_when_a_write_lands_before_the_recheck(cached):
+    # the write commits after repo.get read the old row, and the reader's
+    # generation check + set() run while the writer is inside _invalidate
+    service, inner, cache = cached
+    todo = service.create("Old", None)
+    plain_get = inner.get
+    invalidating, reader_done = threading.Event(), threading.Event()
+    writer = threading.Thread(target=lambda: service.repo.patch(todo.id, title="New"))
+
+    def pause_writer_after(method):
+        def call(*args):
+            result = method(*args)
+            if threading.current_thread() is writer:
+                invalidating.set()
+                reader_done.wait(5)
+            return result
+        return call
+
+    def racing_get(todo_id):
+        row = copy.copy(plain_get(todo_id))
+        writer.start()
+        invalidating.wait(5)  # the writer has made its first cache call
+        return row
+
+    cache.delete = pause_writer_after(cache.delete)
+    cache.incr = pause_writer_after(cache.incr)
+    inner.get = racing_get
+    assert service.get(todo.id).title == "Old"
+    reader_done.set()
+    writer.join()
+    inner.get = plain_get
+
+    assert service.get(todo.id).title == "New"
+
+
+def test_redis_cache_serves_projected_lists(client, repo, monkeypatch):
+    monkeypatch.setattr(app_module, "svc", TodoService(repo=CachedTodoRepo(repo, RedisCache(FakeRedis()))))
+    client.post("/todos", json={"title": "Projected"})
+
+    first = client.get("/todos?fields=id")
+    again = client.get("/todos?fields=id")  # served from the cache: title is None in there
+
+    assert first.status_code == again.status_code == 200
+    assert again.get_json() == first.get_json() == [{"id": 1}]
+
+
+def test_lru_cache_evicts_and_expires():
+    now = [0.0]
+    cache = LRUCache(maxsize=2, ttl=10, clock=lambda: now[0])
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")      # "a" is now the most recently used
+    cache.set("c", 3)   # evicts "b"
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+
+    now[0] = 11.0
+    assert cache.get("c") is None
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["expirations"] == 1
+
+
+# ---------- Conditional GET tests (Flask app) ----------
+
+@pytest.fixture
+def client(repo, monkeypatch):
+    monkeypatch.setattr(app_module, "svc", TodoService(repo=repo))
+    # fresh rate-limit buckets for every test
+    monkeypatch.setitem(app_module.app.extensions, "admission", admission_from_env(pool_size=10))
+    return app_module.app.test_client()
+
+
+def test_get_todo_returns_304_for_matching_etag(client, service):
+    todo = service.create("Poll me", None)
+
+    first = client.get(f"/todos/{todo.id}")
+    again = client.get(f"/todos/{todo.id}", headers={"If-None-Match": first.headers["ETag"]})
+
+    assert first.status_code == 200
+    assert again.status_code == 304
+    assert again.data == b""
+
+    service.update(todo.id, title="Changed")
+    changed = client.get(f"/todos/{todo.id}", headers={"If-None-Match": first.headers["ETag"]})
+    assert changed.status_code == 200
+
+
+def test_list_etag_changes_when_page_changes(client, service):
+    service.create("One", None)
+
+    first = client.get("/todos?limit=10")
+    again = client.get("/todos?limit=10", headers={"If-None-Match": first.headers["ETag"]})
+    other_filter = client.get("/todos?limit=5", headers={"If-None-Match": first.headers["ETag"]})
+
+    assert again.status_code == 304
+    assert other_filter.status_code == 200
+
+    service.create("Two", None)
+    after_insert = client.get("/todos?limit=10", headers={"If-None-Match": first.headers["ETag"]})
+    assert after_insert.status_code == 200
+    assert len(after_insert.get_json()) == 2
+
+
+# ---------- Metrics tests ----------
+
+def test_metrics_endpoint_reports_request_latency(client, service):
+    todo = service.create("Measured", None)
+    client.get(f"/todos/{todo.id}")
+    client.get("/todos/999")
+
+    text = client.get("/metrics").get_data(as_text=True)
+
+    assert 'http_requests_total{route="/todos/<int:todo_id>",method="GET",status="200"}' in text
+    assert 'http_requests_total{route="/todos/<int:todo_id>",method="GET",status="404"}' in text
+    assert 'http_request_duration_seconds_count{route="/todos/<int:todo_id>",method="GET"}' in text
+    assert "# TYPE http_requests_in_flight gauge" in text
+
+
+def test_histogram_buckets_are_cumulative():
+    h = Histogram("demo_seconds", "demo", ["op"], buckets=(0.1, 1.0), registry=Registry())
+    for value in (0.05, 0.5, 5.0):
+        h.observe(value, "read")
+
+    lines = h.samples()
+    assert 'demo_seconds_bucket{op="read",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{op="read",le="1.0"} 2' in lines
+    assert 'demo_seconds_bucket{op="read",le="+Inf"} 3' in lines
+    assert 'demo_seconds_count{op="read"} 3' in lines
+
+
+# ---------- Export tests ----------
+
+def test_export_streams_ndjson_and_csv(client, service):
+    service.create("First", "a, b")
+    service.create("Second", None)
+
+    # read each streamed body before sending the next request
+    with client.get("/todos/export?format=ndjson") as ndjson:
+        assert ndjson.is_streamed
+        lines = ndjson.get_data(as_text=True).splitlines()
+    assert [json.loads(line)["title"] for line in lines] == ["Second", "First"]
+
+    with client.get("/todos/export?format=csv&q=first") as csv_resp:
+        rows = list(csv.DictReader(io.StringIO(csv_resp.get_data(as_text=True))))
+    assert [(r["title"], r["description"]) for r in rows] == [("First", "a, b")]
+
+
+def test_export_rejects_unknown_format(client):
+    assert client.get("/todos/export?format=xml").status_code == 400
+
+
+# ---------- Stats tests ----------
+
+def test_stats_endpoint_and_total_count_header(client, service):
+    done = service.create("Done one", None)
+    service.mark_done(done.id)
+    service.create("Open one", None)
+    service.create("Open two", None)
+
+    stats = client.get("/todos/stats").get_json()
+    assert (stats["total"], stats["done"], stats["open"]) == (3, 1, 2)
+
+    assert client.get("/todos?count=1").headers["X-Total-Count"] == "3"
+    assert client.get("/todos?count=1&is_done=false").headers["X-Total-Count"] == "2"
+    assert "X-Total-Count" not in client.get("/todos").headers
+    # a text search would need a real COUNT(*), so no header
+    assert "X-Total-Count" not in client.get("/todos?count=1&q=open").headers
+
+
+# ---------- Archive tests ----------
+
+def test_archive_moves_old_done_todos_out_of_the_live_list(client, service, repo):
+    old = service.mark_done(service.create("Old and done", None).id)
+    old.updated_at -= timedelta(days=40)
+    recent = service.mark_done(service.create("Recently done", None).id)
+    service.create("Still open", None)
+
+    assert service.archive_done(older_than_days=30) == [old.id]
+    assert service.archive_done(older_than_days=30) == []  # nothing left to move
+
+    live = client.get("/todos").get_json()
+    everything = client.get("/todos?include_archived=1&count=1")
+    assert old.id not in [t["id"] for t in live]
+    assert recent.id in [t["id"] for t in live]
+    assert old.id in [t["id"] for t in everything.get_json()]
+    assert everything.headers["X-Total-Count"] == "3"
+
+    assert client.get(f"/todos/{old.id}").status_code == 404
+    assert client.get(f"/todos/{old.id}?include_archived=1").get_json()["title"] == "Old and done"
+    assert client.get("/todos/stats").get_json()["archived"] == 1
+    assert repo.changes(after=(0, 0))[0][-1][3] == "ARCHIVE"
+
+
+def test_archive_rejects_bad_arguments(service):
+    with pytest.raises(ValueError):
+        service.archive_done(older_than_days=-1)
+    with pytest.raises(ValueError):
+        service.archive_done(older_than_days=30, batch_size=0)
+
+
+# ---------- Admission control tests ----------
+
+def test_token_bucket_allows_burst_then_refills():
+    now = [0.0]
+    limiter = LocalLimiter(rate=2, burst=3, clock=lambda: now[0])
+
+    assert [limiter.check("a") for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert limiter.check("a") == 0.5  # empty: next token in 1/rate seconds
+    assert limiter.check("b") == 0.0  # other clients have their own bucket
+
+    now[0] += 0.5
+    assert limiter.check("a") == 0.0
+    assert limiter.check("a", cost=3) == 1.5
+
+
+def test_rate_limited_client_gets_429_with_retry_after(client, monkeypatch):
+    limiter = LocalLimiter(rate=0.5, burst=2, clock=lambda: 0.0)
+    monkeypatch.setitem(app_module.app.extensions, "admission", Admission(limiter, None))
+
+    monkeypatch.setattr(admission, "API_KEYS", {"known-key"})
+
+    statuses = [client.get("/todos").status_code for _ in range(3)]
+    rejected = client.get("/todos")
+    made_up_key = client.get("/todos", headers={"X-Api-Key": "random-123"})
+    known_key = client.get("/todos", headers={"X-Api-Key": "known-key"})
+
+    assert statuses == [200, 200, 429]
+    assert rejected.headers["Retry-After"] == "2"
+    assert made_up_key.status_code == 429  # unchecked keys don't get a fresh bucket
+    assert known_key.status_code == 200
+    assert client.get("/health").status_code == 200  # monitoring is never limited
+
+
+def test_saturated_server_sheds_load_with_503(client, monkeypatch):
+    slots = ConcurrencyLimit(1, wait=0)
+    monkeypatch.setitem(app_module.app.extensions, "admission", Admission(None, slots))
+
+    assert slots.acquire()  # someone else holds the only slot
+    busy = client.get("/todos")
+    slots.release()
+    ok = client.get("/todos")
+
+    assert busy.status_code == 503
+    assert busy.headers["Retry-After"] == "1"
+    assert ok.status_code == 200
+    assert slots.in_use == 0  # released again after the request
+
+
+def test_list_limit_is_capped(client):
+    assert client.get(f"/todos?limit={MAX_LIMIT}").status_code == 200
+    assert client.get(f"/todos?limit={MAX_LIMIT + 1}").status_code == 400
+    assert client.get("/todos?limit=0").status_code == 400
+    assert client.get("/todos?limit=lots").status_code == 400
+
+
+def test_batch_endpoints_serialize_todos_like_single_reads(client):
+    created = client.post("/todos:batch", json={"items": [{"title": "one"}, {"title": ""}]})
+    todo_id = created.get_json()["created"][0]["id"]
+    updated = client.patch("/todos:batch", json={"items": [{"id": todo_id, "is_done": True}]})
+    single = client.get(f"/todos/{todo_id}")
+
+    assert created.status_code == 201
+    assert created.get_json()["errors"] == [{"index": 1, "error": "title must be 1..120 characters"}]
+    # same helpers as the other endpoints -> byte-identical todo JSON (key order too)
+    assert single.data in updated.data
+    assert updated.mimetype == "application/json"
+
+
+# ---------- Change feed tests ----------
+
+@pytest.fixture
+def feed(monkeypatch):
+    feed = ChangeFeed(connect=None)  # no LISTEN connection: tests call publish()
+    monkeypatch.setattr(app_module, "feed", feed)
+    return feed
+
+
+def test_change_feed_wakes_every_waiter(feed):
+    woke = []
+    waiters = [threading.Thread(target=lambda: woke.append(feed.wait(0, timeout=5))) for _ in range(3)]
+    for t in waiters:
+        t.start()
+    time.sleep(0.05)
+    feed.publish()
+    for t in waiters:
+        t.join(timeout=5)
+
+    assert woke == [1, 1, 1]
+    assert feed.wait(1, timeout=0) == 1  # times out, nothing new
+
+
+def test_changes_long_poll_returns_when_a_todo_changes(client, service, feed):
+    start = client.get("/todos/changes").get_json()
+    assert start["changes"] == []
+
+    def write_later():
+        time.sleep(0.1)
+        service.create("Watched", None)
+        feed.publish()
+
+    threading.Thread(target=write_later).start()
+    t0 = time.monotonic()
+    resp = client.get(f"/todos/changes?since={start['next_since']}&timeout=5").get_json()
+
+    assert time.monotonic() - t0 < 4
+    assert [(c["id"], c["op"]) for c in resp["changes"]] == [(1, "INSERT")]
+
+    service.delete(1)
+    after = client.get(f"/todos/changes?since={resp['next_since']}&timeout=0").get_json()
+    assert [(c["id"], c["op"]) for c in after["changes"]] == [(1, "DELETE")]
+    assert client.get("/todos/changes?since=nope").status_code == 400
+
+
+def test_changes_paginate_with_limit(service):
+    since = service.changes()[1]
+    for i in range(3):
+        service.create(f"Todo {i}", None)
+
+    first, since = service.changes(since, limit=2)
+    rest, since = service.changes(since, limit=2)
+
+    assert [c["id"] for c in first + rest] == [1, 2, 3]
+    assert service.changes(since)[0] == []
+
+
+def test_changes_stream_as_server_sent_events(client, service, feed):
+    since = client.get("/todos/changes").get_json()["next_since"]
+    service.create("Streamed", None)
+
+    resp = client.get("/todos/changes", headers={"Accept": "text/event-stream", "Last-Event-ID": since},
+                      buffered=False)
+    event = next(iter(resp.response)).decode()
+    resp.close()
+
+    assert resp.mimetype == "text/event-stream"
+    assert "Content-Encoding" not in resp.headers
+    assert event.startswith("id: ") and "event: changes" in event
+    assert json.loads(event.split("data: ")[1])[0]["op"] == "INSERT"
+
+
+# ---------- Projection / compression tests ----------
+
+def test_list_fields_projection(client, service):
+    service.create("Only title", "a long description nobody renders")
+
+    resp = client.get("/todos?fields=id,title")
+    paged = client.get("/todos?cursor=&fields=title")
+
+    assert resp.get_json() == [{"id": 1, "title": "Only title"}]
+    assert paged.get_json()["items"] == [{"title": "Only title"}]
+    assert client.get("/todos?fields=id,secret").status_code == 400
+
+
+def test_projected_columns_keep_column_order():
+    cols = projected_columns(["title"])
+
+    assert cols == "id, title, NULL AS description, NULL AS is_done, created_at, updated_at"
+    assert projected_columns(None) == "id, title, description, is_done, created_at, updated_at"
+
+
+def test_large_list_is_gzipped_small_one_is_not(client, service):
+    service.create("Tiny", None)
+    small = client.get("/todos", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in small.headers
+
+    for i in range(30):
+        service.create(f"Todo number {i}", "x" * 100)
+    plain = client.get("/todos")
+    zipped = client.get("/todos", headers={"Accept-Encoding": "gzip"})
+
+    assert "Content-Encoding" not in plain.headers
+    assert zipped.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in zipped.headers["Vary"]
+    assert zipped.headers["ETag"].startswith("W/")
+    assert len(zipped.data) < len(plain.data)
+    assert json.loads(gzip.decompress(zipped.data)) == plain.get_json()
+
+    # the weak ETag still validates the cached copy
+    again = client.get("/todos", headers={"Accept-Encoding": "gzip", "If-None-Match": zipped.headers["ETag"]})
+    assert again.status_code == 304
+
+
+def test_choose_encoding_respects_q_values():
+    def accept(header):
+        return parse_accept_header(header, Accept)
+
+    assert choose_encoding(accept("gzip, br"), ("br", "gzip")) == "br"
+    assert choose_encoding(accept("br;q=0.5, gzip"), ("br", "gzip")) == "gzip"
+    assert choose_encoding(accept("gzip;q=0"), ("gzip",)) is None
+    assert choose_encoding(accept("*"), ("gzip",)) == "gzip"
+    assert choose_encoding(accept(""), ("gzip",)) is None
+
+
+# ---------- Async service / ASGI app tests ----------
+# The async stack accepts the same FakeTodoRepo (wrapped in SyncRepoAdapter).
+
+def test_async_service_uses_fake_repo(repo):
+    async def scenario():
+        service = AsyncTodoService(repo=repo)
+        created = await service.create("Async todo", None)
+        done = await service.mark_done(created.id)
+        page, next_cursor = await service.list_page(limit=10)
+        return created, done, page, next_cursor
+
+    created, done, page, next_cursor = asyncio.run(scenario())
+
+    assert done.is_done is True
+    assert [t.id for t in page] == [created.id]
+    assert next_cursor is None
+
+
+def test_asgi_app_matches_flask_json_shapes(repo, monkeypatch):
+    pytest.importorskip("quart")
+    import asgi_app
+
+    monkeypatch.setattr(asgi_app, "svc", AsyncTodoService(repo=repo))
+    client = asgi_app.app.test_client()
+
+    async def scenario():
+        created = await client.post("/todos", json={"title": "From ASGI"})
+        body = await created.get_json()
+        listed = await client.get("/todos")
+        missing = await client.get("/todos/999")
+        bad_offset = await client.get("/todos?offset=abc")
+        archived = await client.get("/todos?include_archived=1")
+        batch = await client.post("/todos:batch", json={"items": [{"title": "x"}, {"title": ""}]})
+        return created, body, await listed.get_json(), missing.status_code, bad_offset.status_code, archived.status_code, await batch.get_json()
+
+    created, body, listed, missing_status, bad_offset_status, archived_status, batch = asyncio.run(scenario())
+
+    assert created.status_code == 201
+    assert created.headers["ETag"] == repo.get(body["id"]).etag
+    assert set(body) == {"id", "title", "description", "is_done", "created_at", "updated_at"}
+    assert [t["title"] for t in listed] == ["From ASGI"]
+    assert missing_status == 404
+    assert bad_offset_status == 400
+    assert archived_status == 400  # not ported to the async app
+    assert batch["errors"] == [{"index": 1, "error": "title must be 1..120 characters"}]
+
+
+# ---------- Connection pool tests ----------
+# The pool only needs "something that looks like a psycopg2 connection",
+# so we use a tiny fake instead of a real database.
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.status = TRANSACTION_STATUS_IDLE
+        self.commits = 0
+        self.rollbacks = 0
+
+    def get_transaction_status(self):
+        return self.status
+
+    def commit(self):
+        self.commits += 1
+        self.status = TRANSACTION_STATUS_IDLE
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.status = TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+@pytest.fixture
+def pool():
+    return ConnectionPool(FakeConnection, minconn=1, maxconn=2, timeout=0.05)
+
+
+def test_pool_reuses_connections(pool):
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        pass
+
+    assert first is second
+    assert first.commits == 2  # `with` commits on success, like psycopg2
+    assert pool.stats()["created"] == 1
+    assert pool.stats()["checkouts"] == 2
+
+
+def test_pool_rolls_back_on_error_and_keeps_connection(pool):
+    with pytest.raises(RuntimeError):
+        with pool.connection() as conn:
+            conn.status = TRANSACTION_STATUS_INTRANS
+            raise RuntimeError("boom")
+
+    assert conn.rollbacks == 1
+    assert pool.stats()["idle"] == 1
+
+
+def test_pool_recycles_broken_connections(pool):
+    with pool.connection() as conn:
+        conn.close()  # e.g. the server went away mid-request
+
+    assert pool.stats()["recycled"] == 1
+    with pool.connection() as fresh:
+        assert fresh is not conn
+        assert not fresh.closed
+
+
+def test_pool_times_out_when_exhausted(pool):
+    a = pool.getconn()
+    b = pool.getconn()
+
+    with pytest.raises(PoolTimeout):
+        pool.getconn()
+
+    pool.putconn(a)
+    pool.putconn(b)
+    stats = pool.stats()
+    assert stats["timeouts"] == 1
+    assert stats["max_in_use"] == 2
+    assert stats["in_use"] == 0
+
+
+# ---------- Prepared statement tests ----------
+
+class RecordingCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.sent = []
+
+    def execute(self, sql, params=None):
+        self.sent.append((sql, params))
+
+
+def test_numbered_placeholders():
+    assert numbered("a = %s AND b ILIKE %s AND c LIKE 'x%%'") == ("a = $1 AND b ILIKE $2 AND c LIKE 'x%'", 2)
+
+
+def test_statement_cache_prepares_once_per_connection():
+    cache = StatementCache()
+    conn_a, conn_b = FakeConnection(), FakeConnection()
+    cur = RecordingCursor(conn_a)
+
+    cache.execute(cur, "get", "SELECT * FROM todos WHERE id = %s", (1,))
+    cache.execute(cur, "get", "SELECT * FROM todos WHERE id = %s", (2,))
+    cache.execute(RecordingCursor(conn_b), "get", "SELECT * FROM todos WHERE id = %s", (3,))
+
+    assert cur.sent == [
+        ("PREPARE get_1 AS SELECT * FROM todos WHERE id = $1", None),
+        ("EXECUTE get_1 (%s)", (1,)),
+        ("EXECUTE get_1 (%s)", (2,)),
+    ]
+    stats = cache.stats()
+    assert (stats["hits"], stats["prepares"], stats["statements"]) == (1, 2, 1)
+    assert stats["by_statement"]["get"] == {"hits": 1, "prepares": 2}
+
+
+def test_list_sql_is_built_once_per_filter_combination():
+    repo = TodoRepo()
+    sql_a, params_a = repo._list_query("id", "true", "milk", 50, 0, None, False)
+    sql_b, params_b = repo._list_query("id", "false", "eggs", 10, 20, None, False)
+    sql_c, _ = repo._list_query("id", None, "milk", 50, 0, None, False)
+
+    assert sql_a is sql_b
+    assert sql_c is not sql_a
+    assert params_b == (False, "%eggs%", "%eggs%", 10, 20)
+
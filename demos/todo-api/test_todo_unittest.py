@@ -12,7 +12,7 @@ This shows students:
 import unittest
 from datetime import datetime, timezone
 
-from domain import Todo
+from domain import EPOCH, ConflictError, Todo
 from service import TodoService
 
 
@@ -39,18 +39,26 @@ class FakeTodoRepo:
         self._store[todo.id] = todo
         return todo
 
-    def get(self, todo_id):
+    def get(self, todo_id, include_archived=False):
         # Return the Todo or None if it doesn't exist.
         return self._store.get(todo_id)
 
-    def list(self, is_done=None, q=None, limit=50, offset=0):
-        # Very simple implementation: return all todos, ignoring filters for now.
-        todos = list(self._store.values())
+    def list(self, is_done=None, q=None, limit=50, offset=0, after=None, rank=False, fields=None,
+             include_archived=False):
+        # Newest first, like the real ORDER BY created_at DESC, id DESC.
+        todos = sorted(self._store.values(), key=lambda t: (t.created_at, t.id), reverse=True)
 
         if is_done is not None:
             todos = [t for t in todos if t.is_done == bool(is_done)]
 
-        if q:
+        if q and rank:
+            # Full-text style: every word must appear; more occurrences rank higher.
+            words = q.lower().split()
+            def text(t):
+                return f"{t.title} {t.description or ''}".lower()
+            todos = [t for t in todos if all(w in text(t) for w in words)]
+            todos.sort(key=lambda t: sum(text(t).count(w) for w in words), reverse=True)
+        elif q:
             q_lower = q.lower()
             todos = [
                 t
@@ -59,9 +67,30 @@ class FakeTodoRepo:
                 or q_lower in (t.description or "").lower()
             ]
 
+        # Simulate keyset pagination: only rows "after" the cursor position
+        if after is not None:
+            todos = [t for t in todos if (t.created_at, t.id) < after]
+            offset = 0
+
         # Simulate limit/offset
         return todos[offset : offset + limit]
 
+    def patch(self, todo_id, title=None, description=None, is_done=None, expected_updated_at=None):
+        # Partial update: None means "leave this field alone".
+        todo = self._store.get(todo_id)
+        if todo is None:
+            return None
+        if expected_updated_at is not None and todo.updated_at != expected_updated_at:
+            raise ConflictError("todo was modified by someone else")
+        if title is not None:
+            todo.rename(title)
+        if description is not None:
+            todo.describe(description)
+        if is_done is not None:
+            todo.is_done = is_done
+        todo.touch()
+        return todo
+
     def update(self, todo):
         if todo.id not in self._store:
             return None
@@ -74,6 +103,12 @@ class FakeTodoRepo:
             return True
         return False
 
+    def stats(self):
+        # the real repo reads these from todo_stats instead of counting
+        done = sum(1 for t in self._store.values() if t.is_done)
+        total = len(self._store)
+        return {"total": total, "done": done, "open": total - done, "reconciled_at": EPOCH}
+
 
 class TestTodoDomain(unittest.TestCase):
     """